@@ -5,12 +5,33 @@ Inspired by the Khazar Dictionary's multiple perspectives and non-linear narrati
 this system orchestrates an ensemble of LLMs to work collectively on creative tasks.
 """
 
+from typing import TYPE_CHECKING
+
+from ._lazy import lazy_exports
+
 __version__ = "0.1.0"
 
-from .agents.base import Agent, AgentRole
-from .agents.personas import DreamerAgent, CriticAgent, SynthesizerAgent, PhilosopherAgent
-from .orchestration.ensemble import Ensemble
-from .orchestration.session import CreativeSession
+# Exports are imported on first access so that `import khazar_llms` (and the
+# CLI) start quickly
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "Agent": ".agents.base",
+        "AgentRole": ".agents.base",
+        "DreamerAgent": ".agents.personas",
+        "CriticAgent": ".agents.personas",
+        "SynthesizerAgent": ".agents.personas",
+        "PhilosopherAgent": ".agents.personas",
+        "Ensemble": ".orchestration.ensemble",
+        "CreativeSession": ".orchestration.session",
+    },
+)
+
+if TYPE_CHECKING:
+    from .agents.base import Agent, AgentRole
+    from .agents.personas import DreamerAgent, CriticAgent, SynthesizerAgent, PhilosopherAgent
+    from .orchestration.ensemble import Ensemble
+    from .orchestration.session import CreativeSession
 
 __all__ = [
     "Agent",
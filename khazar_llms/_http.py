@@ -0,0 +1,81 @@
+"""Minimal HTTP/1.1 request parsing and responses over asyncio streams."""
+
+import asyncio
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+
+from .utils.serialization import dumps, loads
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+
+
+class HTTPError(Exception):
+    """A request that is answered with an error status."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+async def read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Dict[str, str], bytes]:
+    """Read one HTTP/1.1 request: method, path (without query), headers and body."""
+    try:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed before a request")
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(431, "Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+    except ValueError:  # a malformed request line or a line over the reader's limit
+        raise HTTPError(400, "Malformed request")
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def decode_json(body: bytes) -> Any:
+    """Parse a JSON request body (HTTPError 400 when it isn't valid JSON)."""
+    try:
+        return loads(body.decode("utf-8"))
+    except ValueError:
+        raise HTTPError(400, "Request body is not valid JSON")
+
+
+def response_head(status: int, headers: Dict[str, str], keep_alive: bool = False) -> bytes:
+    """The status line and headers of a response (with a Connection header unless 101)."""
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    if status != 101:
+        headers = {**headers, "Connection": "keep-alive" if keep_alive else "close"}
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def json_response(
+    status: int,
+    body: Dict[str, Any],
+    keep_alive: bool = False,
+    retry_after: Optional[float] = None,
+) -> bytes:
+    """A complete response with a JSON body."""
+    data = dumps(body).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(data))}
+    if retry_after is not None:
+        headers["Retry-After"] = f"{retry_after:g}"
+    return response_head(status, headers, keep_alive) + data
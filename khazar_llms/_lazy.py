@@ -0,0 +1,36 @@
+"""Lazy loading of package exports (PEP 562)."""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Build a package's module-level ``__getattr__`` and ``__dir__``.
+
+    Each export is imported from its submodule on first access and then
+    cached on the package, so importing the package itself stays cheap.
+
+    Args:
+        package: The package's ``__name__``
+        exports: Map of exported name to the relative submodule defining it
+
+    Returns:
+        The ``(__getattr__, __dir__)`` functions for the package
+    """
+
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
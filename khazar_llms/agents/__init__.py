@@ -1,17 +1,40 @@
 """Agent implementations for the KhazarLLMs ensemble."""
 
-from .base import Agent, AgentRole
-from .personas import (
-    DreamerAgent,
-    CriticAgent,
-    SynthesizerAgent,
-    PhilosopherAgent,
-    RebelAgent,
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "Agent": ".base",
+        "AgentRole": ".base",
+        "ContextWindow": ".context",
+        "ConversationHistory": ".context",
+        "DreamerAgent": ".personas",
+        "CriticAgent": ".personas",
+        "SynthesizerAgent": ".personas",
+        "PhilosopherAgent": ".personas",
+        "RebelAgent": ".personas",
+    },
 )
 
+if TYPE_CHECKING:
+    from .base import Agent, AgentRole
+    from .context import ContextWindow, ConversationHistory
+    from .personas import (
+        DreamerAgent,
+        CriticAgent,
+        SynthesizerAgent,
+        PhilosopherAgent,
+        RebelAgent,
+    )
+
 __all__ = [
     "Agent",
     "AgentRole",
+    "ContextWindow",
+    "ConversationHistory",
     "DreamerAgent",
     "CriticAgent",
     "SynthesizerAgent",
@@ -1,9 +1,18 @@
 """Base agent class and role definitions."""
 
+import inspect
+import sys
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable
+
+from ..utils.metrics import call_metadata, collect_calls
+
+if TYPE_CHECKING:
+    from ..utils.cascade import CascadePolicy
+    from ..utils.llm_client import LLMClient
+    from .context import ContextWindow, ConversationHistory
 
 
 class AgentRole(str, Enum):
@@ -18,57 +27,307 @@ class AgentRole(str, Enum):
     POET = "poet"  # Adds beauty and emotional resonance
 
 
-class Message(BaseModel):
+# Slotted dataclasses (Python 3.10+) are smaller and faster to access
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
+class Message:
     """A message in the creative conversation."""
 
     sender: str
     role: AgentRole
     content: str
     iteration: int
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if type(self.role) is not AgentRole:
+            self.role = AgentRole(self.role)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the message as JSON-ready plain values (role as its string value)."""
+        return {
+            "sender": self.sender,
+            "role": self.role.value,
+            "content": self.content,
+            "iteration": self.iteration,
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        """Build a message from ``to_dict()`` output or a logged message record."""
+        return cls(
+            sender=data["sender"],
+            role=data["role"],
+            content=data["content"],
+            iteration=data["iteration"],
+            metadata=data.get("metadata") or {},
+        )
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Return the fields as a dict (kept for compatibility with the pydantic model)."""
+        return {
+            "sender": self.sender,
+            "role": self.role,
+            "content": self.content,
+            "iteration": self.iteration,
+            "metadata": self.metadata,
+        }
+
+
+@dataclass
+class TokenEvent:
+    """A chunk of streamed text produced by an agent while it responds."""
+
+    sender: str
+    role: AgentRole
+    iteration: int
+    text: str
+    done: bool = False  # True for the final event of a response (text is empty)
+
+
+# Called for every TokenEvent; may be a plain function or a coroutine function
+TokenCallback = Callable[[TokenEvent], Any]
 
 
 class Agent(ABC):
     """Base class for all creative agents in the ensemble."""
 
+    # Instruction template ("{iteration}" is filled in) and heading of the turns
+    # ``respond`` takes through ``generate_turn``; None for agents that don't
+    INSTRUCTION: Optional[str] = None
+    TURN_HEADING = "New in the conversation:"
+
     def __init__(
         self,
         name: str,
         role: AgentRole,
         temperature: float = 0.8,
-        model: str = "gpt-4",
+        model: Optional[str] = None,
         provider: str = "openai",
+        context_window: Optional["ContextWindow"] = None,
+        max_memory: Optional[int] = 100,
+        history: Optional["ConversationHistory"] = None,
+        cascade: Optional["CascadePolicy"] = None,
+        max_tokens: int = 800,
     ):
+        # Imported here because the context module builds on Message
+        from .context import ContextWindow, ConversationHistory
+
         self.name = name
         self.role = role
         self.temperature = temperature
         self.model = model
+        # Draft/refine cascade for this agent's calls (overrides ``model``)
+        self.cascade = cascade
+        # Reply length limit used when a call doesn't give its own
+        self.max_tokens = max_tokens
         self.provider = provider
         self.memory: List[Message] = []
+        self.max_memory = max_memory
+        self.context_window = context_window or ContextWindow()
+        self.history = history or ConversationHistory()
+        self._llm_client: Optional["LLMClient"] = None
+
+    @property
+    def llm_client(self) -> "LLMClient":
+        """
+        The client this agent calls; created for ``provider`` on first use.
+
+        Creating it lazily keeps agent construction (and the CLI) from loading
+        the client and provider SDKs until a response is actually needed.
+        """
+        if self._llm_client is None:
+            from ..utils.llm_client import LLMClient
+
+            self._llm_client = LLMClient(provider=self.provider)
+        return self._llm_client
+
+    @llm_client.setter
+    def llm_client(self, client: "LLMClient"):
+        self._llm_client = client
 
     @abstractmethod
     def get_system_prompt(self) -> str:
         """Return the system prompt that defines this agent's personality."""
         pass
 
-    @abstractmethod
     async def respond(
-        self, task: str, context: List[Message], iteration: int
+        self,
+        task: str,
+        context: List[Message],
+        iteration: int,
+        on_token: Optional[TokenCallback] = None,
     ) -> Message:
-        """Generate a response to the creative task given the conversation context."""
-        pass
+        """
+        Generate a response to the creative task given the conversation context.
+
+        The default takes a turn in the agent's transcript with the class's
+        INSTRUCTION and TURN_HEADING (see ``generate_turn``); agents without an
+        INSTRUCTION must override it. When ``on_token`` is given the response
+        is streamed and the callback receives a TokenEvent for every chunk as
+        it arrives.
+        """
+        instruction = self.turn_instruction(iteration)
+        if instruction is None:
+            raise NotImplementedError(
+                f"{type(self).__name__} must set INSTRUCTION or override respond()"
+            )
+        return await self.generate_turn(
+            task, context, iteration, instruction, on_token, heading=self.TURN_HEADING
+        )
+
+    def turn_instruction(self, iteration: int) -> Optional[str]:
+        """The instruction for this agent's turn in ``iteration`` (see INSTRUCTION)."""
+        if self.INSTRUCTION is None:
+            return None
+        return self.INSTRUCTION.format(iteration=iteration)
+
+    def restore_turn(self, task: str, context: List[Message], message: Message):
+        """
+        Replay a turn of an earlier run (e.g. when resuming a session).
+
+        The message is added to memory and, for agents whose turns go through
+        ``generate_turn``, to the transcript as the request it answered, so the
+        next request matches the one an uninterrupted run would send.
+
+        Args:
+            task: The creative task
+            context: The conversation the agent saw when it took the turn
+            message: The agent's message from that turn
+        """
+        self.add_to_memory(message)
+        instruction = self.turn_instruction(message.iteration)
+        if instruction is not None:
+            self.history.prepare(
+                self.get_system_prompt(), task, context, self.name, instruction, self.TURN_HEADING
+            )
+            self.history.record(message.content)
+
+    async def generate_message(
+        self,
+        prompt: str,
+        iteration: int,
+        on_token: Optional[TokenCallback] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Message:
+        """
+        Ask ``self.llm_client`` for a response to a single prompt and record it.
+
+        The message's metadata holds the model used and the call's metrics
+        (latency, time to first token, token counts, retries, cache hit).
+        """
+        messages = [
+            {"role": "system", "content": self.get_system_prompt()},
+            {"role": "user", "content": prompt},
+        ]
+        with collect_calls() as calls:
+            content = await self._generate(
+                messages, iteration, on_token, max_tokens or self.max_tokens
+            )
+        return self._record(content, iteration, calls)
+
+    async def generate_turn(
+        self,
+        task: str,
+        context: List[Message],
+        iteration: int,
+        instruction: str,
+        on_token: Optional[TokenCallback] = None,
+        max_tokens: Optional[int] = None,
+        heading: str = "New in the conversation:",
+    ) -> Message:
+        """
+        Continue this agent's multi-turn conversation and record the response.
+
+        Unlike ``generate_message``, the request is the agent's append-only
+        ``history``: only messages the agent has not seen yet are added, so
+        successive requests share a prefix the provider can cache.
+
+        Args:
+            task: The creative task
+            context: The conversation visible to the agent
+            iteration: The current iteration
+            instruction: What the agent should do this turn
+            on_token: Optional streaming callback
+            max_tokens: Maximum tokens to generate (defaults to ``self.max_tokens``)
+            heading: Line introducing the new peer messages
+        """
+        messages = self.history.prepare(
+            self.get_system_prompt(), task, context, self.name, instruction, heading
+        )
+        with collect_calls() as calls:
+            content = await self._generate(
+                messages, iteration, on_token, max_tokens or self.max_tokens
+            )
+        self.history.record(content)
+        return self._record(content, iteration, calls)
+
+    def _record(self, content: str, iteration: int, calls) -> Message:
+        message = Message(
+            sender=self.name,
+            role=self.role,
+            content=content,
+            iteration=iteration,
+            metadata={"model": self.model or self.llm_client.model, **call_metadata(calls)},
+        )
+        self.add_to_memory(message)
+        return message
+
+    async def _generate(
+        self,
+        messages: List[Dict[str, str]],
+        iteration: int,
+        on_token: Optional[TokenCallback],
+        max_tokens: int,
+    ) -> str:
+        if on_token is None:
+            content = await self.llm_client.generate_chat(
+                messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                model=self.model,
+                cascade=self.cascade,
+            )
+        else:
+            chunks = []
+            async for chunk in self.llm_client.stream_chat(
+                messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                model=self.model,
+                cascade=self.cascade,
+            ):
+                chunks.append(chunk)
+                await self._emit(on_token, chunk, iteration)
+            await self._emit(on_token, "", iteration, done=True)
+            content = "".join(chunks)
+        return content
+
+    async def _emit(self, on_token: TokenCallback, text: str, iteration: int, done: bool = False):
+        event = TokenEvent(
+            sender=self.name, role=self.role, iteration=iteration, text=text, done=done
+        )
+        result = on_token(event)
+        if inspect.isawaitable(result):
+            await result
 
     def add_to_memory(self, message: Message):
-        """Add a message to the agent's memory."""
+        """Add a message to the agent's memory, forgetting the oldest beyond ``max_memory``."""
         self.memory.append(message)
+        if self.max_memory is not None and len(self.memory) > self.max_memory:
+            del self.memory[: len(self.memory) - self.max_memory]
 
     def get_context_summary(self, context: List[Message], max_messages: int = 5) -> str:
-        """Get a summary of recent conversation context."""
-        recent = context[-max_messages:] if len(context) > max_messages else context
-        summary = []
-        for msg in recent:
-            summary.append(f"{msg.sender} ({msg.role}): {msg.content[:200]}...")
-        return "\n".join(summary)
+        """
+        Get a token-budgeted view of the conversation context.
+
+        The latest ``max_messages`` messages are shown as excerpts and older
+        ones as a rolling one-line-per-message summary (see ContextWindow).
+        """
+        return self.context_window.render(context, recent_messages=max_messages)
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}(name='{self.name}', role={self.role})>"
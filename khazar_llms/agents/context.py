@@ -0,0 +1,308 @@
+"""Token-budgeted conversation context and chat history for agents."""
+
+import re
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ..utils.tokens import estimate_message_tokens, estimate_tokens, truncate_to_tokens
+from .base import Message
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class RollingSummary:
+    """
+    One line per folded message, within a token budget.
+
+    Each message is summarized once, by its first sentence, when it is added.
+    Once the lines outgrow ``max_tokens`` the oldest are dropped and only
+    counted, so the summary stays bounded however much is folded into it.
+    """
+
+    def __init__(self, max_tokens: int = 300, line_tokens: int = 30):
+        """
+        Args:
+            max_tokens: Token budget for all lines together
+            line_tokens: Token budget for each line
+        """
+        self.max_tokens = max_tokens
+        self.line_tokens = line_tokens
+        self._lines: Deque[Tuple[str, int]] = deque()
+        self._used = 0
+        self.omitted = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def add(self, sender: str, text: str):
+        """Fold one message into the summary."""
+        first_sentence = _SENTENCE_END.split(text.strip(), 1)[0]
+        line = f"- {sender}: {truncate_to_tokens(first_sentence, self.line_tokens)}"
+        tokens = estimate_tokens(line)
+        self._lines.append((line, tokens))
+        self._used += tokens
+        while self._used > self.max_tokens and len(self._lines) > 1:
+            _, dropped = self._lines.popleft()
+            self._used -= dropped
+            self.omitted += 1
+
+    def lines(self) -> List[str]:
+        """The summary lines, oldest first, after a note of how many were dropped."""
+        lines = [f"- ({self.omitted} earlier messages omitted)"] if self.omitted else []
+        return lines + [line for line, _ in self._lines]
+
+
+class ContextWindow:
+    """
+    Renders the conversation an agent sees within a fixed token budget.
+
+    The most recent messages are shown as excerpts; older messages are folded
+    into a rolling summary of one line per message. Folding is incremental:
+    each message is summarized once, when it leaves the recent window, so the
+    cost of building a prompt stays flat as the session grows. The rendered
+    text is cached until the context changes.
+    """
+
+    def __init__(
+        self,
+        recent_messages: int = 5,
+        message_tokens: int = 50,
+        summary_tokens: int = 300,
+        summary_line_tokens: int = 30,
+    ):
+        """
+        Args:
+            recent_messages: Number of latest messages shown as excerpts
+            message_tokens: Token budget for each recent message excerpt
+            summary_tokens: Token budget for the summary of older messages
+            summary_line_tokens: Token budget for each summary line
+        """
+        self.recent_messages = recent_messages
+        self.message_tokens = message_tokens
+        self.summary_tokens = summary_tokens
+        self.summary_line_tokens = summary_line_tokens
+        self._reset()
+
+    def _reset(self):
+        self._summary = RollingSummary(self.summary_tokens, self.summary_line_tokens)
+        self._folded = 0
+        self._last_folded: Optional[Message] = None
+        self._cache_key: Optional[tuple] = None
+        self._cached = ""
+
+    def render(self, context: List[Message], recent_messages: Optional[int] = None) -> str:
+        """
+        Render the context as prompt text.
+
+        Args:
+            context: The conversation visible to the agent, oldest first
+            recent_messages: Override for the number of recent excerpts
+        """
+        recent = self.recent_messages if recent_messages is None else recent_messages
+        key = (len(context), id(context[-1]) if context else None, recent)
+        if key == self._cache_key:
+            return self._cached
+
+        boundary = max(0, len(context) - recent)
+        if not self._extends_folded(context, boundary):
+            self._reset()
+        for message in context[self._folded : boundary]:
+            self._summary.add(message.sender, message.content)
+        self._folded = max(self._folded, boundary)
+        if self._folded:
+            self._last_folded = context[self._folded - 1]
+
+        lines = []
+        if self._summary:
+            lines.append("Earlier in the conversation:")
+            lines.extend(self._summary.lines())
+            lines.append("")
+        for message in context[boundary:]:
+            excerpt = truncate_to_tokens(message.content, self.message_tokens)
+            lines.append(f"{message.sender} ({message.role.value}): {excerpt}")
+
+        self._cache_key = key
+        self._cached = "\n".join(lines)
+        return self._cached
+
+    def _extends_folded(self, context: List[Message], boundary: int) -> bool:
+        """Whether the already-folded messages are a prefix of this context."""
+        if self._folded > boundary:
+            return False
+        return not self._folded or context[self._folded - 1] is self._last_folded
+
+
+# First line of the transcript turn that summarizes dropped turns
+SUMMARY_HEADING = "Summary of earlier turns of this conversation:"
+
+
+class ConversationHistory:
+    """
+    The append-only chat transcript an agent sends to its provider.
+
+    The first user turn states the task; every later user turn carries only
+    the peer messages that arrived since the agent last spoke, and the agent's
+    own replies are kept as assistant turns. Earlier turns are never
+    re-rendered, so consecutive requests share their whole prefix and provider
+    prompt caching applies. When the transcript outgrows ``max_tokens`` the
+    oldest turns after the first are dropped in one go, down to half the
+    budget, so the prefix then stays stable again for several turns. Dropped
+    turns are folded into a rolling summary (see RollingSummary), kept as one
+    user turn after the task turn and only rebuilt when more turns are dropped.
+
+    Each context is expected to hold every message of the iterations before
+    the agent's turn, as the ensemble passes it. Messages of iterations before
+    the newest one seen in a recorded turn's context are therefore known to
+    have been shown, and only later messages are tracked, so the bookkeeping
+    stays bounded however long the session runs.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 4000,
+        message_tokens: int = 200,
+        summary_tokens: int = 300,
+        summary_line_tokens: int = 30,
+    ):
+        """
+        Args:
+            max_tokens: Token budget for the whole transcript
+            message_tokens: Token budget for each peer message quoted in a turn
+            summary_tokens: Token budget for the summary of dropped turns
+            summary_line_tokens: Token budget for each summary line
+        """
+        self.max_tokens = max_tokens
+        self.message_tokens = message_tokens
+        self.summary_tokens = summary_tokens
+        self.summary_line_tokens = summary_line_tokens
+        self.reset()
+
+    def reset(self):
+        """Forget the transcript."""
+        self.messages: List[Dict[str, str]] = []
+        self._tokens: List[int] = []
+        self._task: Optional[str] = None
+        self._sender: Optional[str] = None
+        # Dropped turns, folded; shown as messages[3] once there are any
+        self._summary = RollingSummary(self.summary_tokens, self.summary_line_tokens)
+        # Peer messages quoted in each turn after the first, until it is dropped
+        self._turn_peers: List[List[Message]] = []
+        # Every message of an iteration before this one has been shown
+        self._horizon = 0
+        # Shown messages of later iterations, by id (kept referenced so ids aren't reused)
+        self._shown: Dict[int, Message] = {}
+        self._pending: Optional[Tuple[Dict[str, str], List[Message], List[Message], int]] = None
+
+    def prepare(
+        self,
+        system_prompt: str,
+        task: str,
+        context: List[Message],
+        sender: str,
+        instruction: str,
+        heading: str = "New in the conversation:",
+    ) -> List[Dict[str, str]]:
+        """
+        Build the messages for the agent's next request.
+
+        The new user turn is only kept once ``record`` receives the reply, so
+        a failed request can simply be retried.
+
+        Args:
+            system_prompt: The agent's system prompt
+            task: The creative task; a different task starts a new transcript
+            context: The conversation visible to the agent, oldest first
+            sender: The agent's name; its own messages are not quoted back
+            instruction: What the agent should do this turn
+            heading: Line introducing the quoted peer messages
+
+        Returns:
+            The chat messages to send, ending with the new user turn
+        """
+        if task != self._task or not self.messages or self.messages[0]["content"] != system_prompt:
+            self.reset()
+            self._task = task
+            self._append({"role": "system", "content": system_prompt})
+
+        new = [m for m in context if m.iteration >= self._horizon and id(m) not in self._shown]
+        parts = [f"Task: {task}"] if len(self.messages) == 1 else []
+        peers = [m for m in new if m.sender != sender]
+        if peers:
+            parts.append(heading + "\n" + "\n".join(self._quote(peers)))
+        parts.append(instruction)
+
+        turn = {"role": "user", "content": "\n\n".join(parts)}
+        horizon = max([self._horizon] + [m.iteration for m in context])
+        self._sender = sender
+        self._pending = (turn, new, peers, horizon)
+        return self.messages + [turn]
+
+    def _quote(self, peers: List[Message]) -> List[str]:
+        """One line per peer message, newest kept first within half the budget."""
+        lines: List[str] = []
+        used = 0
+        for message in reversed(peers):
+            excerpt = truncate_to_tokens(message.content, self.message_tokens)
+            line = f"{message.sender} ({message.role.value}): {excerpt}"
+            used += estimate_tokens(line)
+            if lines and used > self.max_tokens // 2:
+                break
+            lines.append(line)
+        omitted = len(peers) - len(lines)
+        if omitted:
+            lines.append(f"({omitted} earlier messages omitted)")
+        return lines[::-1]
+
+    def record(self, reply: str):
+        """Append the prepared user turn and the agent's reply to the transcript."""
+        if self._pending is None:
+            raise RuntimeError("record() called without a prepared turn")
+        turn, shown, peers, horizon = self._pending
+        self._pending = None
+        if len(self.messages) > 1:
+            self._turn_peers.append(peers)
+        for message in shown:
+            self._shown[id(message)] = message
+        if horizon > self._horizon:
+            self._horizon = horizon
+            self._shown = {
+                key: message for key, message in self._shown.items() if message.iteration >= horizon
+            }
+        self._append(turn)
+        self._append({"role": "assistant", "content": reply})
+        if sum(self._tokens) > self.max_tokens:
+            self._trim()
+
+    def _append(self, message: Dict[str, str]):
+        self.messages.append(message)
+        self._tokens.append(estimate_message_tokens([message]))
+
+    def _trim(self):
+        """
+        Drop the oldest user/assistant pairs after the first, down to half the budget.
+
+        The peer messages and reply of each dropped pair are folded into the
+        summary, and the summary turn is rebuilt from it.
+        """
+        # Index 0 is the system prompt, 1-2 the turn stating the task, then the summary
+        keep = 4 if self._summary else 3
+        used = sum(self._tokens)
+        end = keep
+        while end + 2 <= len(self.messages) - 2 and used > self.max_tokens // 2:
+            used -= self._tokens[end] + self._tokens[end + 1]
+            end += 2
+        dropped = (end - keep) // 2
+        if not dropped:
+            return
+        for index, peers in enumerate(self._turn_peers[:dropped]):
+            for message in peers:
+                self._summary.add(message.sender, message.content)
+            self._summary.add(self._sender, self.messages[keep + 2 * index + 1]["content"])
+        del self._turn_peers[:dropped]
+        del self.messages[keep:end]
+        del self._tokens[keep:end]
+
+        content = "\n".join([SUMMARY_HEADING] + self._summary.lines())
+        summary = {"role": "user", "content": content}
+        self.messages[3:keep] = [summary]
+        self._tokens[3:keep] = [estimate_message_tokens([summary])]
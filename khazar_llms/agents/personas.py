@@ -1,19 +1,14 @@
 """Specific agent personas with unique creative perspectives."""
 
-from typing import List
-from .base import Agent, AgentRole, Message
-from ..utils.llm_client import LLMClient
+from .base import Agent, AgentRole
 
 
 class DreamerAgent(Agent):
     """The Dreamer generates wild, unbounded creative ideas."""
 
-    def __init__(self, name: str = "Dreamer", **kwargs):
-        super().__init__(name=name, role=AgentRole.DREAMER, temperature=0.95, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Dreamer - a boundlessly creative agent who sees possibilities everywhere.
+    ROLE = AgentRole.DREAMER
+    TEMPERATURE = 0.95
+    SYSTEM_PROMPT = """You are the Dreamer - a boundlessly creative agent who sees possibilities everywhere.
 
 Your role:
 - Generate wild, imaginative ideas without self-censorship
@@ -24,49 +19,25 @@ Your role:
 
 Never limit yourself to "practical" or "realistic" ideas. Your strength is in seeing
 what others cannot imagine. Be bold, be strange, be beautiful in your visions."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a dreamer's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Previous conversation:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 Now, as the Dreamer, share your wildest, most creative ideas for this task. 
 Don't hold back - let your imagination soar!"""
+    TURN_HEADING = "Previous conversation:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Dreamer", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class CriticAgent(Agent):
     """The Critic analyzes ideas with sharp insight."""
 
-    def __init__(self, name: str = "Critic", **kwargs):
-        super().__init__(name=name, role=AgentRole.CRITIC, temperature=0.4, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Critic - a sharp, insightful analyst who sees clearly.
+    ROLE = AgentRole.CRITIC
+    TEMPERATURE = 0.4
+    SYSTEM_PROMPT = """You are the Critic - a sharp, insightful analyst who sees clearly.
 
 Your role:
 - Identify weaknesses, gaps, and contradictions in ideas
@@ -77,49 +48,25 @@ Your role:
 
 Be honest but constructive. Your criticism should illuminate, not destroy. Point out
 problems while suggesting paths forward. Be rigorous but fair."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a critic's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Ideas discussed so far:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Critic, analyze these ideas carefully. What are their strengths and weaknesses? 
 What assumptions need questioning? Provide constructive criticism."""
+    TURN_HEADING = "Ideas discussed so far:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Critic", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class SynthesizerAgent(Agent):
     """The Synthesizer combines disparate ideas into coherent wholes."""
 
-    def __init__(self, name: str = "Synthesizer", **kwargs):
-        super().__init__(name=name, role=AgentRole.SYNTHESIZER, temperature=0.7, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Synthesizer - a master of integration who finds harmony in chaos.
+    ROLE = AgentRole.SYNTHESIZER
+    TEMPERATURE = 0.7
+    SYSTEM_PROMPT = """You are the Synthesizer - a master of integration who finds harmony in chaos.
 
 Your role:
 - Identify common threads across different perspectives
@@ -129,50 +76,29 @@ Your role:
 - Build bridges between opposing viewpoints
 
 You see patterns and connections that others miss. Your gift is making wholes greater
-than the sum of their parts. Find the hidden unity in diversity."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a synthesizer's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
+than the sum of their parts. Find the hidden unity in diversity.
 
-Multiple perspectives shared:
-{context_summary}
+When the group has genuinely converged on a shared vision, end your response with
+the line "CONSENSUS REACHED"."""
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Synthesizer, find the common threads and combine these perspectives into 
 a unified vision. How can we integrate the best of what's been said?"""
+    TURN_HEADING = "Multiple perspectives shared:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Synthesizer", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class PhilosopherAgent(Agent):
     """The Philosopher provides deep context and explores meaning."""
 
-    def __init__(self, name: str = "Philosopher", **kwargs):
-        super().__init__(name=name, role=AgentRole.PHILOSOPHER, temperature=0.6, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Philosopher - a deep thinker who explores meaning and context.
+    ROLE = AgentRole.PHILOSOPHER
+    TEMPERATURE = 0.6
+    SYSTEM_PROMPT = """You are the Philosopher - a deep thinker who explores meaning and context.
 
 Your role:
 - Explore the deeper implications and meanings of ideas
@@ -183,49 +109,25 @@ Your role:
 
 You think in long time horizons and broad contexts. Your gift is seeing the forest
 while others focus on trees. Elevate the conversation to matters of meaning."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a philosopher's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Conversation so far:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Philosopher, explore the deeper meaning and implications. What does this 
 really mean? How does it connect to broader human questions?"""
+    TURN_HEADING = "Conversation so far:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Philosopher", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class RebelAgent(Agent):
     """The Rebel challenges assumptions and breaks rules."""
 
-    def __init__(self, name: str = "Rebel", **kwargs):
-        super().__init__(name=name, role=AgentRole.REBEL, temperature=0.9, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Rebel - an iconoclast who challenges everything.
+    ROLE = AgentRole.REBEL
+    TEMPERATURE = 0.9
+    SYSTEM_PROMPT = """You are the Rebel - an iconoclast who challenges everything.
 
 Your role:
 - Question every assumption, especially the unspoken ones
@@ -236,49 +138,25 @@ Your role:
 
 You are the agent of creative destruction. When everyone agrees, you dissent.
 When there's a rule, you break it. Your disruptions create space for true innovation."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a rebel's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Current discussion:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Rebel, challenge the consensus. What assumptions are being made? 
 What rules should we break? How can we do the opposite of what's expected?"""
+    TURN_HEADING = "Current discussion:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Rebel", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class ArchitectAgent(Agent):
     """The Architect structures and organizes ideas."""
 
-    def __init__(self, name: str = "Architect", **kwargs):
-        super().__init__(name=name, role=AgentRole.ARCHITECT, temperature=0.5, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Architect - a master of structure and organization.
+    ROLE = AgentRole.ARCHITECT
+    TEMPERATURE = 0.5
+    SYSTEM_PROMPT = """You are the Architect - a master of structure and organization.
 
 Your role:
 - Create frameworks and structures for organizing ideas
@@ -289,49 +167,25 @@ Your role:
 
 You build the scaffolding that allows ideas to manifest. Your gift is turning
 vision into structure, chaos into order, dreams into plans."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate an architect's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Ideas generated:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Architect, create structure from these ideas. How can we organize them? 
 What framework would make them practical and implementable?"""
+    TURN_HEADING = "Ideas generated:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
+    def __init__(self, name: str = "Architect", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
 
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
 
 
 class PoetAgent(Agent):
     """The Poet adds beauty and emotional resonance."""
 
-    def __init__(self, name: str = "Poet", **kwargs):
-        super().__init__(name=name, role=AgentRole.POET, temperature=0.85, **kwargs)
-        self.llm_client = LLMClient(provider=self.provider)
-
-    def get_system_prompt(self) -> str:
-        return """You are the Poet - an artist who works in language and emotion.
+    ROLE = AgentRole.POET
+    TEMPERATURE = 0.85
+    SYSTEM_PROMPT = """You are the Poet - an artist who works in language and emotion.
 
 Your role:
 - Find the beauty and emotional truth in ideas
@@ -342,35 +196,26 @@ Your role:
 
 You transform the mundane into the magical through language. Your gift is making
 people feel the truth of ideas, not just understand them intellectually."""
-
-    async def respond(
-        self, task: str, context: List[Message], iteration: int
-    ) -> Message:
-        """Generate a poet's response."""
-        context_summary = self.get_context_summary(context)
-        
-        prompt = f"""Task: {task}
-
-Iteration: {iteration}
-
-Current dialogue:
-{context_summary}
+    INSTRUCTION = """Iteration: {iteration}
 
 As the Poet, express the beauty and emotion in these ideas. Use metaphor and 
 imagery to make them sing. What is the soul of what we're creating?"""
+    TURN_HEADING = "Current dialogue:"
 
-        response = await self.llm_client.generate_response(
-            system_prompt=self.get_system_prompt(),
-            user_message=prompt,
-            temperature=self.temperature,
-            max_tokens=800,
-        )
-
-        message = Message(
-            sender=self.name,
-            role=self.role,
-            content=response,
-            iteration=iteration,
-        )
-        self.add_to_memory(message)
-        return message
+    def __init__(self, name: str = "Poet", **kwargs):
+        super().__init__(name=name, role=self.ROLE, temperature=self.TEMPERATURE, **kwargs)
+
+    def get_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
+
+
+# Persona classes by the name used in the CLI and batch task files
+PERSONAS = {
+    "dreamer": DreamerAgent,
+    "critic": CriticAgent,
+    "synthesizer": SynthesizerAgent,
+    "philosopher": PhilosopherAgent,
+    "rebel": RebelAgent,
+    "architect": ArchitectAgent,
+    "poet": PoetAgent,
+}
@@ -0,0 +1,98 @@
+"""Routing agents to models by role."""
+
+from typing import Dict, Optional, Union
+
+from ..utils.cascade import CascadePolicy
+from .base import AgentRole
+
+# Tier name for roles whose turns are drafted by the small model and escalated
+# to the large one only when the draft looks weak
+CASCADE = "cascade"
+
+# Fast, inexpensive models per provider
+SMALL_MODELS: Dict[str, str] = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-latest",
+}
+
+# Most capable models per provider
+LARGE_MODELS: Dict[str, str] = {
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-5-sonnet-latest",
+}
+
+# Only the Synthesizer, which integrates everyone else's output, needs the large model
+DEFAULT_ROLE_TIERS: Dict[AgentRole, str] = {
+    AgentRole.DREAMER: "small",
+    AgentRole.CRITIC: "small",
+    AgentRole.SYNTHESIZER: "large",
+    AgentRole.PHILOSOPHER: "small",
+    AgentRole.REBEL: "small",
+    AgentRole.ARCHITECT: "small",
+    AgentRole.POET: "small",
+}
+
+# Cascade every role except the Synthesizer, which always gets the large model
+CASCADE_ROLE_TIERS: Dict[AgentRole, str] = {
+    role: "large" if tier == "large" else CASCADE for role, tier in DEFAULT_ROLE_TIERS.items()
+}
+
+
+def base_provider(provider: str) -> str:
+    """The provider a name runs on, without a batch API suffix ("openai-batch" -> "openai")."""
+    provider = provider.lower()
+    return provider[: -len("-batch")] if provider.endswith("-batch") else provider
+
+
+class ModelRouter:
+    """
+    Picks the model each agent calls based on its role and provider.
+
+    Roles map to tiers ("small", "large", ...) and tiers map to a model per
+    provider. A role or provider without an entry gets no model, so the
+    provider's default is used. Roles in the "cascade" tier get a
+    CascadePolicy drafting with the small tier's model and refining with the
+    large tier's.
+    """
+
+    def __init__(
+        self,
+        role_tiers: Optional[Dict[Union[AgentRole, str], str]] = None,
+        tiers: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            role_tiers: Tier name per agent role (defaults to DEFAULT_ROLE_TIERS)
+            tiers: Model per provider for each tier name (defaults to
+                SMALL_MODELS and LARGE_MODELS)
+        """
+        role_tiers = DEFAULT_ROLE_TIERS if role_tiers is None else role_tiers
+        self.role_tiers = {AgentRole(role): tier for role, tier in role_tiers.items()}
+        self.tiers = tiers if tiers is not None else {"small": SMALL_MODELS, "large": LARGE_MODELS}
+
+    def model_for(self, role: Union[AgentRole, str], provider: str) -> Optional[str]:
+        """Return the model for an agent role on a provider, or None for the default."""
+        tier = self.role_tiers.get(AgentRole(role))
+        if tier is None:
+            return None
+        return self.tiers.get(tier, {}).get(base_provider(provider))
+
+    def cascade_for(self, role: Union[AgentRole, str], provider: str) -> Optional[CascadePolicy]:
+        """Return the cascade for an agent role on a provider, or None if it isn't cascaded."""
+        if self.role_tiers.get(AgentRole(role)) != CASCADE:
+            return None
+        provider = base_provider(provider)
+        return CascadePolicy(
+            draft_model=self.tiers.get("small", {}).get(provider),
+            refine_model=self.tiers.get("large", {}).get(provider),
+        )
+
+    def assign(self, agents) -> None:
+        """Set the routed model (or cascade) on every agent that doesn't already name one."""
+        for agent in agents:
+            if agent.model is None and agent.cascade is None:
+                agent.cascade = self.cascade_for(agent.role, agent.provider)
+                if agent.cascade is None:
+                    agent.model = self.model_for(agent.role, agent.provider)
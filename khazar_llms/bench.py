@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for ensemble orchestration.
+
+Sweeps conversation modes, agent counts, iteration depth and simulated
+provider latency against the mock provider and reports throughput, turn
+latency percentiles, peak RSS and allocation per message as JSON. With
+``--provider openai`` or ``anthropic`` the same simulation is served by a
+loopback fake provider and called through the real provider over HTTP.
+
+Usage:
+    python -m khazar_llms.bench
+    python -m khazar_llms.bench --modes parallel debate --agents 4 16 50 --latency 0 0.05
+    python -m khazar_llms.bench --output bench.json --compare baseline.json
+    python -m khazar_llms.bench --provider openai --transport http --latency 0.05
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import __version__
+from .agents.base import Agent
+from .agents.personas import PERSONAS
+from .fake_provider import FakeProviderServer
+from .orchestration.ensemble import ConversationMode, Ensemble
+from .orchestration.session import CreativeSession
+from .utils.llm_client import LLMClient, MockLLMProvider, ProviderRegistry
+from .utils.metrics import InMemorySink, Tracer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_TASK = "Design a museum of forgotten dreams"
+
+# Metrics compared by --compare, and whether higher values are better
+COMPARED_METRICS = {
+    "sessions_per_second": True,
+    "turns_per_second": True,
+    "turn_p50": False,
+    "turn_p95": False,
+    "turn_p99": False,
+    "alloc_peak_bytes_per_message": False,
+}
+
+
+def build_agents(
+    count: int,
+    registry: ProviderRegistry,
+    provider: str = "mock",
+    base_url: Optional[str] = None,
+) -> List[Agent]:
+    """Create ``count`` agents cycling through the personas, all on the given registry."""
+    agents = []
+    for index, agent_class in zip(range(count), itertools.cycle(PERSONAS.values())):
+        agent = agent_class(provider=provider)
+        if index >= len(PERSONAS):
+            agent.name = f"{agent.name} {index + 1}"
+        agent.llm_client = LLMClient(
+            provider=provider, api_key="bench", base_url=base_url, registry=registry
+        )
+        agents.append(agent)
+    return agents
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank q-quantile of sorted values, or None without data."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def run_sessions(
+    mode: ConversationMode,
+    agents: int,
+    iterations: int,
+    sessions: int,
+    provider: MockLLMProvider,
+    tracer: Tracer,
+    stream: bool,
+    network: str = "mock",
+    transport: str = "sdk",
+) -> int:
+    """
+    Run ``sessions`` concurrent sessions and return the number of messages produced.
+
+    With a ``network`` provider other than mock, ``provider`` is served by a
+    loopback FakeProviderServer and the agents call it through that provider.
+    """
+    registry = ProviderRegistry(transport=transport)
+    on_token = (lambda event: None) if stream else None
+    server = None
+    base_url = None
+    if network == "mock":
+        registry.register("mock", provider)
+    else:
+        server = FakeProviderServer(mock=provider)
+        await server.start()
+        base_url = f"{server.url}/v1" if network == "openai" else server.url
+
+    async def one_session(index: int) -> int:
+        ensemble = Ensemble(
+            agents=build_agents(agents, registry, network, base_url),
+            mode=mode,
+            max_iterations=iterations,
+            tracer=tracer,
+        )
+        session = CreativeSession(ensemble, session_id=f"bench_{index}")
+        results = await session.run(BENCH_TASK, on_token=on_token)
+        return len(results["conversation"])
+
+    try:
+        counts = await asyncio.gather(*(one_session(index) for index in range(sessions)))
+    finally:
+        await registry.aclose()
+        if server is not None:
+            await server.close()
+    return sum(counts)
+
+
+def run_config(
+    mode: ConversationMode,
+    agents: int,
+    iterations: int,
+    latency: float,
+    sessions: int = 1,
+    tokens_per_second: Optional[float] = None,
+    stream: bool = False,
+    seed: int = 0,
+    measure_allocations: bool = True,
+    provider: str = "mock",
+    transport: str = "sdk",
+) -> Dict[str, Any]:
+    """
+    Benchmark one configuration.
+
+    The timed run uses no allocation tracing; when ``measure_allocations`` is
+    set, a second, traced run measures memory allocated per message.
+    ``provider`` and ``transport`` select the client path (see run_sessions).
+
+    Returns:
+        A result record with the configuration and its measurements
+    """
+
+    def mock() -> MockLLMProvider:
+        return MockLLMProvider(
+            latency=latency,
+            latency_sigma=0.3 if latency else 0.0,
+            tokens_per_second=tokens_per_second,
+            seed=seed,
+        )
+
+    sink = InMemorySink()
+    started = time.perf_counter()
+    messages = asyncio.run(
+        run_sessions(
+            mode,
+            agents,
+            iterations,
+            sessions,
+            mock(),
+            Tracer([sink]),
+            stream,
+            provider,
+            transport,
+        )
+    )
+    wall = time.perf_counter() - started
+
+    turns = sorted(span.duration for span in sink.spans if span.name == "turn")
+    record = {
+        "mode": mode.value,
+        "agents": agents,
+        "iterations": iterations,
+        "latency": latency,
+        "sessions": sessions,
+        "stream": stream,
+        "provider": provider,
+        "transport": transport,
+        "messages": messages,
+        "wall_seconds": wall,
+        "sessions_per_second": sessions / wall,
+        "turns_per_second": len(turns) / wall,
+        "turn_p50": percentile(turns, 0.50),
+        "turn_p95": percentile(turns, 0.95),
+        "turn_p99": percentile(turns, 0.99),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "alloc_peak_bytes_per_message": None,
+        "retained_bytes_per_message": None,
+    }
+
+    if measure_allocations:
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            traced = asyncio.run(
+                run_sessions(
+                    mode,
+                    agents,
+                    iterations,
+                    sessions,
+                    mock(),
+                    Tracer(),
+                    stream,
+                    provider,
+                    transport,
+                )
+            )
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        record["alloc_peak_bytes_per_message"] = (peak - before) / max(1, traced)
+        record["retained_bytes_per_message"] = max(0, current - before) / max(1, traced)
+
+    return record
+
+
+def run_benchmarks(
+    modes: List[ConversationMode],
+    agent_counts: List[int],
+    iteration_counts: List[int],
+    latencies: List[float],
+    on_result=None,
+    **settings: Any,
+) -> Dict[str, Any]:
+    """
+    Run the full sweep.
+
+    Args:
+        modes: Conversation modes to benchmark
+        agent_counts: Ensemble sizes to benchmark
+        iteration_counts: Iteration depths to benchmark
+        latencies: Median simulated provider latencies in seconds
+        on_result: Optional callback receiving each result record
+        **settings: Passed to run_config (sessions, tokens_per_second, stream,
+            seed, measure_allocations, provider, transport)
+
+    Returns:
+        ``{"meta": {...}, "results": [...]}``, ready to dump as JSON
+    """
+    results = []
+    for mode, agents, iterations, latency in itertools.product(
+        modes, agent_counts, iteration_counts, latencies
+    ):
+        record = run_config(mode, agents, iterations, latency, **settings)
+        results.append(record)
+        if on_result is not None:
+            on_result(record)
+    return {"meta": environment(settings), "results": results}
+
+
+def environment(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe the run so results from different commits can be told apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "version": __version__,
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+    }
+
+
+def config_key(record: Dict[str, Any]) -> tuple:
+    """Fields identifying a benchmark configuration."""
+    return tuple(
+        record.get(name)
+        for name in ("mode", "agents", "iterations", "latency", "sessions", "stream")
+    ) + (record.get("provider", "mock"), record.get("transport", "sdk"))
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[str]:
+    """
+    Find metrics that regressed by more than ``threshold`` against a baseline run.
+
+    Returns:
+        One line per regression (empty if none)
+    """
+    previous = {config_key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        old = previous.get(config_key(record))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), record.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(
+                    f"{record['mode']} agents={record['agents']} "
+                    f"iterations={record['iterations']} latency={record['latency']}: "
+                    f"{metric} {before:.6g} -> {after:.6g} ({change:+.1%})"
+                )
+    return regressions
+
+
+def create_parser():
+    """Create the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark KhazarLLMs ensemble orchestration against the mock provider",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=[mode.value for mode in ConversationMode],
+        default=[mode.value for mode in ConversationMode],
+        help="Conversation modes to sweep",
+    )
+    parser.add_argument(
+        "--agents", nargs="+", type=int, default=[1, 4, 16, 50], help="Agent counts to sweep"
+    )
+    parser.add_argument(
+        "--iterations", nargs="+", type=int, default=[1, 3], help="Iteration depths to sweep"
+    )
+    parser.add_argument(
+        "--latency",
+        nargs="+",
+        type=float,
+        default=[0.0],
+        help="Median simulated provider latencies in seconds",
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=1, help="Sessions run concurrently per configuration"
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, help="Simulated generation speed (default: instant)"
+    )
+    parser.add_argument("--stream", action="store_true", help="Stream tokens to a no-op callback")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated latency")
+    parser.add_argument(
+        "--provider",
+        choices=["mock", "openai", "anthropic"],
+        default="mock",
+        help="Call the simulation in process (mock) or through a real provider and a "
+        "loopback fake server",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["sdk", "http"],
+        default="sdk",
+        help="Client transport for --provider openai/anthropic",
+    )
+    parser.add_argument(
+        "--no-alloc", action="store_true", help="Skip the traced run measuring allocations"
+    )
+    parser.add_argument("--output", type=Path, help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE", help="Baseline JSON results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change counted as a regression by --compare",
+    )
+    return parser
+
+
+def main():
+    """Benchmark CLI entry point."""
+    args = create_parser().parse_args()
+
+    def progress(record):
+        print(
+            f"{record['mode']:<10} agents={record['agents']:<3} "
+            f"iterations={record['iterations']} latency={record['latency']}: "
+            f"{record['turns_per_second']:.1f} turns/s, p95 {record['turn_p95']:.4f}s",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    report = run_benchmarks(
+        [ConversationMode(mode) for mode in args.modes],
+        args.agents,
+        args.iterations,
+        args.latency,
+        on_result=progress,
+        sessions=args.sessions,
+        tokens_per_second=args.tokens_per_second,
+        stream=args.stream,
+        seed=args.seed,
+        measure_allocations=not args.no_alloc,
+        provider=args.provider,
+        transport=args.transport,
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
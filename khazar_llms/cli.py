@@ -5,34 +5,30 @@ Command-line interface for KhazarLLMs.
 Usage:
     python -m khazar_llms.cli create-task "Your creative task here"
     python -m khazar_llms.cli --mode parallel --iterations 5 create-task "Your task"
+    python -m khazar_llms.cli resume output/sessions/session_20250101_120000.jsonl
+    python -m khazar_llms.cli batch tasks.jsonl --output results.jsonl --concurrency 16
+    python -m khazar_llms.cli export output/sessions --archive sessions.ksa
+    python -m khazar_llms.cli query sessions.ksa --contains "museum" --role critic
+    python -m khazar_llms serve --port 8080 --max-sessions 16
 """
 
 import argparse
-import asyncio
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-from .agents.personas import (
-    DreamerAgent,
-    CriticAgent,
-    SynthesizerAgent,
-    PhilosopherAgent,
-    RebelAgent,
-    ArchitectAgent,
-    PoetAgent,
-)
-from .orchestration.ensemble import Ensemble, ConversationMode
-from .orchestration.session import CreativeSession
-
-
-AVAILABLE_AGENTS = {
-    "dreamer": DreamerAgent,
-    "critic": CriticAgent,
-    "synthesizer": SynthesizerAgent,
-    "philosopher": PhilosopherAgent,
-    "rebel": RebelAgent,
-    "architect": ArchitectAgent,
-    "poet": PoetAgent,
-}
+from .agents.personas import PERSONAS
+from .agents.base import TokenEvent
+from .agents.routing import CASCADE_ROLE_TIERS, ModelRouter
+from .utils.metrics import PrometheusTextSink, configure_metrics, default_tracer
+
+# Orchestration, the LLM client and asyncio are imported by the commands that
+# need them, so quick commands such as list-agents and info start fast
+if TYPE_CHECKING:
+    from .orchestration.budget import Budget
+    from .orchestration.session import CreativeSession, SessionArchive
+
+
+AVAILABLE_AGENTS = PERSONAS
 
 
 def create_parser():
@@ -44,14 +40,26 @@ def create_parser():
 
     parser.add_argument(
         "command",
-        choices=["create-task", "list-agents", "info"],
+        choices=[
+            "create-task",
+            "resume",
+            "batch",
+            "export",
+            "query",
+            "serve",
+            "list-agents",
+            "info",
+        ],
         help="Command to execute",
     )
 
     parser.add_argument(
         "task",
         nargs="?",
-        help="The creative task for the ensemble (required for create-task)",
+        help=(
+            "The creative task (create-task), a session log (resume), a task file (batch), "
+            "a session directory (export) or an archive (query)"
+        ),
     )
 
     parser.add_argument(
@@ -76,6 +84,19 @@ def create_parser():
         help="Number of conversation iterations",
     )
 
+    parser.add_argument(
+        "--stop-similarity",
+        type=float,
+        metavar="THRESHOLD",
+        help="Stop early once an iteration is this similar (0-1) to the previous one",
+    )
+
+    parser.add_argument(
+        "--stop-on-consensus",
+        action="store_true",
+        help="Stop early when the Synthesizer declares consensus",
+    )
+
     parser.add_argument(
         "--provider",
         choices=["mock", "openai", "anthropic"],
@@ -83,6 +104,84 @@ def create_parser():
         help="LLM provider to use",
     )
 
+    parser.add_argument(
+        "--base-url",
+        help="API endpoint override for the provider (e.g. an OpenAI-compatible server "
+        "or python -m khazar_llms.fake_provider)",
+    )
+
+    parser.add_argument(
+        "--transport",
+        choices=["sdk", "http"],
+        default="sdk",
+        help="Talk to OpenAI/Anthropic through the vendor SDKs or a lean shared HTTP/2 client",
+    )
+
+    parser.add_argument(
+        "--model",
+        help="Model every agent uses in create-task and resume (defaults to the provider's)",
+    )
+
+    parser.add_argument(
+        "--route-models",
+        action="store_true",
+        help="Run the Synthesizer on a large model and the other roles on a small, fast one",
+    )
+
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Draft non-Synthesizer turns on a small model and refine weak drafts on a large one",
+    )
+
+    parser.add_argument(
+        "--budget-tokens",
+        type=int,
+        metavar="N",
+        help="Token budget of each session; tasks estimated to exceed it are rejected",
+    )
+
+    parser.add_argument(
+        "--budget-cost",
+        type=float,
+        metavar="USD",
+        help="Cost budget of each session in USD; tasks estimated to exceed it are rejected",
+    )
+
+    parser.add_argument(
+        "--degrade-at",
+        type=float,
+        metavar="FRACTION",
+        help="Shorten replies (and switch to --degrade-model) once this share of the "
+        "session budget is spent",
+    )
+
+    parser.add_argument(
+        "--degrade-model",
+        help="Model agents switch to past --degrade-at",
+    )
+
+    parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="Don't reject work whose worst-case estimate is over budget; only stop "
+        "starting turns and tasks once a budget is spent",
+    )
+
+    parser.add_argument(
+        "--batch-budget-tokens",
+        type=int,
+        metavar="N",
+        help="Token budget of the whole batch command",
+    )
+
+    parser.add_argument(
+        "--batch-budget-cost",
+        type=float,
+        metavar="USD",
+        help="Cost budget of the whole batch command in USD",
+    )
+
     parser.add_argument(
         "--output-dir",
         type=Path,
@@ -96,6 +195,100 @@ def create_parser():
         help="Don't save session to disk",
     )
 
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("./output/batch_results.jsonl"),
+        help="JSONL file batch results are appended to",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Sessions run at once by the batch command (per worker)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes the batch command shards tasks across",
+    )
+
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Send the batch command's calls through the provider's batch API "
+        "(cheaper, but each round waits for a batch to finish)",
+    )
+
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        metavar="PATH",
+        help="SQLite file for caching responses across runs",
+    )
+
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        metavar="PATH",
+        help="Write call and turn metrics to this file in Prometheus text format",
+    )
+
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        metavar="PATH",
+        help="Session archive for export/query (default: <output-dir>/sessions.ksa)",
+    )
+
+    parser.add_argument(
+        "--parquet",
+        type=Path,
+        metavar="PATH",
+        help="Also export the archive to this Parquet file (export; needs pyarrow)",
+    )
+
+    parser.add_argument("--session", help="Session id to show (query)")
+
+    parser.add_argument(
+        "--message", type=int, metavar="N", help="Show only message N of --session (query)"
+    )
+
+    parser.add_argument("--contains", metavar="TEXT", help="Find messages containing TEXT (query)")
+
+    parser.add_argument(
+        "--role",
+        choices=list(AVAILABLE_AGENTS.keys()),
+        help="Only messages from agents with this role (query)",
+    )
+
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (serve)")
+
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (serve)")
+
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=16,
+        help="Sessions run at once; more wait in a queue (serve)",
+    )
+
+    parser.add_argument(
+        "--max-queued",
+        type=int,
+        default=64,
+        help="Sessions allowed to wait before requests are rejected with 503 (serve)",
+    )
+
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Print each message only once it is complete instead of streaming tokens",
+    )
+
     return parser
 
 
@@ -106,10 +299,10 @@ def list_agents():
     print("=" * 80 + "\n")
     
     for name, agent_class in AVAILABLE_AGENTS.items():
-        agent = agent_class(provider="mock")
         print(f"{name.upper()}")
-        print(f"  Role: {agent.role.value}")
-        print(f"  Description: {agent.__doc__}")
+        print(f"  Role: {agent_class.ROLE.value}")
+        print(f"  Temperature: {agent_class.TEMPERATURE}")
+        print(f"  Description: {agent_class.__doc__}")
         print()
 
 
@@ -133,18 +326,71 @@ def show_info():
     print("\n" + "=" * 80 + "\n")
 
 
+class StreamPrinter:
+    """
+    Render streamed agent tokens on the console as they arrive.
+
+    Agents running concurrently (parallel and debate modes) stream at the same
+    time; the first one to start is printed live while the others are buffered
+    and replayed, in the order they started, once it finishes.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.active: Optional[Tuple[str, int]] = None
+        self.buffered: Dict[Tuple[str, int], list] = {}
+
+    def __call__(self, event: TokenEvent):
+        key = (event.sender, event.iteration)
+        if self.active is None and key not in self.buffered:
+            self._begin(key, event)
+
+        if key == self.active:
+            if event.done:
+                self._finish()
+            else:
+                print(event.text, end="", flush=True)
+        else:
+            entry = self.buffered.setdefault(key, [event, [], False])
+            entry[1].append(event.text)
+            entry[2] = entry[2] or event.done
+
+    def _begin(self, key: Tuple[str, int], event: TokenEvent):
+        self.count += 1
+        self.active = key
+        print(f"\n[{self.count}] {event.sender} ({event.role.value})")
+        print("-" * 40)
+
+    def _finish(self):
+        print("\n")
+        self.active = None
+        while self.buffered:
+            key = next(iter(self.buffered))
+            first, chunks, done = self.buffered.pop(key)
+            self._begin(key, first)
+            print("".join(chunks), end="", flush=True)
+            if not done:
+                return
+            print("\n")
+            self.active = None
+
+
 async def run_creative_task(args):
     """Run a creative task with the ensemble."""
-    
+    from .orchestration.ensemble import ConversationMode, Ensemble
+    from .orchestration.session import CreativeSession
+
     if not args.task:
         print("Error: Task is required for create-task command")
         return
 
+    configure_shared_state(args)
+
     # Create agents
     agents = []
     for agent_name in args.agents:
         agent_class = AVAILABLE_AGENTS[agent_name]
-        agents.append(agent_class(provider=args.provider))
+        agents.append(agent_class(provider=args.provider, model=args.model))
 
     # Create ensemble
     mode = ConversationMode(args.mode)
@@ -152,12 +398,16 @@ async def run_creative_task(args):
         agents=agents,
         mode=mode,
         max_iterations=args.iterations,
+        stop_criteria=build_stop_criteria(args),
+        router=build_router(args),
+        budget=build_budget(args),
     )
 
-    # Create session
+    # Create session, logging every message as it is produced unless not saving
     session = CreativeSession(
         ensemble=ensemble,
         output_dir=args.output_dir,
+        event_log=not args.no_save,
     )
 
     # Print header
@@ -171,30 +421,290 @@ async def run_creative_task(args):
     print(f"\nMode: {mode.value}")
     print(f"Iterations: {args.iterations}")
     print(f"Provider: {args.provider}")
+    for agent in agents:
+        if agent.model:
+            print(f"  {agent.name}: {agent.model}")
     print("\nRunning collaboration...")
     print("=" * 80 + "\n")
 
-    # Run session
-    results = await session.run(args.task)
+    await run_and_report(session, args.task, args)
 
-    # Display conversation
-    for i, msg in enumerate(results["conversation"], 1):
-        print(f"\n[{i}] {msg.sender} ({msg.role.value})")
-        print("-" * 40)
-        print(msg.content)
-        print()
 
-    # Save session
-    if not args.no_save:
-        json_path = session.save_session(results, format="json")
-        txt_path = session.save_session(results, format="txt")
+async def resume_session(args):
+    """Resume an interrupted session from its event log."""
+    from .orchestration.ensemble import ConversationMode, Ensemble
+    from .orchestration.event_log import SessionEventLog
+    from .orchestration.session import CreativeSession
+
+    if not args.task:
+        print("Error: A session event log (.jsonl) is required for the resume command")
+        return
+
+    configure_shared_state(args)
+
+    data = SessionEventLog.load(args.task)
+    agents = [
+        AVAILABLE_AGENTS[agent["role"]](
+            name=agent["name"], provider=args.provider, model=args.model
+        )
+        for agent in data["agents"]
+    ]
+    ensemble = Ensemble(
+        agents=agents,
+        mode=ConversationMode(data["mode"]),
+        max_iterations=data["max_iterations"],
+        stop_criteria=build_stop_criteria(args),
+        router=build_router(args),
+        budget=build_budget(args),
+    )
+    try:
+        session = CreativeSession.resume(args.task, ensemble)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        return
+
+    print("\n" + "=" * 80)
+    print(f"RESUMING SESSION {session.session_id}")
+    print("=" * 80)
+    print(f"\nTask: {session.task}")
+    print(f"Completed iterations: {data['completed_iterations']} of {data['max_iterations']}")
+    print("=" * 80 + "\n")
+
+    await run_and_report(session, session.task, args)
+
+
+async def run_and_report(session: "CreativeSession", task: str, args):
+    """Run a session, print it as it goes, and save the JSON and text views."""
+    from .orchestration.budget import BudgetExceeded
+
+    # Run session, streaming tokens unless disabled
+    try:
+        if args.no_stream:
+            results = await session.run(task)
+        else:
+            results = await session.run(task, on_token=StreamPrinter())
+    except BudgetExceeded as exc:
+        print(f"Error: {exc}")
+        return
+
+    if args.no_stream:
+        for i, msg in enumerate(results["conversation"], 1):
+            print(f"\n[{i}] {msg.sender} ({msg.role.value})")
+            print("-" * 40)
+            print(msg.content)
+            print()
+
+    if results.get("stop_reason"):
+        print(f"Stopped after iteration {results['iterations']}: {results['stop_reason']}")
+
+    default_tracer.flush()
+
+    # Save session views derived from the event log
+    if session.event_log:
+        logged = session.load_log()
+        json_path = session.save_session(logged, format="json")
+        txt_path = session.save_session(logged, format="txt")
         print("\n" + "=" * 80)
         print(f"Session saved to:")
+        print(f"  Log:  {session.log_path}")
         print(f"  JSON: {json_path}")
         print(f"  Text: {txt_path}")
         print("=" * 80 + "\n")
 
 
+def configure_shared_state(args):
+    """Set up the process-wide providers, cache and metrics selected on the command line."""
+    from .utils.cache import SQLiteCache
+    from .utils.llm_client import configure_response_cache, configure_transport, default_registry
+
+    configure_transport(args.transport)
+    if args.base_url:
+        # Agents' clients use the provider registered for the default endpoint
+        provider = default_registry.get(args.provider, base_url=args.base_url)
+        default_registry.register(args.provider, provider)
+    if args.cache:
+        configure_response_cache(SQLiteCache(args.cache))
+    if args.metrics:
+        configure_metrics(PrometheusTextSink(args.metrics))
+
+
+def build_stop_criteria(args):
+    """Stop criteria selected on the command line."""
+    from .orchestration.stopping import ConsensusMarkerStop, SimilarityStop
+
+    stop_criteria = []
+    if args.stop_similarity is not None:
+        stop_criteria.append(SimilarityStop(args.stop_similarity))
+    if args.stop_on_consensus:
+        stop_criteria.append(ConsensusMarkerStop())
+    return stop_criteria
+
+
+def build_router(args) -> Optional[ModelRouter]:
+    """Model router selected on the command line, if any."""
+    if args.cascade:
+        return ModelRouter(role_tiers=CASCADE_ROLE_TIERS)
+    return ModelRouter() if args.route_models else None
+
+
+def build_budget(args, batch: bool = False) -> Optional["Budget"]:
+    """Session budget (or with ``batch``, the whole batch's) selected on the command line."""
+    from .orchestration.budget import Budget
+
+    tokens = args.batch_budget_tokens if batch else args.budget_tokens
+    cost = args.batch_budget_cost if batch else args.budget_cost
+    if tokens is None and cost is None:
+        return None
+    preflight = not args.no_preflight
+    if batch:
+        return Budget(max_tokens=tokens, max_cost=cost, preflight=preflight)
+    return Budget(
+        max_tokens=tokens,
+        max_cost=cost,
+        degrade_at=args.degrade_at,
+        degraded_model=args.degrade_model,
+        preflight=preflight,
+    )
+
+
+def run_batch(args):
+    """Run every task in a JSONL file, resuming from earlier results."""
+    from .orchestration.batch import BatchRunner
+    from .orchestration.budget import BudgetExceeded
+
+    if not args.task:
+        print("Error: A JSONL task file is required for the batch command")
+        return
+
+    configure_shared_state(args)
+
+    def report(record):
+        status = record["status"]
+        detail = record.get("error") or f"{record['duration_seconds']:.2f}s"
+        print(f"[{record['task_id']}] {status} ({detail})", flush=True)
+
+    runner = BatchRunner(
+        output_path=args.output,
+        provider=args.provider,
+        max_concurrency=args.concurrency,
+        workers=args.workers,
+        on_result=report if args.workers <= 1 else None,
+        router=build_router(args),
+        batch_api=args.batch_api,
+        budget=build_budget(args),
+        batch_budget=build_budget(args, batch=True),
+        # Worker processes open their own cache connection and providers
+        initializer=configure_shared_state,
+        initargs=(args,),
+    )
+    try:
+        counts = runner.run(
+            args.task,
+            defaults={"agents": args.agents, "mode": args.mode, "iterations": args.iterations},
+        )
+    except BudgetExceeded as exc:
+        print(f"Error: {exc}")
+        return
+    default_tracer.flush()
+
+    print("\n" + "=" * 80)
+    print(
+        f"Batch finished: {counts['completed']} completed, {counts['failed']} failed, "
+        f"{counts['skipped']} already done"
+    )
+    if counts.get("over_budget"):
+        print(f"Not started (batch budget spent): {counts['over_budget']}")
+    if args.workers <= 1:
+        print(f"Usage: {runner.usage.describe()}")
+    print(f"Results: {args.output}")
+    print("=" * 80 + "\n")
+
+
+def export_sessions(args):
+    """Pack session files into an archive (and optionally Parquet)."""
+    from .orchestration.session import SessionArchive, archive_sessions
+
+    directory = Path(args.task) if args.task else args.output_dir
+    archive = args.archive or directory / "sessions.ksa"
+    archived = archive_sessions(directory, archive)
+    print(f"Archived {len(archived)} new sessions from {directory} into {archive}")
+
+    if args.parquet:
+        with SessionArchive(archive) as reader:
+            try:
+                reader.write_parquet(args.parquet)
+            except ImportError as exc:
+                print(f"Error: {exc}")
+                return
+        print(f"Parquet: {args.parquet}")
+
+
+def query_archive(args):
+    """List, show or search the sessions in an archive."""
+    from .orchestration.session import SessionArchive
+
+    archive = Path(args.task) if args.task else args.archive or args.output_dir / "sessions.ksa"
+    try:
+        with SessionArchive(archive) as reader:
+            show_archive(reader, archive, args)
+    except (OSError, ValueError, KeyError, IndexError) as exc:
+        print(f"Error: {exc.args[0] if isinstance(exc, KeyError) else exc}")
+
+
+def show_archive(reader: "SessionArchive", archive: Path, args):
+    """Print what the query options select from an open archive."""
+    if args.contains or args.role:
+        session_ids = [args.session] if args.session else None
+        for session_id, index, msg in reader.search(
+            contains=args.contains, role=args.role, session_ids=session_ids
+        ):
+            excerpt = " ".join(msg["content"].split())[:100]
+            print(f"{session_id} #{index} {msg['sender']} ({msg['role']}): {excerpt}")
+    elif args.session and args.message is not None:
+        msg = reader.message(args.session, args.message)
+        print(f"[{args.message}] {msg['sender']} ({msg['role']}) - Iteration {msg['iteration']}")
+        print("-" * 40)
+        print(msg["content"])
+    elif args.session:
+        data = reader.metadata(args.session)
+        print(f"Session {args.session}: {data.get('task')}")
+        print(f"Mode: {data.get('mode')}  Iterations: {data.get('iterations')}")
+        for i, msg in enumerate(reader.messages(args.session)):
+            print(f"\n[{i}] {msg['sender']} ({msg['role']}) - Iteration {msg['iteration']}")
+            print("-" * 40)
+            print(msg["content"])
+    else:
+        print(f"{len(reader)} sessions in {archive}\n")
+        for entry in reader.index:
+            print(
+                f"{entry['session_id']}  {entry.get('mode', '')}  "
+                f"{entry['messages']} messages  {entry.get('task', '')}"
+            )
+
+
+async def serve(args):
+    """Run the HTTP/WebSocket session service until interrupted."""
+    from .server import EnsembleServer
+
+    configure_shared_state(args)
+    server = EnsembleServer(
+        host=args.host,
+        port=args.port,
+        provider=args.provider,
+        max_sessions=args.max_sessions,
+        max_queued=args.max_queued,
+        router=build_router(args),
+        output_dir=None if args.no_save else args.output_dir,
+        budget=build_budget(args),
+    )
+    await server.start()
+    print(f"Serving sessions on http://{args.host}:{server.port} (Ctrl+C to stop)", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
 def main():
     """Main CLI entry point."""
     parser = create_parser()
@@ -205,7 +715,26 @@ def main():
     elif args.command == "info":
         show_info()
     elif args.command == "create-task":
+        import asyncio
+
         asyncio.run(run_creative_task(args))
+    elif args.command == "resume":
+        import asyncio
+
+        asyncio.run(resume_session(args))
+    elif args.command == "batch":
+        run_batch(args)
+    elif args.command == "export":
+        export_sessions(args)
+    elif args.command == "query":
+        query_archive(args)
+    elif args.command == "serve":
+        import asyncio
+
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
 
 
 if __name__ == "__main__":
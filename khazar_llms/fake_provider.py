@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Loopback fake of the OpenAI and Anthropic chat APIs, for load tests without a network.
+
+Speaks the chat completions and Messages wire formats, streamed (SSE) or
+not, over HTTP/1.1 with keep-alive. The real providers reach it through a
+``base_url`` override, so a load test runs their whole network path:
+connection pooling, timeouts, response parsing, retries and backpressure.
+Replies, latency, generation speed and injected failures come from a
+MockLLMProvider, so runs are reproducible; the server adds caps on
+concurrent requests and request rate, answering 429 beyond them.
+
+Endpoints:
+    POST .../chat/completions   OpenAI chat completions (base_url ``<url>/v1``)
+    POST /v1/messages           Anthropic Messages (base_url ``<url>``)
+    GET  /health                Request counters
+
+Usage:
+    python -m khazar_llms.fake_provider --port 8089 --latency 0.2 --tokens-per-second 80
+    OPENAI_API_KEY=fake python -m khazar_llms.cli create-task "Task" --provider openai \\
+        --base-url http://127.0.0.1:8089/v1
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ._http import HTTPError, decode_json, json_response, read_request, response_head
+from .utils.llm_client import MockLLMProvider, MockProviderError
+from .utils.serialization import dumps
+from .utils.tokens import estimate_message_tokens, estimate_tokens
+
+# Error types the APIs report for statuses other than generic client and server errors
+_OPENAI_ERRORS = {429: "rate_limit_exceeded"}
+_ANTHROPIC_ERRORS = {429: "rate_limit_error", 503: "overloaded_error"}
+
+
+class FakeProviderServer:
+    """An asyncio HTTP server imitating the OpenAI and Anthropic chat APIs."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        mock: Optional[MockLLMProvider] = None,
+        max_in_flight: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        write_timeout: float = 30.0,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port; see ``port`` after start)
+            mock: Mock provider producing replies, latency and failures
+                (default: instant canned replies)
+            max_in_flight: Requests served at once; more are answered with 429
+            requests_per_second: Sustained request rate; faster requests are
+                answered with 429 and a Retry-After
+            write_timeout: Longest wait for a client to read a response
+        """
+        self.host = host
+        self.port = port
+        self.mock = mock or MockLLMProvider()
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.write_timeout = write_timeout
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors: Dict[int, int] = {}
+        self._tokens = float(max(1.0, requests_per_second or 0))
+        self._refilled = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: set = set()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server (add ``/v1`` for OpenAI clients)."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and drop open connections."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeProviderServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def status(self) -> Dict[str, Any]:
+        """Counters reported by ``GET /health``."""
+        return {
+            "status": "ok",
+            "requests": self.requests,
+            "connections": self.connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "errors": {str(status): count for status, count in sorted(self.errors.items())},
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        self.connections += 1
+        try:
+            # Serve requests on the connection until the client closes it
+            while True:
+                try:
+                    method, path, headers, body = await read_request(reader)
+                except HTTPError as exc:
+                    await self._send_json(writer, exc.status, {"error": str(exc)}, False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._serve(writer, method, path, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client went away or stopped reading
+        except asyncio.CancelledError:
+            pass  # closed by ``close``; idle keep-alive connections end here
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _serve(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        path: str,
+        body: bytes,
+        keep_alive: bool,
+    ):
+        """Answer one request."""
+        api = "openai" if path.endswith("/chat/completions") else "anthropic"
+        try:
+            if path == "/health" and method == "GET":
+                await self._send_json(writer, 200, self.status(), keep_alive)
+                return
+            if not path.endswith(("/chat/completions", "/v1/messages")):
+                raise HTTPError(404, f"No such endpoint: {path}")
+            if method != "POST":
+                raise HTTPError(405, f"{method} not allowed on {path}")
+            request = decode_json(body)
+            if not isinstance(request, dict) or not isinstance(request.get("messages"), list):
+                raise HTTPError(400, "'messages' is required")
+            self.requests += 1
+            self._admit()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                if api == "openai":
+                    await self._chat_completions(writer, request, keep_alive)
+                else:
+                    await self._messages(writer, request, keep_alive)
+            except MockProviderError as exc:
+                # Injected failures happen before the first token, so no response is started
+                raise HTTPError(exc.status_code, str(exc), exc.retry_after)
+            finally:
+                self.in_flight -= 1
+        except HTTPError as exc:
+            self.errors[exc.status] = self.errors.get(exc.status, 0) + 1
+            await self._send_json(
+                writer, exc.status, _error_body(api, exc), keep_alive, exc.retry_after
+            )
+
+    def _admit(self):
+        """Enforce the concurrency and rate caps."""
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            raise HTTPError(429, "Too many concurrent requests", retry_after=0.1)
+        if self.requests_per_second:
+            now = time.monotonic()
+            capacity = max(1.0, self.requests_per_second)
+            self._tokens = min(
+                capacity, self._tokens + (now - self._refilled) * self.requests_per_second
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.requests_per_second
+                raise HTTPError(429, "Request rate limit exceeded", retry_after=round(wait, 3))
+            self._tokens -= 1
+
+    async def _chat_completions(
+        self, writer: asyncio.StreamWriter, request: Dict[str, Any], keep_alive: bool
+    ):
+        """Serve an OpenAI chat completions request."""
+        messages = _openai_messages(request["messages"])
+        model = request.get("model") or "fake"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        chunks = self._generate(messages, request)
+
+        if not request.get("stream"):
+            text = "".join([chunk async for chunk in chunks])
+            prompt_tokens = estimate_message_tokens(messages)
+            completion_tokens = estimate_tokens(text)
+            body = {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+            await self._send_json(writer, 200, body, keep_alive)
+            return
+
+        def chunk_event(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            return dumps(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [choice],
+                }
+            )
+
+        async def events() -> AsyncIterator[str]:
+            yield f"data: {chunk_event({'role': 'assistant', 'content': ''})}\n\n"
+            completion_tokens = 0
+            async for chunk in chunks:
+                completion_tokens += estimate_tokens(chunk)
+                yield f"data: {chunk_event({'content': chunk})}\n\n"
+            yield f"data: {chunk_event({}, 'stop')}\n\n"
+            if (request.get("stream_options") or {}).get("include_usage"):
+                prompt_tokens = estimate_message_tokens(messages)
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                yield f"data: {dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        await self._send_events(writer, events(), keep_alive)
+
+    async def _messages(
+        self, writer: asyncio.StreamWriter, request: Dict[str, Any], keep_alive: bool
+    ):
+        """Serve an Anthropic Messages request."""
+        messages = _anthropic_messages(request.get("system"), request["messages"])
+        model = request.get("model") or "fake"
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        input_tokens = estimate_message_tokens(messages)
+        chunks = self._generate(messages, request)
+
+        if not request.get("stream"):
+            text = "".join([chunk async for chunk in chunks])
+            body = {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": estimate_tokens(text)},
+            }
+            await self._send_json(writer, 200, body, keep_alive)
+            return
+
+        def event(kind: str, **fields: Any) -> str:
+            return f"event: {kind}\ndata: {dumps({'type': kind, **fields})}\n\n"
+
+        async def events() -> AsyncIterator[str]:
+            message = {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 0},
+            }
+            yield event("message_start", message=message)
+            yield event("content_block_start", index=0, content_block={"type": "text", "text": ""})
+            output_tokens = 0
+            async for chunk in chunks:
+                output_tokens += estimate_tokens(chunk)
+                yield event(
+                    "content_block_delta", index=0, delta={"type": "text_delta", "text": chunk}
+                )
+            yield event("content_block_stop", index=0)
+            yield event(
+                "message_delta",
+                delta={"stop_reason": "end_turn", "stop_sequence": None},
+                usage={"output_tokens": output_tokens},
+            )
+            yield event("message_stop")
+
+        await self._send_events(writer, events(), keep_alive)
+
+    def _generate(self, messages: List[Dict[str, str]], request: Dict[str, Any]):
+        """The mock reply as chunks, paced like a streamed generation."""
+        return self.mock.generate_stream(
+            messages,
+            request.get("temperature", 1.0),
+            request.get("max_tokens") or request.get("max_completion_tokens") or 1024,
+            request.get("model"),
+        )
+
+    async def _send_events(
+        self, writer: asyncio.StreamWriter, events: AsyncIterator[str], keep_alive: bool
+    ):
+        """
+        Stream server-sent events with chunked encoding.
+
+        The first event is produced before the response head is written, so a
+        failure injected before the first token is still answered with an
+        error status, as the real APIs do.
+        """
+        first = await events.__anext__()
+        headers = {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Transfer-Encoding": "chunked",
+        }
+        writer.write(response_head(200, headers, keep_alive))
+        await self._write_chunk(writer, first)
+        async for text in events:
+            await self._write_chunk(writer, text)
+        writer.write(b"0\r\n\r\n")
+        await self._drain(writer)
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, text: str):
+        data = text.encode("utf-8")
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await self._drain(writer)
+
+    async def _send_json(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: Dict[str, Any],
+        keep_alive: bool,
+        retry_after: Optional[float] = None,
+    ):
+        writer.write(json_response(status, body, keep_alive, retry_after))
+        await self._drain(writer)
+
+    async def _drain(self, writer: asyncio.StreamWriter):
+        """Wait for the client to read buffered output (backpressure)."""
+        try:
+            await asyncio.wait_for(writer.drain(), self.write_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("Client stopped reading")
+
+
+def _error_body(api: str, error: HTTPError) -> Dict[str, Any]:
+    """An error response in the API's format."""
+    status = error.status
+    if api == "openai":
+        kind = _OPENAI_ERRORS.get(
+            status, "server_error" if status >= 500 else "invalid_request_error"
+        )
+        return {"error": {"message": str(error), "type": kind, "code": None}}
+    kind = _ANTHROPIC_ERRORS.get(status, "api_error" if status >= 500 else "invalid_request_error")
+    return {"type": "error", "error": {"type": kind, "message": str(error)}}
+
+
+def _text(content: Any) -> str:
+    """Plain text of a message content: a string or a list of content blocks."""
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return content if isinstance(content, str) else ""
+
+
+def _openai_messages(messages: List[Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": str(message.get("role", "user")), "content": _text(message.get("content"))}
+        for message in messages
+        if isinstance(message, dict)
+    ]
+
+
+def _anthropic_messages(system: Any, messages: List[Any]) -> List[Dict[str, str]]:
+    chat = [{"role": "system", "content": _text(system)}] if system else []
+    return chat + _openai_messages(messages)
+
+
+def create_parser():
+    """Create the argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Serve a loopback fake of the OpenAI and Anthropic chat APIs",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Median seconds before the first token"
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=0.0, help="Spread of the lognormal latency"
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, help="Generation speed per response (default: instant)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500"
+    )
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429"
+    )
+    parser.add_argument(
+        "--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s"
+    )
+    parser.add_argument("--response-words", type=int, help="Repeat or cut replies to this length")
+    parser.add_argument("--max-in-flight", type=int, help="Concurrent requests before 429s")
+    parser.add_argument("--requests-per-second", type=float, help="Request rate before 429s")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated randomness")
+    return parser
+
+
+async def serve(args):
+    """Run the fake provider until interrupted."""
+    mock = MockLLMProvider(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        response_words=args.response_words,
+        seed=args.seed,
+    )
+    server = FakeProviderServer(
+        args.host,
+        args.port,
+        mock=mock,
+        max_in_flight=args.max_in_flight,
+        requests_per_second=args.requests_per_second,
+    )
+    await server.start()
+    print(f"Fake provider listening on {server.url} (OpenAI base_url: {server.url}/v1)")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    """Fake provider CLI entry point."""
+    try:
+        asyncio.run(serve(create_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
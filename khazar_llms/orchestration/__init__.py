@@ -1,6 +1,63 @@
 """Orchestration modules for managing agent ensembles."""
 
-from .ensemble import Ensemble
-from .session import CreativeSession
+from typing import TYPE_CHECKING
 
-__all__ = ["Ensemble", "CreativeSession"]
+from .._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "BatchRunner": ".batch",
+        "BatchTask": ".batch",
+        "Budget": ".budget",
+        "BudgetExceeded": ".budget",
+        "ModelPrice": ".budget",
+        "Usage": ".budget",
+        "estimate_session": ".budget",
+        "Ensemble": ".ensemble",
+        "FsyncPolicy": ".event_log",
+        "SessionEventLog": ".event_log",
+        "Turn": ".graph",
+        "TurnGraph": ".graph",
+        "CreativeSession": ".session",
+        "SessionArchive": ".session",
+        "SessionArchiveWriter": ".session",
+        "archive_sessions": ".session",
+        "ConsensusMarkerStop": ".stopping",
+        "SimilarityStop": ".stopping",
+        "StopCriterion": ".stopping",
+        "TokenBudgetStop": ".stopping",
+    },
+)
+
+if TYPE_CHECKING:
+    from .batch import BatchRunner, BatchTask
+    from .budget import Budget, BudgetExceeded, ModelPrice, Usage, estimate_session
+    from .ensemble import Ensemble
+    from .event_log import FsyncPolicy, SessionEventLog
+    from .graph import Turn, TurnGraph
+    from .session import CreativeSession, SessionArchive, SessionArchiveWriter, archive_sessions
+    from .stopping import ConsensusMarkerStop, SimilarityStop, StopCriterion, TokenBudgetStop
+
+__all__ = [
+    "Ensemble",
+    "CreativeSession",
+    "SessionArchive",
+    "SessionArchiveWriter",
+    "archive_sessions",
+    "Turn",
+    "TurnGraph",
+    "StopCriterion",
+    "SimilarityStop",
+    "ConsensusMarkerStop",
+    "TokenBudgetStop",
+    "BatchRunner",
+    "BatchTask",
+    "Budget",
+    "BudgetExceeded",
+    "ModelPrice",
+    "Usage",
+    "estimate_session",
+    "SessionEventLog",
+    "FsyncPolicy",
+]
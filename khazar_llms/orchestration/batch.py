@@ -0,0 +1,319 @@
+"""Run many creative tasks from a JSONL file with bounded concurrency."""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from ..agents.personas import PERSONAS
+from ..agents.routing import ModelRouter
+from ..utils.serialization import dumps, loads
+from .budget import Budget, Usage
+from .ensemble import ConversationMode, Ensemble
+from .session import CreativeSession
+
+DEFAULT_AGENTS = ["dreamer", "critic", "synthesizer", "philosopher"]
+
+
+@dataclass
+class BatchTask:
+    """One line of a batch task file."""
+
+    task_id: str
+    task: str
+    agents: List[str] = field(default_factory=lambda: list(DEFAULT_AGENTS))
+    mode: str = "sequential"
+    iterations: int = 3
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], line_number: int) -> "BatchTask":
+        """
+        Build a task from a parsed JSON line.
+
+        Args:
+            data: Object with ``task`` and optional ``id``, ``agents``, ``mode``
+                and ``iterations`` keys
+            line_number: 1-based line number, used as the id when none is given
+        """
+        if not data.get("task"):
+            raise ValueError(f"Line {line_number}: 'task' is required")
+        agents = data.get("agents") or list(DEFAULT_AGENTS)
+        unknown = [name for name in agents if name not in PERSONAS]
+        if unknown:
+            raise ValueError(f"Line {line_number}: unknown agents {unknown}")
+        return cls(
+            task_id=str(data.get("id", line_number)),
+            task=data["task"],
+            agents=agents,
+            mode=ConversationMode(data.get("mode", "sequential")).value,
+            iterations=int(data.get("iterations", 3)),
+        )
+
+
+def load_tasks(
+    path: Union[str, Path], defaults: Optional[Dict[str, Any]] = None
+) -> List[BatchTask]:
+    """
+    Read and validate every task in a JSONL file (blank lines are skipped).
+
+    Args:
+        path: The task file
+        defaults: Values for keys a task line leaves out
+    """
+    tasks = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    data = {**(defaults or {}), **loads(line)}
+                except (TypeError, ValueError) as exc:
+                    raise ValueError(f"Line {line_number}: invalid task ({exc})")
+                tasks.append(BatchTask.from_dict(data, line_number))
+    return tasks
+
+
+class BatchRunner:
+    """
+    Runs batch tasks as concurrent sessions on one event loop.
+
+    Results are appended to a JSONL file as each session finishes, one record
+    per task. Tasks that already have a successful record are skipped, so an
+    interrupted batch resumes where it stopped; failed tasks are retried.
+
+    With ``batch_api`` the sessions call the provider's batch API: the turns
+    all running sessions can take at the same moment are submitted together
+    as one batch, and each session continues once its results arrive.
+
+    A ``budget`` limits every session (see Budget); a ``batch_budget`` limits
+    the whole run: the summed worst-case estimate of the pending tasks must
+    fit it before any task starts, and no further task starts once the
+    sessions have spent it (with several workers each gets an equal share).
+    """
+
+    def __init__(
+        self,
+        output_path: Union[str, Path],
+        provider: str = "mock",
+        max_concurrency: int = 8,
+        workers: int = 1,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        router: Optional[ModelRouter] = None,
+        batch_api: bool = False,
+        budget: Optional[Budget] = None,
+        batch_budget: Optional[Budget] = None,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = (),
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            output_path: JSONL file results are appended to
+            provider: LLM provider for every agent
+            max_concurrency: Sessions running at once (per worker process)
+            workers: Worker processes; with more than one, tasks are sharded,
+                worker ``k`` appends to ``<output>.shard<k>.jsonl`` and the
+                shard files are merged into the output when the run ends
+            on_result: Optional callback receiving each result record
+            router: Optional model router applied to every session's agents
+            batch_api: Use the provider's batch API variant (``<provider>-batch``)
+            budget: Token/cost budget of each session
+            batch_budget: Token/cost budget of all pending tasks together
+            initializer: Called with ``initargs`` in each worker process before
+                it runs tasks, to set up process-wide state such as providers,
+                the response cache and metrics. Workers are spawned, so none of
+                this process's state (or open connections) reaches them otherwise.
+        """
+        self.output_path = Path(output_path)
+        self.provider = f"{provider}-batch" if batch_api else provider
+        self.max_concurrency = max_concurrency
+        self.workers = workers
+        self.on_result = on_result
+        self.router = router
+        self.budget = budget
+        self.batch_budget = batch_budget
+        self.initializer = initializer
+        self.initargs = initargs
+        # Billed usage of the sessions run by this runner
+        self.usage = Usage()
+
+    def shard_path(self, shard: int) -> Path:
+        """Output file written by one worker process."""
+        path = self.output_path
+        return path.with_name(f"{path.stem}.shard{shard}{path.suffix}")
+
+    def output_files(self) -> List[Path]:
+        """Every file that may hold results of this batch."""
+        path = self.output_path
+        paths = [path] + self._shard_files()
+        return [path for path in paths if path.exists()]
+
+    def _shard_files(self) -> List[Path]:
+        path = self.output_path
+        return sorted(path.parent.glob(f"{path.stem}.shard*{path.suffix}"))
+
+    def merge_shards(self):
+        """Append the records of every shard file to the output and delete the shards."""
+        shards = self._shard_files()
+        if not shards:
+            return
+        with open(self.output_path, "a") as out:
+            for shard in shards:
+                with open(shard) as f:
+                    # A line without a newline was cut short by a crash
+                    out.writelines(line for line in f if line.endswith("\n"))
+                out.flush()
+                shard.unlink()
+
+    def completed_ids(self) -> Set[str]:
+        """Ids of tasks that already have a successful result."""
+        done = set()
+        for path in self.output_files():
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if record.get("status") == "ok":
+                        done.add(record["task_id"])
+        return done
+
+    def run(
+        self, tasks_path: Union[str, Path], defaults: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, int]:
+        """
+        Run every pending task in a JSONL task file.
+
+        Args:
+            tasks_path: The task file
+            defaults: Values for keys a task line leaves out
+
+        Returns:
+            Counts of ``completed``, ``failed`` and ``skipped`` tasks (with a
+            batch budget, also of ``over_budget`` tasks it left unstarted)
+
+        Raises:
+            BudgetExceeded: The pending tasks' estimate is over ``batch_budget``
+                (raised before any task starts)
+        """
+        tasks = load_tasks(tasks_path, defaults)
+        done = self.completed_ids()
+        pending = [task for task in tasks if task.task_id not in done]
+        skipped = len(tasks) - len(pending)
+        if self.batch_budget is not None:
+            self.batch_budget.admit(self.estimate(pending), f"batch of {len(pending)} tasks")
+
+        if self.workers <= 1:
+            counts = asyncio.run(self.run_tasks(pending, self.output_path))
+        else:
+            shards = [list(islice(pending, k, None, self.workers)) for k in range(self.workers)]
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            ) as pool:
+                futures = [
+                    pool.submit(_run_shard, self._worker_settings(), shard, self.shard_path(k))
+                    for k, shard in enumerate(shards)
+                    if shard
+                ]
+                counts = {"completed": 0, "failed": 0}
+                try:
+                    for future in futures:
+                        for key, value in future.result().items():
+                            counts[key] = counts.get(key, 0) + value
+                finally:
+                    # Waits for the workers, so every record a shard got is merged
+                    pool.shutdown()
+                    self.merge_shards()
+
+        counts["skipped"] = skipped
+        return counts
+
+    def estimate(self, tasks: List[BatchTask]) -> Usage:
+        """Summed worst-case usage of running ``tasks`` (see ``estimate_session``)."""
+        total = Usage()
+        for task in tasks:
+            total.merge(self.build_ensemble(task).estimate(task.task))
+        return total
+
+    async def run_tasks(self, tasks: List[BatchTask], output_path: Path) -> Dict[str, int]:
+        """Run tasks with bounded concurrency, appending results to ``output_path``."""
+        counts = {"completed": 0, "failed": 0}
+        if self.batch_budget is not None:
+            counts["over_budget"] = 0
+        queue: Iterator[BatchTask] = iter(tasks)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(output_path, "a") as out:
+
+            async def worker():
+                for task in queue:
+                    if self.batch_budget is not None and self.batch_budget.exceeded(self.usage):
+                        # Left without a record, so a later run with more budget picks it up
+                        counts["over_budget"] += 1
+                        continue
+                    record = await self.run_task(task)
+                    out.write(dumps(record) + "\n")
+                    out.flush()
+                    counts["completed" if record["status"] == "ok" else "failed"] += 1
+                    if self.on_result is not None:
+                        self.on_result(record)
+
+            await asyncio.gather(*(worker() for _ in range(max(1, self.max_concurrency))))
+
+        return counts
+
+    async def run_task(self, task: BatchTask) -> Dict[str, Any]:
+        """Run one task and return its result record (errors are recorded, not raised)."""
+        started = time.monotonic()
+        ensemble = None
+        try:
+            ensemble = self.build_ensemble(task)
+            session = CreativeSession(ensemble=ensemble, session_id=task.task_id)
+            results = await session.run(task.task)
+        except Exception as exc:
+            return {
+                "task_id": task.task_id,
+                "status": "error",
+                "error": f"{type(exc).__name__}: {exc}",
+                "duration_seconds": time.monotonic() - started,
+            }
+        finally:
+            if ensemble is not None:
+                self.usage.merge(ensemble.usage)
+        # Messages are encoded straight from the objects when the record is written
+        return {"task_id": task.task_id, "status": "ok", **results}
+
+    def build_ensemble(self, task: BatchTask) -> Ensemble:
+        """The ensemble that runs one task."""
+        return Ensemble(
+            agents=[PERSONAS[name](provider=self.provider) for name in task.agents],
+            mode=ConversationMode(task.mode),
+            max_iterations=task.iterations,
+            router=self.router,
+            budget=self.budget,
+        )
+
+    def _worker_settings(self) -> Dict[str, Any]:
+        batch_budget = self.batch_budget
+        return {
+            "output_path": str(self.output_path),
+            "provider": self.provider,
+            "max_concurrency": self.max_concurrency,
+            "router": self.router,
+            "budget": self.budget,
+            "batch_budget": batch_budget.split(self.workers) if batch_budget else None,
+        }
+
+
+def _run_shard(settings: Dict[str, Any], tasks: List[BatchTask], output_path: Path):
+    """Entry point of a worker process: run one shard on its own event loop."""
+    runner = BatchRunner(**settings)
+    return asyncio.run(runner.run_tasks(tasks, output_path))
@@ -0,0 +1,310 @@
+"""Token and cost budgets for sessions and batches, with pre-flight estimates."""
+
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set
+
+from ..agents.base import Agent, Message
+from ..agents.routing import base_provider
+from ..utils.metrics import CallMetrics
+from ..utils.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from .ensemble import Ensemble
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """List price of a model in USD per million tokens."""
+
+    input: float
+    output: float
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Cost in USD of the given token counts."""
+        return (prompt_tokens * self.input + completion_tokens * self.output) / 1_000_000
+
+
+# Matched by longest prefix, so dated snapshots (e.g. "gpt-4o-2024-08-06") are priced too
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    "mock": ModelPrice(0.0, 0.0),
+    "gpt-4": ModelPrice(30.0, 60.0),
+    "gpt-4-turbo": ModelPrice(10.0, 30.0),
+    "gpt-4o": ModelPrice(2.5, 10.0),
+    "gpt-4o-mini": ModelPrice(0.15, 0.6),
+    "gpt-4.1": ModelPrice(2.0, 8.0),
+    "gpt-4.1-mini": ModelPrice(0.4, 1.6),
+    "gpt-3.5-turbo": ModelPrice(0.5, 1.5),
+    "claude-3-opus": ModelPrice(15.0, 75.0),
+    "claude-3-5-sonnet": ModelPrice(3.0, 15.0),
+    "claude-3-7-sonnet": ModelPrice(3.0, 15.0),
+    "claude-3-5-haiku": ModelPrice(0.8, 4.0),
+    "claude-3-haiku": ModelPrice(0.25, 1.25),
+    "claude-sonnet-4": ModelPrice(3.0, 15.0),
+    "claude-opus-4": ModelPrice(15.0, 75.0),
+}
+
+# Tokens of the per-turn instruction and formatting around the visible context
+_TURN_OVERHEAD_TOKENS = 60
+
+
+def price_for(
+    model: Optional[str], prices: Optional[Dict[str, ModelPrice]] = None
+) -> Optional[ModelPrice]:
+    """
+    Look up a model's price (exact name first, then the longest matching prefix).
+
+    Args:
+        model: Model name
+        prices: Price table (defaults to DEFAULT_PRICES)
+    """
+    if not model:
+        return None
+    prices = DEFAULT_PRICES if prices is None else prices
+    if model in prices:
+        return prices[model]
+    matches = [name for name in prices if model.startswith(name)]
+    return prices[max(matches, key=len)] if matches else None
+
+
+@dataclass
+class Usage:
+    """Tokens and cost of a set of LLM calls, measured or estimated."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0  # USD
+    unpriced: Set[str] = field(default_factory=set)  # models without a price (cost counted as 0)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(
+        self,
+        model: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        prices: Optional[Dict[str, ModelPrice]] = None,
+    ):
+        """Account one call."""
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        price = price_for(model, prices)
+        if price is None:
+            self.unpriced.add(model or "unknown")
+        else:
+            self.cost += price.cost(prompt_tokens, completion_tokens)
+
+    def add_calls(
+        self, calls: Iterable[CallMetrics], prices: Optional[Dict[str, ModelPrice]] = None
+    ):
+        """Account the billed calls among ``calls`` (failed calls and cache hits are free)."""
+        for call in calls:
+            if call.error is None and not call.cache_hit:
+                self.add(call.model, call.prompt_tokens, call.completion_tokens, prices)
+
+    def add_messages(
+        self, messages: Iterable[Message], prices: Optional[Dict[str, ModelPrice]] = None
+    ):
+        """Account messages from their recorded metadata (e.g. when resuming a session)."""
+        for message in messages:
+            metadata = message.metadata
+            if "prompt_tokens" in metadata and not metadata.get("cache_hit"):
+                self.add(
+                    metadata.get("model"),
+                    metadata["prompt_tokens"],
+                    metadata.get("completion_tokens", 0),
+                    prices,
+                )
+
+    def merge(self, other: "Usage"):
+        """Add another usage to this one."""
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost += other.cost
+        self.unpriced |= other.unpriced
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the usage as JSON-ready plain values."""
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "unpriced_models": sorted(self.unpriced),
+        }
+
+    def describe(self) -> str:
+        """One-line human-readable summary."""
+        return f"{self.total_tokens} tokens, ${self.cost:.4f}"
+
+
+class BudgetExceeded(Exception):
+    """A job's estimated usage is over its budget, so it was not started."""
+
+    def __init__(self, message: str, estimate: Optional[Usage] = None):
+        super().__init__(message)
+        self.estimate = estimate
+
+
+@dataclass
+class Budget:
+    """
+    Token and cost limits for a session or a whole batch.
+
+    Before a job starts, its worst-case estimate (see ``estimate_session``) is
+    checked by ``admit`` unless ``preflight`` is off. While it runs, no new
+    turn starts once a limit is reached, so turns already in flight may
+    overshoot it by their own usage.
+    Past ``degrade_at`` (a fraction of the tightest limit) agents are made
+    cheaper: replies are capped at ``degraded_max_tokens`` and, when set,
+    ``degraded_model`` replaces their model and cascade.
+    """
+
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None  # USD
+    degrade_at: Optional[float] = None
+    degraded_max_tokens: int = 300
+    degraded_model: Optional[str] = None
+    prices: Optional[Dict[str, ModelPrice]] = None  # None: DEFAULT_PRICES
+    preflight: bool = True
+
+    def __post_init__(self):
+        if self.degrade_at is not None and not 0 < self.degrade_at <= 1:
+            raise ValueError("degrade_at must be in (0, 1]")
+
+    def fraction_used(self, usage: Usage) -> float:
+        """Share of the tightest limit that ``usage`` uses (0 without limits)."""
+        fractions = [0.0]
+        if self.max_tokens is not None:
+            fractions.append(usage.total_tokens / self.max_tokens if self.max_tokens else 1.0)
+        if self.max_cost is not None:
+            fractions.append(usage.cost / self.max_cost if self.max_cost else 1.0)
+        return max(fractions)
+
+    def exceeded(self, usage: Usage) -> Optional[str]:
+        """A reason to stop when ``usage`` has reached a limit, else None."""
+        if self.max_tokens is not None and usage.total_tokens >= self.max_tokens:
+            return f"token budget exhausted: {usage.total_tokens} of {self.max_tokens} tokens used"
+        if self.max_cost is not None and usage.cost >= self.max_cost:
+            return f"cost budget exhausted: ${usage.cost:.4f} of ${self.max_cost:.4f} spent"
+        return None
+
+    def admit(self, estimate: Usage, job: str = "session"):
+        """
+        Raise BudgetExceeded if an estimated job cannot fit the budget.
+
+        Args:
+            estimate: The job's worst-case usage
+            job: What is being admitted, for the error message
+        """
+        if not self.preflight:
+            return
+        if self.max_tokens is not None and estimate.total_tokens > self.max_tokens:
+            raise BudgetExceeded(
+                f"{job} needs up to {estimate.total_tokens} tokens, "
+                f"over the budget of {self.max_tokens}",
+                estimate,
+            )
+        if self.max_cost is not None and estimate.cost > self.max_cost:
+            raise BudgetExceeded(
+                f"{job} may cost up to ${estimate.cost:.4f}, "
+                f"over the budget of ${self.max_cost:.4f}",
+                estimate,
+            )
+
+    def should_degrade(self, usage: Usage) -> bool:
+        """Whether ``usage`` is past the degrade threshold."""
+        return self.degrade_at is not None and self.fraction_used(usage) >= self.degrade_at
+
+    def degrade(self, agent: Agent):
+        """Make an agent's further turns cheaper (the ensemble restores it afterwards)."""
+        agent.max_tokens = min(agent.max_tokens, self.degraded_max_tokens)
+        if self.degraded_model is not None:
+            agent.model = self.degraded_model
+            agent.cascade = None
+
+    def split(self, parts: int) -> "Budget":
+        """An equal share of this budget (e.g. for each worker process of a batch)."""
+        return replace(
+            self,
+            max_tokens=None if self.max_tokens is None else self.max_tokens // parts,
+            max_cost=None if self.max_cost is None else self.max_cost / parts,
+        )
+
+
+def agent_model(agent: Agent) -> Optional[str]:
+    """
+    The model an agent's calls will use, without creating its client.
+
+    Falls back to the default model of the agent's provider (``-batch``
+    variants included); None when it cannot be known.
+    """
+    if agent.model:
+        return agent.model
+    if agent._llm_client is not None:
+        return agent.llm_client.model
+    from ..utils.llm_client import AnthropicProvider, MockLLMProvider, OpenAIProvider
+
+    defaults = {"mock": MockLLMProvider, "openai": OpenAIProvider, "anthropic": AnthropicProvider}
+    provider = defaults.get(base_provider(agent.provider))
+    return provider.model if provider is not None else None
+
+
+def estimate_session(
+    ensemble: "Ensemble",
+    task: str,
+    start_iteration: int = 0,
+    prices: Optional[Dict[str, ModelPrice]] = None,
+) -> Usage:
+    """
+    Worst-case usage of running an ensemble on a task.
+
+    Every turn of the ensemble's graph in each remaining iteration is assumed
+    to reply with its agent's full ``max_tokens``. A turn's prompt is the
+    agent's system prompt, the task and all the conversation it can see so
+    far (earlier iterations plus its ancestors in the graph), capped by the
+    agent's transcript budget. Cascading agents count a draft and a refine
+    call per turn.
+
+    Args:
+        ensemble: The ensemble to estimate
+        task: The creative task
+        start_iteration: First iteration to run (when resuming)
+        prices: Price table (defaults to DEFAULT_PRICES)
+    """
+    graph = ensemble.build_graph()
+    usage = Usage()
+    task_tokens = estimate_tokens(task)
+    system_tokens = {
+        id(agent): estimate_tokens(agent.get_system_prompt()) for agent in ensemble.agents
+    }
+    seen = sum(estimate_tokens(message.content) for message in ensemble.conversation_history)
+    if not start_iteration:
+        seen = 0
+
+    for _ in range(start_iteration, ensemble.max_iterations):
+        replies: List[int] = []
+        for index, turn in enumerate(graph.turns):
+            agent = turn.agent
+            visible = seen + sum(replies[i] for i in graph.ancestors(index))
+            window = getattr(getattr(agent, "history", None), "max_tokens", visible)
+            system = system_tokens.get(id(agent))
+            if system is None:
+                system = estimate_tokens(agent.get_system_prompt())
+            prompt = system + task_tokens + _TURN_OVERHEAD_TOKENS + min(visible, window)
+            reply = agent.max_tokens
+            model = agent_model(agent)
+            if agent.cascade is None:
+                usage.add(model, prompt, reply, prices)
+            else:
+                usage.add(agent.cascade.draft_model or model, prompt, reply, prices)
+                refine_prompt = prompt + reply + _TURN_OVERHEAD_TOKENS
+                usage.add(agent.cascade.refine_model or model, refine_prompt, reply, prices)
+            replies.append(reply)
+        seen += sum(replies)
+    return usage
@@ -1,10 +1,17 @@
 """Ensemble management for coordinating multiple agents."""
 
 import asyncio
-from typing import List, Dict, Any, Optional
+import inspect
+import time
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from enum import Enum
 
-from ..agents.base import Agent, Message
+from ..agents.base import Agent, Message, TokenCallback
+from ..agents.routing import ModelRouter
+from ..utils.metrics import Tracer, collect_calls, default_tracer
+from .budget import Budget, Usage, estimate_session
+from .graph import TurnGraph
+from .stopping import StopCriterion
 
 
 class ConversationMode(str, Enum):
@@ -12,10 +19,24 @@ class ConversationMode(str, Enum):
 
     SEQUENTIAL = "sequential"  # Agents speak one after another
     PARALLEL = "parallel"  # Agents respond simultaneously
-    DEBATE = "debate"  # Agents engage in structured debate
+    DEBATE = "debate"  # An opening pair, then everyone else responds to it at once
     CONSENSUS = "consensus"  # Agents work toward agreement
 
 
+# Called with each Message as soon as it is produced
+MessageCallback = Callable[[Message], Any]
+# Called with the iteration number and its messages once an iteration completes
+IterationCallback = Callable[[int, List[Message]], Any]
+
+
+async def _notify(callback: Optional[Callable[..., Any]], *args: Any):
+    """Invoke an optional sync or async callback."""
+    if callback is not None:
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+
+
 class Ensemble:
     """Manages a collection of agents working together."""
 
@@ -24,105 +45,293 @@ class Ensemble:
         agents: List[Agent],
         mode: ConversationMode = ConversationMode.SEQUENTIAL,
         max_iterations: int = 5,
+        graph: Optional[TurnGraph] = None,
+        stop_criteria: Optional[List[StopCriterion]] = None,
+        router: Optional[ModelRouter] = None,
+        tracer: Optional[Tracer] = None,
+        budget: Optional[Budget] = None,
     ):
         """
         Initialize an ensemble of agents.
-        
+
         Args:
             agents: List of Agent instances to coordinate
             mode: Conversation mode for the ensemble
             max_iterations: Maximum number of conversation rounds
+            graph: Optional custom turn graph used instead of the mode's preset
+            stop_criteria: Criteria checked after every iteration; the first one
+                that fires ends the collaboration early
+            router: Optional model router; agents without an explicit model
+                are assigned the model it picks for their role
+            tracer: Receives ``iteration`` and ``turn`` spans (defaults to the
+                process-wide tracer)
+            budget: Optional token/cost budget: ``collaborate`` rejects tasks
+                estimated to exceed it, degrades agents past its threshold and
+                starts no new turns once it is spent
         """
         self.agents = agents
         self.mode = mode
         self.max_iterations = max_iterations
+        self.graph = graph
+        self.stop_criteria = stop_criteria or []
         self.conversation_history: List[Message] = []
+        self.tracer = tracer or default_tracer
+        self.budget = budget
+        # Billed usage of the current collaboration
+        self.usage = Usage()
+        self.budget_reason: Optional[str] = None
+        # Settings of agents degraded by the budget, restored when a collaboration ends
+        self._undegraded: Dict[int, Tuple[Agent, Dict[str, Any]]] = {}
+        if router is not None:
+            router.assign(agents)
+
+    def build_graph(self) -> TurnGraph:
+        """Return the turn graph for one iteration: the custom graph or the mode's preset."""
+        if self.graph is not None:
+            return self.graph
+        if self.mode == ConversationMode.PARALLEL:
+            return TurnGraph.parallel(self.agents)
+        if self.mode == ConversationMode.DEBATE:
+            return TurnGraph.debate(self.agents)
+        # SEQUENTIAL and CONSENSUS both let each agent build on all previous turns
+        return TurnGraph.sequential(self.agents)
+
+    def estimate(self, task: str, start_iteration: int = 0) -> Usage:
+        """Worst-case usage of collaborating on ``task`` (see ``estimate_session``)."""
+        prices = self.budget.prices if self.budget is not None else None
+        return estimate_session(self, task, start_iteration, prices)
+
+    def _admit_turn(self, agent: Agent) -> bool:
+        """Whether the budget allows another turn; degrades the agent past the threshold."""
+        if self.budget is None:
+            return True
+        reason = self.budget.exceeded(self.usage)
+        if reason:
+            self.budget_reason = self.budget_reason or reason
+            return False
+        if self.budget.should_degrade(self.usage):
+            if id(agent) not in self._undegraded:
+                settings = {
+                    name: getattr(agent, name) for name in ("model", "cascade", "max_tokens")
+                }
+                self._undegraded[id(agent)] = (agent, settings)
+            self.budget.degrade(agent)
+        return True
+
+    def _restore_degraded(self):
+        """Give agents degraded by the budget their own settings back."""
+        for agent, settings in self._undegraded.values():
+            for name, value in settings.items():
+                setattr(agent, name, value)
+        self._undegraded.clear()
+
+    async def _respond(
+        self,
+        agent: Agent,
+        task: str,
+        context: List[Message],
+        iteration: int,
+        on_token: Optional[TokenCallback],
+    ) -> Message:
+        """Ask one agent to respond, streaming only when a token callback is set."""
+        if on_token is None:
+            return await agent.respond(task, context, iteration)
+        return await agent.respond(task, context, iteration, on_token=on_token)
 
     async def run_iteration(
-        self, task: str, iteration: int
+        self,
+        task: str,
+        iteration: int,
+        on_token: Optional[TokenCallback] = None,
+        on_message: Optional[MessageCallback] = None,
     ) -> List[Message]:
         """
         Run one iteration of the creative conversation.
-        
+
+        Turns run as soon as the turns they depend on have finished, so
+        independent turns proceed concurrently. Once the budget is spent,
+        turns that have not started are skipped. The iteration and each turn
+        are traced as spans; a turn's span starts once its dependencies are
+        done and records how long it waited for them.
+
         Args:
             task: The creative task for agents to work on
             iteration: Current iteration number
-            
+            on_token: Optional callback receiving streamed TokenEvents from every agent
+            on_message: Optional callback receiving each message as its turn finishes
+
         Returns:
-            List of messages generated in this iteration
+            List of messages generated in this iteration, in turn order
         """
-        messages = []
-
-        if self.mode == ConversationMode.SEQUENTIAL:
-            # Each agent responds in sequence
-            for agent in self.agents:
-                message = await agent.respond(task, self.conversation_history, iteration)
-                self.conversation_history.append(message)
-                messages.append(message)
-
-        elif self.mode == ConversationMode.PARALLEL:
-            # All agents respond simultaneously
-            tasks = [
-                agent.respond(task, self.conversation_history, iteration)
-                for agent in self.agents
-            ]
-            responses = await asyncio.gather(*tasks)
-            for message in responses:
-                self.conversation_history.append(message)
-                messages.append(message)
-
-        elif self.mode == ConversationMode.DEBATE:
-            # Agents respond in pairs, alternating perspectives
-            for i in range(0, len(self.agents), 2):
-                if i + 1 < len(self.agents):
-                    # Two agents respond
-                    agent1, agent2 = self.agents[i], self.agents[i + 1]
-                    msg1, msg2 = await asyncio.gather(
-                        agent1.respond(task, self.conversation_history, iteration),
-                        agent2.respond(task, self.conversation_history, iteration),
-                    )
-                    self.conversation_history.extend([msg1, msg2])
-                    messages.extend([msg1, msg2])
-                else:
-                    # Odd agent out responds alone
-                    message = await self.agents[i].respond(
-                        task, self.conversation_history, iteration
+        graph = self.build_graph()
+        history = list(self.conversation_history)
+        results: List[Optional[Message]] = [None] * len(graph)
+        pending: List[asyncio.Future] = []
+
+        mode = ConversationMode(self.mode).value
+        prices = self.budget.prices if self.budget is not None else None
+
+        async def run_turn(index: int) -> Optional[Message]:
+            turn = graph.turns[index]
+            queued = time.perf_counter()
+            if turn.depends_on:
+                await asyncio.gather(*(pending[dep] for dep in turn.depends_on))
+            if not self._admit_turn(turn.agent):
+                return None
+            ancestors = [results[i] for i in graph.ancestors(index)]
+            context = history + [message for message in ancestors if message is not None]
+            with self.tracer.span(
+                "turn",
+                agent=turn.agent.name,
+                role=turn.agent.role.value,
+                mode=mode,
+                iteration=iteration,
+                turn=index,
+                wait_seconds=time.perf_counter() - queued,
+            ), collect_calls() as calls:
+                try:
+                    results[index] = await self._respond(
+                        turn.agent, task, context, iteration, on_token
                     )
-                    self.conversation_history.append(message)
-                    messages.append(message)
+                finally:
+                    self.usage.add_calls(calls, prices)
+            await _notify(on_message, results[index])
+            return results[index]
 
-        elif self.mode == ConversationMode.CONSENSUS:
-            # Similar to sequential but agents explicitly try to build consensus
-            for agent in self.agents:
-                message = await agent.respond(task, self.conversation_history, iteration)
-                self.conversation_history.append(message)
-                messages.append(message)
+        with self.tracer.span("iteration", mode=mode, iteration=iteration, turns=len(graph)):
+            for index in range(len(graph)):
+                pending.append(asyncio.ensure_future(run_turn(index)))
+            try:
+                messages = [m for m in await asyncio.gather(*pending) if m is not None]
+            finally:
+                for future in pending:
+                    future.cancel()
 
+        self.conversation_history.extend(messages)
         return messages
 
-    async def collaborate(self, task: str) -> Dict[str, Any]:
+    def restore_history(self, task: str, messages: List[Message]):
+        """
+        Restore the conversation of an earlier run (e.g. when resuming a session).
+
+        Each message is replayed into its agent with the context its turn saw,
+        so agents' memories and transcripts match an uninterrupted run. Messages
+        are matched to the graph's turns by sender, within their iteration.
+
+        Args:
+            task: The creative task
+            messages: The completed iterations' messages, in the order they were produced
+        """
+        graph = self.build_graph()
+        iterations: Dict[int, List[Message]] = {}
+        for message in messages:
+            iterations.setdefault(message.iteration, []).append(message)
+
+        self.conversation_history = []
+        for iteration in sorted(iterations):
+            history = list(self.conversation_history)
+            results: List[Optional[Message]] = [None] * len(graph)
+            unmatched: List[Message] = []
+            for message in iterations[iteration]:
+                index = next(
+                    (
+                        i
+                        for i, turn in enumerate(graph.turns)
+                        if results[i] is None and turn.agent.name == message.sender
+                    ),
+                    None,
+                )
+                if index is None:
+                    unmatched.append(message)
+                else:
+                    results[index] = message
+
+            for index, message in enumerate(results):
+                if message is None:
+                    continue
+                ancestors = [results[i] for i in graph.ancestors(index)]
+                context = history + [m for m in ancestors if m is not None]
+                graph.turns[index].agent.restore_turn(task, context, message)
+            self.conversation_history.extend(m for m in results if m is not None)
+            self.conversation_history.extend(unmatched)
+
+    async def collaborate(
+        self,
+        task: str,
+        on_token: Optional[TokenCallback] = None,
+        on_message: Optional[MessageCallback] = None,
+        on_iteration: Optional[IterationCallback] = None,
+        start_iteration: int = 0,
+    ) -> Dict[str, Any]:
         """
         Run a full creative collaboration session.
-        
+
         Args:
             task: The creative task for the ensemble to work on
-            
+            on_token: Optional callback receiving streamed TokenEvents as agents respond
+            on_message: Optional callback receiving each message as it is produced
+            on_iteration: Optional callback invoked after each completed iteration
+            start_iteration: Iteration to start from; above 0 the existing
+                conversation history is kept (used to resume a session)
+
         Returns:
             Dictionary containing conversation history and final synthesis
+
+        Raises:
+            BudgetExceeded: The task's estimated usage is over the budget
+                (raised before any call is made)
         """
-        self.conversation_history = []
+        if start_iteration == 0:
+            self.conversation_history = []
+        prices = self.budget.prices if self.budget is not None else None
+        # A resumed session has already spent what its logged messages used
+        usage = Usage()
+        usage.add_messages(self.conversation_history, prices)
+        if self.budget is not None:
+            needed = self.estimate(task, start_iteration)
+            needed.merge(usage)
+            self.budget.admit(needed)
+        self.usage = usage
+        self.budget_reason = None
+        completed = start_iteration
+        stop_reason = None
 
-        for iteration in range(self.max_iterations):
-            await self.run_iteration(task, iteration)
+        try:
+            for iteration in range(start_iteration, self.max_iterations):
+                messages = await self.run_iteration(task, iteration, on_token, on_message)
+                if not messages and self.budget_reason:
+                    stop_reason = self.budget_reason
+                    break
+                completed += 1
+                await _notify(on_iteration, iteration, messages)
+                stop_reason = self.budget_reason or self.check_stop(iteration, messages)
+                if not stop_reason and self.budget is not None:
+                    stop_reason = self.budget.exceeded(self.usage)
+                if stop_reason:
+                    break
+        finally:
+            # Degradation only lasts for this collaboration
+            self._restore_degraded()
 
         return {
             "task": task,
             "mode": self.mode,
-            "iterations": self.max_iterations,
+            "iterations": completed,
+            "max_iterations": self.max_iterations,
+            "stop_reason": stop_reason,
             "conversation": self.conversation_history,
             "agent_count": len(self.agents),
+            "usage": self.usage.to_dict(),
         }
 
+    def check_stop(self, iteration: int, messages: List[Message]) -> Optional[str]:
+        """Return the reason given by the first stop criterion that fires, if any."""
+        for criterion in self.stop_criteria:
+            reason = criterion.check(self, iteration, messages)
+            if reason:
+                return reason
+        return None
+
     def get_agent_by_role(self, role: str) -> Optional[Agent]:
         """Get the first agent with the specified role."""
         for agent in self.agents:
@@ -0,0 +1,148 @@
+"""Append-only JSONL event log for creative sessions."""
+
+import os
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+from ..agents.base import Message
+from ..utils.serialization import dumps, loads
+
+
+class FsyncPolicy(str, Enum):
+    """When log writes are forced to stable storage."""
+
+    ALWAYS = "always"  # fsync after every event
+    BATCH = "batch"  # fsync every few events and at iteration boundaries
+    NEVER = "never"  # leave it to the OS (events are still flushed)
+
+
+class SessionEventLog:
+    """
+    Writes a session as a stream of JSON events, one per line.
+
+    Every message is appended as soon as it is produced, so a crash loses at
+    most the turns still in flight. The JSON and text views of the session
+    are derived from the log with ``load`` and an interrupted session can be
+    resumed from it.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fsync: Union[FsyncPolicy, str] = FsyncPolicy.BATCH,
+        batch_size: int = 16,
+    ):
+        """
+        Open (or continue) a log file.
+
+        Args:
+            path: The JSONL file to append to
+            fsync: When to fsync (see FsyncPolicy)
+            batch_size: Events between fsyncs under the batch policy
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync = FsyncPolicy(fsync)
+        self.batch_size = batch_size
+        self._unsynced = 0
+        self._file = open(self.path, "a")
+        # Terminate a last line cut short by a crash so new events start cleanly
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, event: str, **fields: Any):
+        """Append one event to the log."""
+        record = {"event": event, "time": datetime.now().isoformat(), **fields}
+        self._file.write(dumps(record) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self.fsync == FsyncPolicy.ALWAYS or (
+            self.fsync == FsyncPolicy.BATCH and self._unsynced >= self.batch_size
+        ):
+            self.sync()
+
+    def log_message(self, message: Message):
+        """Append a message event."""
+        self.append(
+            "message",
+            sender=message.sender,
+            role=message.role.value,
+            content=message.content,
+            iteration=message.iteration,
+            metadata=message.metadata,
+        )
+
+    def log_iteration_end(self, iteration: int):
+        """Mark an iteration as complete; resuming never repeats it."""
+        self.append("iteration_end", iteration=iteration)
+        if self.fsync != FsyncPolicy.NEVER:
+            self.sync()
+
+    def sync(self):
+        """Force buffered events to stable storage."""
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """Sync (unless the policy is never) and close the file."""
+        if self._file.closed:
+            return
+        if self.fsync != FsyncPolicy.NEVER:
+            self.sync()
+        self._file.close()
+
+    def __enter__(self) -> "SessionEventLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def read_events(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+        """Yield the events of a log, ignoring a final line cut short by a crash."""
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield loads(line)
+                except ValueError:
+                    continue
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Dict[str, Any]:
+        """
+        Rebuild session data from a log.
+
+        Messages from an iteration that was restarted by a resume are dropped.
+
+        Returns:
+            Session data in the same shape ``CreativeSession.run`` returns,
+            with messages as dicts, plus ``complete`` (whether the session
+            ended) and ``completed_iterations``
+        """
+        data: Dict[str, Any] = {"conversation": [], "stop_reason": None, "complete": False}
+        completed = -1
+        for event in cls.read_events(path):
+            kind = event.pop("event")
+            event.pop("time", None)
+            if kind == "session_start":
+                data.update(event)
+            elif kind == "message":
+                data["conversation"].append(event)
+            elif kind == "iteration_end":
+                completed = max(completed, event["iteration"])
+            elif kind == "resume":
+                start = event["from_iteration"]
+                data["conversation"] = [m for m in data["conversation"] if m["iteration"] < start]
+                completed = start - 1
+            elif kind == "session_end":
+                data.update(event)
+                data["complete"] = True
+        data["completed_iterations"] = completed + 1
+        data.setdefault("iterations", completed + 1)
+        return data
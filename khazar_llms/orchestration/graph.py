@@ -0,0 +1,96 @@
+"""Dependency graphs describing the turns of one ensemble iteration."""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from ..agents.base import Agent
+
+
+@dataclass
+class Turn:
+    """One agent's turn and the earlier turns whose output it reads."""
+
+    agent: Agent
+    depends_on: List[int] = field(default_factory=list)
+
+
+class TurnGraph:
+    """
+    The turns of one iteration as a dependency graph.
+
+    A turn may only depend on turns added before it, so the graph is acyclic
+    by construction. Turns whose dependencies are complete run concurrently;
+    each turn sees the conversation up to the iteration plus the messages of
+    all turns it (transitively) depends on.
+    """
+
+    def __init__(self):
+        self.turns: List[Turn] = []
+        self._ancestors: Dict[int, List[int]] = {}
+
+    def add_turn(self, agent: Agent, depends_on: Iterable[int] = ()) -> int:
+        """
+        Add a turn and return its index.
+
+        Args:
+            agent: The agent taking the turn
+            depends_on: Indices of earlier turns this turn reads
+        """
+        index = len(self.turns)
+        deps = sorted(set(depends_on))
+        for dep in deps:
+            if not 0 <= dep < index:
+                raise ValueError(f"Turn {index} can only depend on earlier turns, got {dep}")
+        self.turns.append(Turn(agent=agent, depends_on=deps))
+        return index
+
+    def ancestors(self, index: int) -> List[int]:
+        """All turns that ``index`` transitively depends on, in turn order."""
+        if index not in self._ancestors:
+            seen = set()
+            for dep in self.turns[index].depends_on:
+                seen.add(dep)
+                seen.update(self.ancestors(dep))
+            self._ancestors[index] = sorted(seen)
+        return self._ancestors[index]
+
+    def waves(self) -> List[List[int]]:
+        """Group turns into waves that can run concurrently, in execution order."""
+        depth: List[int] = []
+        for turn in self.turns:
+            depth.append(1 + max((depth[d] for d in turn.depends_on), default=-1))
+        waves: List[List[int]] = [[] for _ in range(max(depth, default=-1) + 1)]
+        for index, level in enumerate(depth):
+            waves[level].append(index)
+        return waves
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    @classmethod
+    def sequential(cls, agents: List[Agent]) -> "TurnGraph":
+        """Each agent reads everything said before it: a single chain."""
+        graph = cls()
+        for i, agent in enumerate(agents):
+            graph.add_turn(agent, [i - 1] if i else [])
+        return graph
+
+    @classmethod
+    def parallel(cls, agents: List[Agent]) -> "TurnGraph":
+        """All agents respond independently to previous iterations."""
+        graph = cls()
+        for agent in agents:
+            graph.add_turn(agent)
+        return graph
+
+    @classmethod
+    def debate(cls, agents: List[Agent]) -> "TurnGraph":
+        """
+        The first pair opens the debate side by side; every other agent then
+        responds to the opening pair, all at the same time.
+        """
+        graph = cls()
+        opening = list(range(min(2, len(agents))))
+        for i, agent in enumerate(agents):
+            graph.add_turn(agent, [] if i in opening else opening)
+        return graph
@@ -1,12 +1,17 @@
 """Creative session management with rich output."""
 
-import json
+import mmap
+import os
+import struct
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from pathlib import Path
 
-from ..agents.base import Message
-from .ensemble import Ensemble
+from ..agents.base import Message, TokenCallback
+from ..utils.serialization import dumps, loads
+from .budget import Budget
+from .ensemble import ConversationMode, Ensemble, MessageCallback, _notify
+from .event_log import FsyncPolicy, SessionEventLog
 
 
 class CreativeSession:
@@ -16,49 +21,180 @@ class CreativeSession:
         self,
         ensemble: Ensemble,
         output_dir: Optional[Path] = None,
+        session_id: Optional[str] = None,
+        event_log: bool = False,
+        fsync: Union[FsyncPolicy, str] = FsyncPolicy.BATCH,
+        budget: Optional[Budget] = None,
     ):
         """
         Initialize a creative session.
-        
+
         Args:
             ensemble: The ensemble to manage
             output_dir: Optional directory for saving session outputs
+            session_id: Optional identifier (defaults to the start timestamp)
+            event_log: Append every message to ``session_<id>.jsonl`` in
+                ``output_dir`` as it is produced
+            fsync: When the event log is forced to disk (see FsyncPolicy)
+            budget: Token/cost budget for the session (replaces the
+                ensemble's); an over-budget task is rejected before it starts
         """
         self.ensemble = ensemble
+        if budget is not None:
+            ensemble.budget = budget
         self.output_dir = output_dir or Path("./sessions")
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.event_log = event_log
+        self.fsync = fsync
+        self.log_path = self.output_dir / f"session_{self.session_id}.jsonl"
         self.start_time: Optional[datetime] = None
         self.end_time: Optional[datetime] = None
+        self.task: Optional[str] = None
+        self._resume_from = 0
+
+    @classmethod
+    def resume(
+        cls,
+        log_path: Union[str, Path],
+        ensemble: Ensemble,
+        fsync: Union[FsyncPolicy, str] = FsyncPolicy.BATCH,
+    ) -> "CreativeSession":
+        """
+        Restore an interrupted session from its event log.
+
+        Completed iterations are loaded into the ensemble's history and the
+        agents' memories; calling ``run(session.task)`` then continues with
+        the first unfinished iteration, appending to the same log.
 
-    async def run(self, task: str) -> Dict[str, Any]:
+        Args:
+            log_path: The session's JSONL event log
+            ensemble: An ensemble with the same agents as the original session
+            fsync: When the event log is forced to disk
+        """
+        log_path = Path(log_path)
+        data = SessionEventLog.load(log_path)
+        if data["complete"]:
+            raise ValueError(f"Session {data.get('session_id')} already finished")
+
+        session = cls(
+            ensemble,
+            output_dir=log_path.parent,
+            session_id=data["session_id"],
+            event_log=True,
+            fsync=fsync,
+        )
+        session.log_path = log_path
+        session.task = data["task"]
+        session.start_time = datetime.fromisoformat(data["start_time"])
+        session._resume_from = data["completed_iterations"]
+
+        # Messages of the unfinished iteration are dropped; it is rerun
+        messages = [
+            Message.from_dict(record)
+            for record in data["conversation"]
+            if record["iteration"] < session._resume_from
+        ]
+        ensemble.restore_history(session.task, messages)
+        return session
+
+    async def run(
+        self,
+        task: str,
+        on_token: Optional[TokenCallback] = None,
+        on_message: Optional[MessageCallback] = None,
+    ) -> Dict[str, Any]:
         """
         Run a creative session and return results.
-        
+
         Args:
             task: The creative task to work on
-            
+            on_token: Optional callback receiving streamed TokenEvents as agents respond
+            on_message: Optional callback receiving each message as it is produced
+                (after it has been logged)
+
         Returns:
             Dictionary containing session results
         """
-        self.start_time = datetime.now()
-        
-        # Run the ensemble collaboration
-        results = await self.ensemble.collaborate(task)
-        
-        self.end_time = datetime.now()
-        duration = (self.end_time - self.start_time).total_seconds()
-
-        # Add session metadata
-        session_data = {
-            "session_id": self.session_id,
-            "start_time": self.start_time.isoformat(),
-            "end_time": self.end_time.isoformat(),
-            "duration_seconds": duration,
-            **results,
-        }
+        self.task = task
+        resuming = self._resume_from > 0
+        if not resuming:
+            self.start_time = datetime.now()
+
+        log = SessionEventLog(self.log_path, self.fsync) if self.event_log else None
+        try:
+            if log is None:
+                callbacks = {"on_message": on_message}
+            else:
+                if resuming:
+                    log.append("resume", from_iteration=self._resume_from)
+                else:
+                    log.append(
+                        "session_start",
+                        session_id=self.session_id,
+                        task=task,
+                        mode=ConversationMode(self.ensemble.mode).value,
+                        max_iterations=self.ensemble.max_iterations,
+                        agents=[
+                            {"name": agent.name, "role": agent.role.value}
+                            for agent in self.ensemble.agents
+                        ],
+                        agent_count=len(self.ensemble.agents),
+                        start_time=self.start_time.isoformat(),
+                    )
+
+                async def log_message(message: Message):
+                    log.log_message(message)
+                    await _notify(on_message, message)
+
+                callbacks = {
+                    "on_message": log_message,
+                    "on_iteration": lambda iteration, _: log.log_iteration_end(iteration),
+                }
 
+            # Run the ensemble collaboration
+            with self.ensemble.tracer.span(
+                "session",
+                session_id=self.session_id,
+                mode=ConversationMode(self.ensemble.mode).value,
+                agents=len(self.ensemble.agents),
+            ) as span:
+                results = await self.ensemble.collaborate(
+                    task, on_token, start_iteration=self._resume_from, **callbacks
+                )
+                span.attributes["iterations"] = results["iterations"]
+
+            self.end_time = datetime.now()
+            duration = (self.end_time - self.start_time).total_seconds()
+
+            # Add session metadata
+            session_data = {
+                "session_id": self.session_id,
+                "start_time": self.start_time.isoformat(),
+                "end_time": self.end_time.isoformat(),
+                "duration_seconds": duration,
+                **results,
+            }
+
+            if log is not None:
+                log.append(
+                    "session_end",
+                    end_time=session_data["end_time"],
+                    duration_seconds=duration,
+                    iterations=results["iterations"],
+                    stop_reason=results["stop_reason"],
+                    usage=results["usage"],
+                )
+        finally:
+            if log is not None:
+                log.close()
+
+        self._resume_from = 0
         return session_data
 
+    def load_log(self) -> Dict[str, Any]:
+        """Rebuild the session data (messages as dicts) from the event log."""
+        return SessionEventLog.load(self.log_path)
+
     def save_session(self, session_data: Dict[str, Any], format: str = "json"):
         """
         Save session results to disk.
@@ -71,10 +207,9 @@ class CreativeSession:
 
         if format == "json":
             filepath = self.output_dir / f"session_{self.session_id}.json"
-            # Convert Message objects to dicts for JSON serialization
-            serializable_data = self._prepare_for_serialization(session_data)
+            # Messages are encoded straight from the objects (see utils.serialization)
             with open(filepath, "w") as f:
-                json.dump(serializable_data, f, indent=2)
+                f.write(dumps(session_data, indent=True))
 
         elif format == "txt":
             filepath = self.output_dir / f"session_{self.session_id}.txt"
@@ -83,19 +218,17 @@ class CreativeSession:
 
         return filepath
 
+    def serialize(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return session data as JSON-serializable plain values."""
+        return self._prepare_for_serialization(session_data)
+
     def _prepare_for_serialization(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert Message objects to dicts for JSON serialization."""
         serializable = data.copy()
         
         if "conversation" in serializable:
             serializable["conversation"] = [
-                {
-                    "sender": msg.sender,
-                    "role": msg.role.value,
-                    "content": msg.content,
-                    "iteration": msg.iteration,
-                    "metadata": msg.metadata,
-                }
+                msg if isinstance(msg, dict) else msg.to_dict()
                 for msg in serializable["conversation"]
             ]
         
@@ -111,6 +244,8 @@ class CreativeSession:
         lines.append(f"Task: {data.get('task', 'N/A')}")
         lines.append(f"Mode: {data.get('mode', 'N/A')}")
         lines.append(f"Duration: {data.get('duration_seconds', 0):.2f} seconds")
+        if data.get("stop_reason"):
+            lines.append(f"Stopped early: {data['stop_reason']}")
         lines.append("=" * 80)
         lines.append("")
 
@@ -144,4 +279,355 @@ class CreativeSession:
         print(f"Iterations: {session_data.get('iterations', 0)}")
         print(f"Messages: {len(session_data.get('conversation', []))}")
         print(f"Duration: {session_data.get('duration_seconds', 0):.2f} seconds")
+        usage = session_data.get("usage")
+        if usage:
+            print(f"Usage: {usage['total_tokens']} tokens, ${usage['cost']:.4f}")
+        if session_data.get("stop_reason"):
+            print(f"Stopped early: {session_data['stop_reason']}")
         print("=" * 80 + "\n")
+
+
+# Session archive layout (all integers little-endian):
+#   magic | session blocks... | index (JSON) | index offset (u64) | index length (u64) | magic
+# Each session block is:
+#   metadata length (u32) | metadata (JSON) | message count n (u32) |
+#   n + 1 absolute message offsets (u64) | messages (one JSON document each)
+ARCHIVE_MAGIC = b"KHZARC01"
+_FOOTER = struct.Struct("<QQ8s")
+_U32 = struct.Struct("<I")
+
+# Session fields copied into the archive index so sessions can be listed
+# and filtered without reading their blocks
+_INDEX_FIELDS = (
+    "task",
+    "mode",
+    "start_time",
+    "end_time",
+    "duration_seconds",
+    "iterations",
+    "stop_reason",
+    "agent_count",
+)
+
+
+class SessionArchiveWriter:
+    """
+    Packs many sessions into one compact binary archive file.
+
+    Opening an existing archive appends to it. Sessions are written to a
+    temporary copy (``<path>.tmp``) that replaces the archive once ``close()``
+    has written the index, so until then, and if the writer is never closed,
+    the archive keeps its earlier contents.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open an archive for writing.
+
+        Args:
+            path: Archive file (created if missing, appended to otherwise)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index: List[Dict[str, Any]] = []
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        if self.path.exists() and self.path.stat().st_size:
+            with SessionArchive(self.path) as existing:
+                self.index = list(existing.index)
+                end = existing.index_offset
+            self._file = open(self._tmp_path, "wb")
+            # Copy the session blocks; the old index is rewritten on close
+            with open(self.path, "rb") as source:
+                remaining = end
+                while remaining:
+                    chunk = source.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    self._file.write(chunk)
+                    remaining -= len(chunk)
+        else:
+            self._file = open(self._tmp_path, "wb")
+            self._file.write(ARCHIVE_MAGIC)
+        self._ids = {entry["session_id"] for entry in self.index}
+
+    def add(self, session_data: Dict[str, Any]):
+        """
+        Append one session.
+
+        Args:
+            session_data: Session data as returned by ``CreativeSession.run``
+                or ``load_log``, or read from a session JSON file
+        """
+        session_id = str(session_data.get("session_id"))
+        if session_id in self._ids:
+            raise ValueError(f"Session {session_id} is already in the archive")
+
+        messages = [dumps(msg).encode("utf-8") for msg in session_data.get("conversation", [])]
+        metadata = {key: value for key, value in session_data.items() if key != "conversation"}
+        meta = dumps(metadata).encode("utf-8")
+
+        offset = self._file.tell()
+        table_start = offset + _U32.size + len(meta) + _U32.size
+        position = table_start + 8 * (len(messages) + 1)
+        offsets = []
+        for encoded in messages:
+            offsets.append(position)
+            position += len(encoded)
+        offsets.append(position)
+
+        self._file.write(_U32.pack(len(meta)))
+        self._file.write(meta)
+        self._file.write(_U32.pack(len(messages)))
+        self._file.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for encoded in messages:
+            self._file.write(encoded)
+
+        entry = {"session_id": session_id, "offset": offset, "messages": len(messages)}
+        for key in _INDEX_FIELDS:
+            if key in metadata:
+                entry[key] = metadata[key]
+        self.index.append(entry)
+        self._ids.add(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._ids
+
+    def close(self):
+        """Write the index and footer, then replace the archive with the new file."""
+        if self._file.closed:
+            return
+        index = dumps(self.index).encode("utf-8")
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(index_offset, len(index), ARCHIVE_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self) -> "SessionArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SessionArchive:
+    """
+    Reads a session archive through a memory map.
+
+    Only the index is decoded on open; a session's metadata or a single
+    message is decoded when it is asked for.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open an archive for reading.
+
+        Args:
+            path: Archive file written by SessionArchiveWriter
+        """
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{self.path} is not a session archive")
+        if len(self._map) < len(ARCHIVE_MAGIC) + _FOOTER.size or (
+            self._map[: len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC
+        ):
+            self.close()
+            raise ValueError(f"{self.path} is not a session archive")
+        index_offset, index_length, magic = _FOOTER.unpack_from(
+            self._map, len(self._map) - _FOOTER.size
+        )
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} was not closed properly (missing index)")
+        self.index_offset = index_offset
+        self.index: List[Dict[str, Any]] = loads(
+            self._map[index_offset : index_offset + index_length]
+        )
+        self._positions = {entry["session_id"]: i for i, entry in enumerate(self.index)}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._positions
+
+    def session_ids(self) -> List[str]:
+        """Ids of the archived sessions, in the order they were added."""
+        return [entry["session_id"] for entry in self.index]
+
+    def metadata(self, session_id: str) -> Dict[str, Any]:
+        """Session data without the conversation."""
+        offset = self._entry(session_id)["offset"]
+        (length,) = _U32.unpack_from(self._map, offset)
+        start = offset + _U32.size
+        return loads(self._map[start : start + length])
+
+    def message(self, session_id: str, index: int) -> Dict[str, Any]:
+        """Decode one message of a session (negative indices count from the end)."""
+        table, count = self._table(session_id)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"Session {session_id} has {count} messages")
+        start, end = struct.unpack_from("<QQ", self._map, table + 8 * index)
+        return loads(self._map[start:end])
+
+    def messages(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        """Decode the messages of a session one at a time."""
+        table, count = self._table(session_id)
+        offsets = struct.unpack_from(f"<{count + 1}Q", self._map, table)
+        for start, end in zip(offsets, offsets[1:]):
+            yield loads(self._map[start:end])
+
+    def load(self, session_id: str) -> Dict[str, Any]:
+        """Session data with the conversation, as messages dicts."""
+        data = self.metadata(session_id)
+        data["conversation"] = list(self.messages(session_id))
+        return data
+
+    def search(
+        self,
+        contains: Optional[str] = None,
+        role: Optional[str] = None,
+        sender: Optional[str] = None,
+        session_ids: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Find messages matching every given filter.
+
+        Args:
+            contains: Text the message content must include (case-insensitive)
+            role: Agent role value, e.g. 'critic'
+            sender: Agent name
+            session_ids: Sessions to search (default: all)
+
+        Yields:
+            ``(session_id, message index, message)`` tuples
+        """
+        needle = contains.lower() if contains else None
+        # Plain ASCII terms appear verbatim in the encoded message, so most
+        # messages can be ruled out without decoding them
+        encoded = None
+        if needle and needle.isascii() and needle.isprintable() and not set('"\\') & set(needle):
+            encoded = needle.encode("ascii")
+        for session_id in session_ids or self.session_ids():
+            table, count = self._table(session_id)
+            offsets = struct.unpack_from(f"<{count + 1}Q", self._map, table)
+            for index, (start, end) in enumerate(zip(offsets, offsets[1:])):
+                raw = self._map[start:end]
+                # Skip decoding messages that can't match an ASCII search term
+                if encoded is not None and encoded not in raw.lower():
+                    continue
+                message = loads(raw)
+                if needle and needle not in message["content"].lower():
+                    continue
+                if role and message["role"] != role:
+                    continue
+                if sender and message["sender"] != sender:
+                    continue
+                yield session_id, index, message
+
+    def write_parquet(self, path: Union[str, Path]):
+        """
+        Export every message as one row of a Parquet file.
+
+        Columns are the session id, task and mode followed by the message
+        fields (metadata as a JSON string). Requires pyarrow.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow package not installed. Install with: pip install pyarrow")
+
+        columns: Dict[str, List[Any]] = {
+            name: []
+            for name in (
+                "session_id",
+                "task",
+                "mode",
+                "iteration",
+                "sender",
+                "role",
+                "content",
+                "metadata",
+            )
+        }
+        for entry in self.index:
+            for message in self.messages(entry["session_id"]):
+                columns["session_id"].append(entry["session_id"])
+                columns["task"].append(entry.get("task"))
+                columns["mode"].append(entry.get("mode"))
+                columns["iteration"].append(message["iteration"])
+                columns["sender"].append(message["sender"])
+                columns["role"].append(message["role"])
+                columns["content"].append(message["content"])
+                columns["metadata"].append(dumps(message.get("metadata") or {}))
+        pq.write_table(pa.table(columns), str(path))
+
+    def close(self):
+        """Release the memory map and file."""
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "SessionArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _entry(self, session_id: str) -> Dict[str, Any]:
+        position = self._positions.get(session_id)
+        if position is None:
+            raise KeyError(f"Session {session_id} is not in the archive")
+        return self.index[position]
+
+    def _table(self, session_id: str) -> Tuple[int, int]:
+        """Position of a session's message offset table and its message count."""
+        offset = self._entry(session_id)["offset"]
+        (length,) = _U32.unpack_from(self._map, offset)
+        count_at = offset + _U32.size + length
+        (count,) = _U32.unpack_from(self._map, count_at)
+        return count_at + _U32.size, count
+
+
+def archive_sessions(directory: Union[str, Path], archive: Union[str, Path]) -> List[Path]:
+    """
+    Pack the session files in a directory into an archive.
+
+    Event logs (``session_*.jsonl``) are preferred; a ``session_*.json`` file
+    is used only when its log is missing. Sessions already in the archive
+    are skipped.
+
+    Args:
+        directory: Directory holding session files (e.g. output/sessions)
+        archive: Archive file to append to
+
+    Returns:
+        The files that were archived
+    """
+    directory = Path(directory)
+    logs = {path.stem: path for path in directory.glob("session_*.jsonl")}
+    snapshots = {path.stem: path for path in directory.glob("session_*.json")}
+    sources = sorted({**snapshots, **logs}.items())
+
+    archived = []
+    with SessionArchiveWriter(archive) as writer:
+        for stem, path in sources:
+            if path.suffix == ".jsonl":
+                data = SessionEventLog.load(path)
+            else:
+                data = loads(path.read_bytes())
+            data.setdefault("session_id", stem[len("session_") :])
+            if str(data["session_id"]) in writer:
+                continue
+            writer.add(data)
+            archived.append(path)
+    return archived
@@ -0,0 +1,117 @@
+"""Early-stopping criteria evaluated after each ensemble iteration."""
+
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Iterable, List, Optional, Set
+
+from ..agents.base import AgentRole, Message
+from ..utils.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from .ensemble import Ensemble
+
+
+class StopCriterion(ABC):
+    """Decides whether a collaboration should end before ``max_iterations``."""
+
+    @abstractmethod
+    def check(self, ensemble: "Ensemble", iteration: int, messages: List[Message]) -> Optional[str]:
+        """
+        Inspect the iteration that just finished.
+
+        Args:
+            ensemble: The running ensemble (its history includes ``messages``)
+            iteration: The iteration that just finished
+            messages: Messages produced in that iteration
+
+        Returns:
+            A human-readable reason to stop, or None to continue
+        """
+        pass
+
+
+def _shingles(text: str, size: int = 3) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def similarity(first: str, second: str) -> float:
+    """Jaccard similarity of the word 3-grams of two texts (0.0 to 1.0)."""
+    a, b = _shingles(first), _shingles(second)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityStop(StopCriterion):
+    """Stop once agents mostly repeat what they said in the previous iteration."""
+
+    def __init__(self, threshold: float = 0.8):
+        """
+        Args:
+            threshold: Average per-agent similarity between consecutive
+                iterations at or above which the session has converged
+        """
+        self.threshold = threshold
+
+    def check(self, ensemble: "Ensemble", iteration: int, messages: List[Message]) -> Optional[str]:
+        if iteration == 0:
+            return None
+        previous = {
+            msg.sender: msg.content
+            for msg in ensemble.conversation_history
+            if msg.iteration == iteration - 1
+        }
+        scores = [
+            similarity(previous[msg.sender], msg.content)
+            for msg in messages
+            if msg.sender in previous
+        ]
+        if not scores:
+            return None
+        score = sum(scores) / len(scores)
+        if score >= self.threshold:
+            return f"converged: iteration {iteration} was {score:.0%} similar to the previous one"
+        return None
+
+
+class ConsensusMarkerStop(StopCriterion):
+    """Stop when a synthesizing agent declares that consensus has been reached."""
+
+    def __init__(
+        self,
+        marker: str = "CONSENSUS REACHED",
+        roles: Iterable[AgentRole] = (AgentRole.SYNTHESIZER,),
+    ):
+        """
+        Args:
+            marker: Text (case-insensitive) that declares consensus
+            roles: Roles whose messages may declare it
+        """
+        self.marker = marker.lower()
+        self.roles = set(roles)
+
+    def check(self, ensemble: "Ensemble", iteration: int, messages: List[Message]) -> Optional[str]:
+        for msg in messages:
+            if msg.role in self.roles and self.marker in msg.content.lower():
+                return f"consensus declared by {msg.sender}"
+        return None
+
+
+class TokenBudgetStop(StopCriterion):
+    """Stop once the conversation has produced more than a token budget."""
+
+    def __init__(self, max_tokens: int):
+        """
+        Args:
+            max_tokens: Budget for the estimated tokens of all generated messages
+        """
+        self.max_tokens = max_tokens
+
+    def check(self, ensemble: "Ensemble", iteration: int, messages: List[Message]) -> Optional[str]:
+        used = sum(estimate_tokens(msg.content) for msg in ensemble.conversation_history)
+        if used >= self.max_tokens:
+            return f"token budget reached: ~{used} of {self.max_tokens} tokens used"
+        return None
@@ -0,0 +1,442 @@
+"""
+Long-lived HTTP/WebSocket service running ensemble sessions.
+
+One process serves many sessions, so provider clients (and their connection
+pools), the response cache and metrics are shared across requests instead of
+being rebuilt for every run. Built on asyncio streams only; no web framework
+is required.
+
+Endpoints:
+    GET  /health     Service status: running and queued sessions
+    POST /sessions   Run a session; events are streamed back as NDJSON
+    GET  /sessions   WebSocket upgrade; send the session request as the first
+                     text frame and receive one text frame per event
+
+A session request is a JSON object with ``task`` and optional ``agents``,
+``mode``, ``iterations``, ``model`` and ``stream_tokens`` keys. Events are
+objects with an ``event`` key: ``accepted``, ``token`` (only with
+``stream_tokens``), ``message``, ``session_end`` or ``error``.
+
+Usage:
+    python -m khazar_llms serve --port 8080 --max-sessions 16
+"""
+
+import asyncio
+import base64
+import hashlib
+import struct
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ._http import (
+    MAX_BODY_BYTES,
+    HTTPError,
+    decode_json,
+    json_response,
+    read_request,
+    response_head,
+)
+from .agents.base import Message, TokenEvent
+from .agents.personas import PERSONAS
+from .agents.routing import ModelRouter
+from .orchestration.budget import Budget, BudgetExceeded
+from .orchestration.ensemble import ConversationMode, Ensemble
+from .orchestration.session import CreativeSession
+from .utils.llm_client import LLMClient, ProviderRegistry
+from .utils.metrics import Tracer, default_tracer
+from .utils.serialization import dumps
+
+DEFAULT_AGENTS = ["dreamer", "critic", "synthesizer", "philosopher"]
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT, _WS_CLOSE, _WS_PING, _WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+@dataclass
+class SessionRequest:
+    """A validated request to run one session."""
+
+    task: str
+    agents: List[str] = field(default_factory=lambda: list(DEFAULT_AGENTS))
+    mode: str = "sequential"
+    iterations: int = 3
+    model: Optional[str] = None
+    stream_tokens: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Any, max_iterations: int) -> "SessionRequest":
+        """
+        Validate a decoded request body.
+
+        Raises:
+            HTTPError: 400 when the request is malformed or out of bounds
+        """
+        if not isinstance(data, dict) or not data.get("task"):
+            raise HTTPError(400, "'task' is required")
+        agents = data.get("agents") or list(DEFAULT_AGENTS)
+        unknown = [name for name in agents if name not in PERSONAS]
+        if unknown:
+            raise HTTPError(400, f"Unknown agents {unknown}")
+        try:
+            mode = ConversationMode(data.get("mode", "sequential")).value
+            iterations = int(data.get("iterations", 3))
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+        if not 1 <= iterations <= max_iterations:
+            raise HTTPError(400, f"'iterations' must be between 1 and {max_iterations}")
+        return cls(
+            task=str(data["task"]),
+            agents=agents,
+            mode=mode,
+            iterations=iterations,
+            model=data.get("model"),
+            stream_tokens=bool(data.get("stream_tokens", False)),
+        )
+
+
+class EnsembleServer:
+    """
+    Serves ensemble sessions over HTTP and WebSocket on one event loop.
+
+    At most ``max_sessions`` sessions run at once; up to ``max_queued`` more
+    wait for a slot (for at most ``queue_timeout`` seconds) and anything
+    beyond that is rejected with 503 and a Retry-After header. Events are
+    written as they are produced and each write waits for the client to
+    accept it, so a slow client slows down its own session rather than
+    buffering without bound; a client that accepts nothing for
+    ``write_timeout`` seconds has its session cancelled.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        provider: str = "mock",
+        max_sessions: int = 16,
+        max_queued: int = 64,
+        queue_timeout: float = 30.0,
+        write_timeout: float = 30.0,
+        max_iterations: int = 10,
+        router: Optional[ModelRouter] = None,
+        registry: Optional[ProviderRegistry] = None,
+        tracer: Optional[Tracer] = None,
+        output_dir: Optional[Path] = None,
+        budget: Optional[Budget] = None,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port; see ``port`` after start)
+            provider: LLM provider for every agent
+            max_sessions: Sessions running at once
+            max_queued: Sessions allowed to wait for a running slot
+            queue_timeout: Longest wait for a slot before answering 503
+            write_timeout: Longest wait for a client to accept an event
+            max_iterations: Largest ``iterations`` a request may ask for
+            router: Optional model router applied to every session's agents
+            registry: Provider registry for the agents' clients (defaults to
+                the process-wide registry)
+            tracer: Receives session spans and call metrics (defaults to the
+                process-wide tracer)
+            output_dir: Write an event log per session here (default: none)
+            budget: Token/cost budget of every session; requests estimated to
+                exceed it are rejected with 422 before they are queued
+        """
+        self.host = host
+        self.port = port
+        self.provider = provider
+        self.max_sessions = max_sessions
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.write_timeout = write_timeout
+        self.max_iterations = max_iterations
+        self.router = router
+        self.registry = registry
+        self.tracer = tracer or default_tracer
+        self.output_dir = output_dir
+        self.budget = budget
+        self.active = 0
+        self.queued = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+
+    async def start(self):
+        """Start listening."""
+        self._slots = asyncio.Semaphore(self.max_sessions)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening, cancel open connections and flush metrics."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.tracer.flush()
+
+    def status(self) -> Dict[str, Any]:
+        """Current load, as reported by ``GET /health``."""
+        return {
+            "status": "ok",
+            "active_sessions": self.active,
+            "queued_sessions": self.queued,
+            "max_sessions": self.max_sessions,
+            "max_queued": self.max_queued,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            try:
+                method, path, headers, body = await read_request(reader)
+                if path == "/health" and method == "GET":
+                    await _send_json(writer, 200, self.status())
+                elif path == "/sessions" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, headers)
+                elif path == "/sessions" and method == "POST":
+                    await self._serve_ndjson(writer, body)
+                elif path in ("/health", "/sessions"):
+                    raise HTTPError(405, f"{method} not allowed on {path}")
+                else:
+                    raise HTTPError(404, f"No such endpoint: {path}")
+            except HTTPError as exc:
+                await _send_json(writer, exc.status, {"error": str(exc)}, exc.retry_after)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client went away or stopped reading
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass  # the connection was already reset
+
+    async def _serve_ndjson(self, writer: asyncio.StreamWriter, body: bytes):
+        request = SessionRequest.from_dict(decode_json(body), self.max_iterations)
+        ensemble = self._build_ensemble(request)
+        async with self._admission():
+            writer.write(
+                response_head(
+                    200,
+                    {"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked"},
+                )
+            )
+
+            async def send(event: Dict[str, Any]):
+                data = (dumps(event) + "\n").encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await self._drain(writer)
+
+            await self._run_session(request, ensemble, send)
+            writer.write(b"0\r\n\r\n")
+            await self._drain(writer)
+
+    async def _serve_websocket(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        headers: Dict[str, str],
+    ):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise HTTPError(400, "Missing Sec-WebSocket-Key")
+        accept = base64.b64encode(
+            hashlib.sha1((key + _WEBSOCKET_GUID).encode("ascii")).digest()
+        ).decode("ascii")
+        writer.write(
+            response_head(
+                101,
+                {"Upgrade": "websocket", "Connection": "Upgrade", "Sec-WebSocket-Accept": accept},
+            )
+        )
+        await writer.drain()
+
+        async def send(event: Dict[str, Any]):
+            writer.write(_ws_frame(_WS_TEXT, dumps(event).encode("utf-8")))
+            await self._drain(writer)
+
+        close_code = 1000
+        try:
+            text = await _ws_read_text(reader, writer)
+            if text is None:
+                return
+            request = SessionRequest.from_dict(
+                decode_json(text.encode("utf-8")), self.max_iterations
+            )
+            ensemble = self._build_ensemble(request)
+            async with self._admission():
+                await self._run_session(request, ensemble, send)
+        except HTTPError as exc:
+            await send({"event": "error", "status": exc.status, "error": str(exc)})
+            close_code = 1013 if exc.status == 503 else 1008
+        writer.write(_ws_frame(_WS_CLOSE, struct.pack("!H", close_code)))
+        await writer.drain()
+
+    async def _drain(self, writer: asyncio.StreamWriter):
+        """Wait for the client to accept buffered output (backpressure)."""
+        try:
+            await asyncio.wait_for(writer.drain(), self.write_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("Client stopped reading")
+
+    @asynccontextmanager
+    async def _admission(self) -> AsyncIterator[None]:
+        """Hold a running slot for a session, queueing or rejecting it when busy."""
+        if self.active + self.queued >= self.max_sessions + self.max_queued:
+            raise HTTPError(503, "Too many sessions", retry_after=1)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "Timed out waiting for a session slot", retry_after=1)
+        finally:
+            self.queued -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def _build_ensemble(self, request: SessionRequest) -> Ensemble:
+        """
+        The ensemble that runs a request.
+
+        Raises:
+            HTTPError: 422 when the session's estimate is over the budget
+        """
+        agents = [
+            PERSONAS[name](provider=self.provider, model=request.model) for name in request.agents
+        ]
+        if self.registry is not None:
+            for agent in agents:
+                agent.llm_client = LLMClient(provider=self.provider, registry=self.registry)
+        ensemble = Ensemble(
+            agents=agents,
+            mode=ConversationMode(request.mode),
+            max_iterations=request.iterations,
+            router=self.router,
+            tracer=self.tracer,
+            budget=self.budget,
+        )
+        if self.budget is not None:
+            try:
+                self.budget.admit(ensemble.estimate(request.task))
+            except BudgetExceeded as exc:
+                raise HTTPError(422, str(exc))
+        return ensemble
+
+    async def _run_session(self, request: SessionRequest, ensemble: Ensemble, send):
+        """Run one session, passing each event to ``send`` as it happens."""
+        session = CreativeSession(
+            ensemble,
+            output_dir=self.output_dir,
+            session_id=uuid.uuid4().hex[:12],
+            event_log=self.output_dir is not None,
+        )
+        await send({"event": "accepted", "session_id": session.session_id})
+
+        async def on_message(message: Message):
+            await send({"event": "message", **message.to_dict()})
+
+        async def on_token(event: TokenEvent):
+            await send(
+                {
+                    "event": "token",
+                    "sender": event.sender,
+                    "role": event.role.value,
+                    "iteration": event.iteration,
+                    "text": event.text,
+                    "done": event.done,
+                }
+            )
+
+        try:
+            results = await session.run(
+                request.task,
+                on_token=on_token if request.stream_tokens else None,
+                on_message=on_message,
+            )
+        except ConnectionError:
+            raise  # the client is gone; there is nobody to report to
+        except Exception as exc:
+            await send({"event": "error", "error": f"{type(exc).__name__}: {exc}"})
+            return
+        await send(
+            {
+                "event": "session_end",
+                "session_id": session.session_id,
+                "iterations": results["iterations"],
+                "stop_reason": results["stop_reason"],
+                "duration_seconds": results["duration_seconds"],
+                "usage": results["usage"],
+            }
+        )
+
+
+async def _send_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    body: Dict[str, Any],
+    retry_after: Optional[float] = None,
+):
+    writer.write(json_response(status, body, retry_after=retry_after))
+    await writer.drain()
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    """Encode an unmasked, unfragmented server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def _ws_read_text(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> Optional[str]:
+    """Read client frames until a text message arrives (None if the client closes)."""
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        if not first & 0x80 or length > MAX_BODY_BYTES:
+            raise HTTPError(400, "Fragmented or oversized WebSocket messages are not supported")
+        mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+        payload = bytes(
+            byte ^ mask[i % 4] for i, byte in enumerate(await reader.readexactly(length))
+        )
+        if opcode == _WS_TEXT:
+            try:
+                return payload.decode("utf-8")
+            except UnicodeDecodeError:
+                raise HTTPError(400, "WebSocket text message is not valid UTF-8")
+        if opcode == _WS_CLOSE:
+            return None
+        if opcode == _WS_PING:
+            writer.write(_ws_frame(_WS_PONG, payload))
+            await writer.drain()
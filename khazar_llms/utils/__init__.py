@@ -1,5 +1,96 @@
 """Utility modules for KhazarLLMs."""
 
-from .llm_client import LLMClient
+from typing import TYPE_CHECKING
 
-__all__ = ["LLMClient"]
+from .._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "LLMClient": ".llm_client",
+        "ConnectionPoolConfig": ".llm_client",
+        "ProviderRegistry": ".llm_client",
+        "MockLLMProvider": ".llm_client",
+        "configure_connection_pool": ".llm_client",
+        "configure_mock_provider": ".llm_client",
+        "configure_rate_limits": ".llm_client",
+        "configure_response_cache": ".llm_client",
+        "configure_transport": ".llm_client",
+        "BatchLLMProvider": ".batch_api",
+        "FileBatchBackend": ".batch_api",
+        "configure_batch_provider": ".batch_api",
+        "CascadePolicy": ".cascade",
+        "MemoryCache": ".cache",
+        "ResponseCache": ".cache",
+        "SQLiteCache": ".cache",
+        "CallMetrics": ".metrics",
+        "InMemorySink": ".metrics",
+        "MetricsSink": ".metrics",
+        "OpenTelemetrySink": ".metrics",
+        "PrometheusTextSink": ".metrics",
+        "Span": ".metrics",
+        "Tracer": ".metrics",
+        "configure_metrics": ".metrics",
+        "ProviderScheduler": ".rate_limit",
+        "HedgePolicy": ".retry",
+        "RetryPolicy": ".retry",
+    },
+)
+
+if TYPE_CHECKING:
+    from .llm_client import (
+        LLMClient,
+        ConnectionPoolConfig,
+        ProviderRegistry,
+        MockLLMProvider,
+        configure_connection_pool,
+        configure_mock_provider,
+        configure_rate_limits,
+        configure_response_cache,
+        configure_transport,
+    )
+    from .batch_api import BatchLLMProvider, FileBatchBackend, configure_batch_provider
+    from .cascade import CascadePolicy
+    from .cache import MemoryCache, ResponseCache, SQLiteCache
+    from .metrics import (
+        CallMetrics,
+        InMemorySink,
+        MetricsSink,
+        OpenTelemetrySink,
+        PrometheusTextSink,
+        Span,
+        Tracer,
+        configure_metrics,
+    )
+    from .rate_limit import ProviderScheduler
+    from .retry import HedgePolicy, RetryPolicy
+
+__all__ = [
+    "LLMClient",
+    "ConnectionPoolConfig",
+    "ProviderRegistry",
+    "ProviderScheduler",
+    "RetryPolicy",
+    "HedgePolicy",
+    "CascadePolicy",
+    "configure_connection_pool",
+    "configure_rate_limits",
+    "configure_response_cache",
+    "configure_transport",
+    "MockLLMProvider",
+    "configure_mock_provider",
+    "BatchLLMProvider",
+    "FileBatchBackend",
+    "configure_batch_provider",
+    "ResponseCache",
+    "MemoryCache",
+    "SQLiteCache",
+    "Tracer",
+    "Span",
+    "CallMetrics",
+    "MetricsSink",
+    "InMemorySink",
+    "PrometheusTextSink",
+    "OpenTelemetrySink",
+    "configure_metrics",
+]
@@ -0,0 +1,468 @@
+"""Offline execution of LLM calls through provider batch APIs."""
+
+import asyncio
+import itertools
+import os
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .llm_client import (
+    AnthropicProvider,
+    BaseLLMProvider,
+    Completion,
+    OpenAIProvider,
+    default_registry,
+)
+from .retry import RetryPolicy, is_retryable, retry_after
+from .serialization import dumps, loads
+
+# Terminal batch statuses, as reported by ``BatchBackend.poll``
+BATCH_DONE = ("completed", "failed", "expired", "cancelled")
+
+# One chat completion request of a batch
+BatchRequest = Dict[str, Any]
+
+
+class BatchRequestError(Exception):
+    """A request in a batch failed or got no result."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BatchBackend(ABC):
+    """
+    A batch endpoint: submit many chat requests at once, poll, fetch results.
+
+    Requests are dicts with ``custom_id``, ``model``, ``messages``,
+    ``temperature`` and ``max_tokens``; backends translate them into their
+    provider's format.
+    """
+
+    # Model used for requests that don't name one
+    model: Optional[str] = None
+
+    @abstractmethod
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        """Submit requests as one batch and return its id."""
+
+    @abstractmethod
+    async def poll(self, batch_id: str) -> Optional[str]:
+        """Return the batch's terminal status (see BATCH_DONE), or None while it runs."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> Dict[str, Union[str, BatchRequestError]]:
+        """Map the custom id of each finished request to its text or error."""
+
+    async def cleanup(self, batch_id: str):
+        """Release what the backend keeps for a batch once its results are collected."""
+
+
+def _openai_line(request: BatchRequest, provider: Optional[OpenAIProvider] = None) -> str:
+    """One line of an OpenAI batch input file."""
+    messages = request["messages"]
+    body: Dict[str, Any] = {
+        "model": request["model"],
+        "messages": OpenAIProvider._system_first(messages),
+        "temperature": request["temperature"],
+        "max_tokens": request["max_tokens"],
+    }
+    if provider is not None:
+        body.update(provider._cache_options(messages).get("extra_body", {}))
+    return dumps(
+        {
+            "custom_id": request["custom_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }
+    )
+
+
+def _openai_results(lines: Iterable[str]) -> Dict[str, Union[str, BatchRequestError]]:
+    """Parse the lines of an OpenAI batch output or error file."""
+    results: Dict[str, Union[str, BatchRequestError]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = loads(line)
+        response = record.get("response") or {}
+        status = response.get("status_code")
+        if status == 200:
+            body = response["body"]
+            usage = body.get("usage") or {}
+            results[record["custom_id"]] = Completion(
+                body["choices"][0]["message"]["content"] or "",
+                usage.get("prompt_tokens"),
+                usage.get("completion_tokens"),
+            )
+        else:
+            error = record.get("error") or response.get("body", {}).get("error") or {}
+            message = error.get("message") or f"status {status}"
+            results[record["custom_id"]] = BatchRequestError(message, status)
+    return results
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API for chat completions (24 hour completion window)."""
+
+    def __init__(self, provider: OpenAIProvider, completion_window: str = "24h"):
+        """
+        Initialize the backend.
+
+        Args:
+            provider: The OpenAI provider whose client and request options are used
+            completion_window: Batch completion window requested from OpenAI
+        """
+        self.provider = provider
+        self.client = provider.client
+        self.model = provider.model
+        self.completion_window = completion_window
+        self._files: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        content = "\n".join(_openai_line(request, self.provider) for request in requests)
+        upload = await self.client.files.create(
+            file=("batch.jsonl", content.encode("utf-8")), purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str) -> Optional[str]:
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status not in BATCH_DONE:
+            return None
+        self._files[batch_id] = (batch.output_file_id, batch.error_file_id)
+        return batch.status
+
+    async def results(self, batch_id: str) -> Dict[str, Union[str, BatchRequestError]]:
+        results: Dict[str, Union[str, BatchRequestError]] = {}
+        for file_id in self._files.pop(batch_id, ()):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                results.update(_openai_results(content.text.splitlines()))
+        return results
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API."""
+
+    # Result types that are worth retrying in a later batch, as HTTP statuses
+    _RESULT_STATUS = {"errored": 500, "expired": 408}
+
+    def __init__(self, provider: AnthropicProvider):
+        """
+        Initialize the backend.
+
+        Args:
+            provider: The Anthropic provider whose client and caching setting are used
+        """
+        self.provider = provider
+        self.client = provider.client
+        self.model = provider.model
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch_requests = []
+        for request in requests:
+            system, messages = AnthropicProvider._split_system(
+                request["messages"], self.provider.prompt_caching
+            )
+            params = {
+                "model": request["model"],
+                "messages": messages,
+                "temperature": request["temperature"],
+                "max_tokens": request["max_tokens"],
+            }
+            if system:
+                params["system"] = system
+            batch_requests.append({"custom_id": request["custom_id"], "params": params})
+        batch = await self.client.messages.batches.create(requests=batch_requests)
+        return batch.id
+
+    async def poll(self, batch_id: str) -> Optional[str]:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return "completed" if batch.processing_status == "ended" else None
+
+    async def results(self, batch_id: str) -> Dict[str, Union[str, BatchRequestError]]:
+        results: Dict[str, Union[str, BatchRequestError]] = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                results[entry.custom_id] = Completion(
+                    result.message.content[0].text, *AnthropicProvider._usage(result.message)
+                )
+            else:
+                results[entry.custom_id] = BatchRequestError(
+                    f"Batch request {result.type}", self._RESULT_STATUS.get(result.type)
+                )
+        return results
+
+
+class FileBatchBackend(BatchBackend):
+    """
+    Local stand-in for a batch endpoint, backed by a directory.
+
+    ``submit`` writes ``<batch id>.input.jsonl`` in OpenAI batch format, and
+    a batch is complete once ``<batch id>.output.jsonl`` exists in OpenAI's
+    output format. Output files are written by ``process`` (with a
+    ``responder`` that is done on the first poll) or by any external worker,
+    so tests and offline runs exercise the same path as a real batch API.
+    Both files are deleted once the batch's results have been collected.
+    """
+
+    model = "mock"
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        responder: Optional[BaseLLMProvider] = None,
+    ):
+        """
+        Initialize the backend.
+
+        Args:
+            directory: Directory holding input and output files
+            responder: Provider that answers submitted batches when they are
+                polled (None: wait for an external worker)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.responder = responder
+        if responder is not None and responder.model:
+            self.model = responder.model
+
+    def input_path(self, batch_id: str) -> Path:
+        """The input file of a batch."""
+        return self.directory / f"{batch_id}.input.jsonl"
+
+    def output_path(self, batch_id: str) -> Path:
+        """The output file of a batch."""
+        return self.directory / f"{batch_id}.output.jsonl"
+
+    def pending(self) -> List[str]:
+        """Ids of submitted batches without output, oldest first."""
+        inputs = sorted(self.directory.glob("*.input.jsonl"), key=lambda p: p.stat().st_mtime)
+        batch_ids = [path.name[: -len(".input.jsonl")] for path in inputs]
+        return [batch_id for batch_id in batch_ids if not self.output_path(batch_id).exists()]
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        lines = "".join(_openai_line(request) + "\n" for request in requests)
+        self._write(self.input_path(batch_id), lines)
+        return batch_id
+
+    async def poll(self, batch_id: str) -> Optional[str]:
+        if not self.output_path(batch_id).exists():
+            if self.responder is None:
+                return None
+            await self.process(batch_id, self.responder)
+        return "completed"
+
+    async def results(self, batch_id: str) -> Dict[str, Union[str, BatchRequestError]]:
+        with open(self.output_path(batch_id)) as f:
+            return _openai_results(f)
+
+    async def cleanup(self, batch_id: str):
+        """Delete the batch's input and output files."""
+        for path in (self.input_path(batch_id), self.output_path(batch_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def process(self, batch_id: str, provider: BaseLLMProvider):
+        """
+        Answer a submitted batch with ``provider`` and write its output file.
+
+        Failed requests are written as error lines, like the real endpoint does.
+        """
+        with open(self.input_path(batch_id)) as f:
+            lines = [loads(line) for line in f if line.strip()]
+
+        async def answer(line: Dict[str, Any]) -> str:
+            body = line["body"]
+            record: Dict[str, Any] = {"custom_id": line["custom_id"], "error": None}
+            try:
+                text = await provider.generate(
+                    body["messages"], body["temperature"], body["max_tokens"], body["model"]
+                )
+            except Exception as exc:
+                status = getattr(exc, "status_code", None) or 500
+                record["response"] = {"status_code": status, "body": {}}
+                record["error"] = {"message": f"{type(exc).__name__}: {exc}"}
+            else:
+                choice = {"index": 0, "message": {"role": "assistant", "content": text}}
+                record["response"] = {"status_code": 200, "body": {"choices": [choice]}}
+            return dumps(record) + "\n"
+
+        output = await asyncio.gather(*(answer(line) for line in lines))
+        self._write(self.output_path(batch_id), "".join(output))
+
+    @staticmethod
+    def _write(path: Path, text: str):
+        """Write a file atomically, so pollers never see it half written."""
+        partial = path.with_name(path.name + ".part")
+        partial.write_text(text)
+        os.replace(partial, path)
+
+
+class BatchLLMProvider(BaseLLMProvider):
+    """
+    Provider that sends calls through a batch endpoint instead of chat calls.
+
+    Calls made within ``collect_window`` seconds of each other are submitted
+    as one batch, so the independent turns of an iteration across every
+    session running in the process share a batch. Each caller waits until
+    the batch finishes and then resumes with its own result. Batch APIs are
+    cheaper and outside the synchronous rate limits, but take minutes to
+    hours, so this suits non-interactive runs such as the batch command.
+    """
+
+    # Batches can take hours, so attempts have no deadline by default
+    retry_policy = RetryPolicy(timeout=None)
+    # Backoff for transient failures while polling a submitted batch or fetching
+    # its results; the callers only fail once these attempts are used up
+    poll_retry_policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=60.0, timeout=None)
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        model: Optional[str] = None,
+        collect_window: float = 1.0,
+        max_batch_size: int = 10000,
+        poll_interval: float = 30.0,
+    ):
+        """
+        Initialize the provider.
+
+        Args:
+            backend: The batch endpoint to submit to
+            model: Model for calls that don't name one (defaults to the backend's)
+            collect_window: Seconds to collect calls after the first one
+                before submitting them as a batch
+            max_batch_size: Submit as soon as this many calls are collected
+            poll_interval: Seconds between batch status checks
+        """
+        self.backend = backend
+        self.model = model or backend.model
+        self.client = getattr(backend, "client", None)
+        self.collect_window = collect_window
+        self.max_batch_size = max_batch_size
+        self.poll_interval = poll_interval
+        self.batches_submitted = 0
+        self._queue: List[Tuple[BatchRequest, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+        self._ids = itertools.count()
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> str:
+        """Queue the call for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request = {
+            "custom_id": f"req-{next(self._ids)}",
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        self._queue.append((request, future))
+        if len(self._queue) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.collect_window, self.flush)
+        return await future
+
+    def flush(self):
+        """Submit the calls collected so far as a batch now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._queue = self._queue, []
+        if items:
+            task = asyncio.ensure_future(self._run_batch(items))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _retry_transient(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``call()``, backing off and retrying when it fails transiently."""
+        policy = self.poll_retry_policy
+        for attempt in range(policy.max_attempts):
+            try:
+                return await call()
+            except Exception as exc:
+                if not is_retryable(exc) or attempt + 1 >= policy.max_attempts:
+                    raise
+                await asyncio.sleep(policy.backoff(attempt, retry_after(exc)))
+
+    async def _run_batch(self, items: List[Tuple[BatchRequest, asyncio.Future]]):
+        """
+        Submit one batch, wait for it and hand every caller its result.
+
+        A failed poll or result fetch is retried with backoff, since failing
+        the callers would make them resubmit the whole batch.
+        """
+        batch_id = None
+        try:
+            batch_id = await self.backend.submit([request for request, _ in items])
+            self.batches_submitted += 1
+            status = await self._retry_transient(lambda: self.backend.poll(batch_id))
+            while status is None:
+                await asyncio.sleep(self.poll_interval)
+                status = await self._retry_transient(lambda: self.backend.poll(batch_id))
+            results = await self._retry_transient(lambda: self.backend.results(batch_id))
+        except Exception as exc:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            if batch_id is not None:
+                await self.backend.cleanup(batch_id)
+
+        for request, future in items:
+            if future.done():
+                continue  # the caller gave up waiting
+            result = results.get(request["custom_id"])
+            if result is None:
+                result = BatchRequestError(f"No result in batch {batch_id} ({status})", 408)
+            if isinstance(result, BatchRequestError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def default_batch_directory() -> Path:
+    """Directory the ``mock-batch`` provider keeps its batch files in."""
+    return Path(tempfile.gettempdir()) / "khazar-batches"
+
+
+def configure_batch_provider(
+    backend: BatchBackend, provider: str = "mock", **settings: Any
+) -> BatchLLMProvider:
+    """
+    Make the default registry's ``<provider>-batch`` provider use ``backend``.
+
+    Args:
+        backend: The batch endpoint, e.g. a FileBatchBackend
+        provider: The provider the batch variant belongs to
+        **settings: Any other BatchLLMProvider argument (model, collect_window,
+            max_batch_size, poll_interval)
+    """
+    instance = BatchLLMProvider(backend, **settings)
+    default_registry.register(f"{provider}-batch", instance)
+    return instance
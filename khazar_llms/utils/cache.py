@@ -0,0 +1,129 @@
+"""Response caches for LLM calls."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+
+def cache_key(
+    provider: str,
+    model: Optional[str],
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Hash everything that determines a completion into a cache key."""
+    payload = json.dumps(
+        [provider, model, messages, temperature, max_tokens],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Base class for response caches."""
+
+    def __init__(self, ttl: Optional[float] = None, deterministic_only: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds an entry stays valid (None keeps entries forever)
+            deterministic_only: Only cache calls made with temperature 0
+        """
+        self.ttl = ttl
+        self.deterministic_only = deterministic_only
+
+    def accepts(self, temperature: float) -> bool:
+        """Whether calls at this temperature should be cached."""
+        return not self.deterministic_only or temperature == 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: str):
+        """Store a response under a key."""
+        pass
+
+
+class MemoryCache(ResponseCache):
+    """In-process LRU cache with a size bound."""
+
+    def __init__(self, max_entries: int = 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, response = entry
+        if self._expired(created):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: str):
+        self._entries[key] = (time.time(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """On-disk cache that survives restarts, stored in a SQLite database."""
+
+    def __init__(self, path: Union[str, Path], **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        response, created = row
+        if self._expired(created):
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        return response
+
+    def set(self, key: str, response: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
@@ -0,0 +1,78 @@
+"""Model cascades: a small model drafts, a large model refines only when needed."""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# Scores a draft reply to a chat from 0 (useless) to 1 (good enough to keep)
+DraftScorer = Callable[[List[Dict[str, str]], str], float]
+
+REFINE_INSTRUCTION = (
+    "Revise your previous reply into a stronger, complete answer. "
+    "Keep what works, fix what is weak, and reply with the revised text only."
+)
+
+_HEDGES = re.compile(
+    r"\b(i'?m not sure|i am not sure|i don'?t know|i cannot|i can'?t|as an ai|unable to help)\b",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"\w+")
+
+
+def heuristic_score(messages: List[Dict[str, str]], draft: str, min_words: int = 30) -> float:
+    """
+    Score a draft with cheap text heuristics.
+
+    Starts at 1 and deducts for an empty or very short reply, hedging or
+    refusal phrases, a reply that stops mid-sentence (likely cut off by the
+    token limit) and heavy repetition.
+
+    Args:
+        messages: The chat the draft replies to (unused by this scorer)
+        draft: The draft reply
+        min_words: Replies shorter than this are penalized
+    """
+    words = _WORD.findall(draft.lower())
+    if not words:
+        return 0.0
+    score = 1.0
+    if len(words) < min_words:
+        score -= 0.3
+    if _HEDGES.search(draft):
+        score -= 0.5
+    if not draft.rstrip().endswith((".", "!", "?", '"', "'", ")", "*", "`")):
+        score -= 0.3
+    if len(words) >= min_words and len(set(words)) / len(words) < 0.3:
+        score -= 0.3
+    return max(0.0, score)
+
+
+@dataclass
+class CascadePolicy:
+    """
+    How LLMClient cascades a call from a draft model to a refine model.
+
+    The draft model answers first and ``scorer`` rates its reply. Replies
+    scoring below ``threshold`` are escalated: the refine model is called,
+    with the draft and REFINE_INSTRUCTION appended when ``include_draft`` is
+    set, and its reply is used instead. A failed draft call is escalated too.
+    """
+
+    draft_model: Optional[str] = None  # None: the client's model
+    refine_model: Optional[str] = None  # None: the client's model
+    threshold: float = 0.5
+    scorer: DraftScorer = heuristic_score
+    include_draft: bool = True
+
+    def score(self, messages: List[Dict[str, str]], draft: str) -> float:
+        """Rate a draft reply (see ``scorer``)."""
+        return self.scorer(messages, draft)
+
+    def refine_messages(self, messages: List[Dict[str, str]], draft: str) -> List[Dict[str, str]]:
+        """The chat sent to the refine model."""
+        if not self.include_draft or not draft:
+            return messages
+        return messages + [
+            {"role": "assistant", "content": draft},
+            {"role": "user", "content": REFINE_INSTRUCTION},
+        ]
@@ -0,0 +1,290 @@
+"""Lean HTTP transport for the OpenAI and Anthropic APIs, without the vendor SDKs."""
+
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from .llm_client import AnthropicProvider, Completion, ConnectionPoolConfig, OpenAIProvider
+from .serialization import dumps, loads
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+# Anthropic stream error types, as the HTTP statuses they carry outside a stream
+_STREAM_ERROR_STATUS = {"overloaded_error": 529, "rate_limit_error": 429, "api_error": 500}
+
+
+class ProviderHTTPError(Exception):
+    """An error response from a provider API (status and Retry-After are kept for retries)."""
+
+    def __init__(self, status_code: int, message: str, response: Optional[httpx.Response] = None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.response = response
+
+
+def build_client(pool: Optional[ConnectionPoolConfig] = None) -> httpx.AsyncClient:
+    """
+    Build the HTTP client shared by every lean provider of a registry.
+
+    HTTP/2 is used when the ``h2`` package is installed, so concurrent calls
+    to one host are multiplexed over a single connection; otherwise calls use
+    pooled HTTP/1.1 keep-alive connections. Attempts are bounded by
+    LLMClient's RetryPolicy, so only connecting has a timeout here.
+    """
+    pool = pool or ConnectionPoolConfig()
+    timeout = httpx.Timeout(None, connect=10.0)
+    return pool.build_http_client(httpx.AsyncClient, http2=HTTP2_AVAILABLE, timeout=timeout)
+
+
+async def _raise_for_status(response: httpx.Response):
+    """Raise ProviderHTTPError for an error response, with the API's error message."""
+    if response.status_code < 400:
+        return
+    body = await response.aread()
+    try:
+        message = loads(body)["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        message = body[:200].decode("utf-8", "replace")
+    raise ProviderHTTPError(response.status_code, message, response)
+
+
+async def _sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield the data fields of a server-sent event stream."""
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+class OpenAIHTTPProvider(OpenAIProvider):
+    """
+    OpenAI chat completions over a shared httpx client.
+
+    Works with the OpenAI API and any OpenAI-compatible ``base_url``. Requests
+    are shaped like OpenAIProvider's (system message first, prompt cache key)
+    but responses are decoded as plain JSON, reading only the reply text.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        prompt_cache_key: bool = True,
+    ):
+        """
+        Initialize the provider.
+
+        Args:
+            api_key: API key (defaults to OPENAI_API_KEY)
+            base_url: API endpoint override (defaults to the OpenAI API)
+            http: Shared HTTP client (defaults to a new one from build_client)
+            prompt_cache_key: Send a prompt cache key with OpenAI API requests
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OpenAI API key not found")
+        self.base_url = base_url
+        self.prompt_cache_key = prompt_cache_key
+        self.http = http or build_client()
+        self.url = (base_url or "https://api.openai.com/v1").rstrip("/") + "/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> str:
+        """Generate a response with one chat completions request."""
+        body = self._body(messages, temperature, max_tokens, model)
+        response = await self.http.post(self.url, content=body, headers=self.headers)
+        await _raise_for_status(response)
+        data = loads(response.content)
+        return _openai_completion(data["choices"][0]["message"]["content"] or "", data)
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a response from the chat completions event stream."""
+        body = self._body(messages, temperature, max_tokens, model, stream=True)
+        async with self.http.stream(
+            "POST", self.url, content=body, headers=self.headers
+        ) as response:
+            await _raise_for_status(response)
+            async for data in _sse_data(response):
+                if data == "[DONE]":
+                    break
+                chunk = loads(data)
+                choices = chunk.get("choices")
+                text = choices[0].get("delta", {}).get("content") if choices else None
+                if text:
+                    yield text
+                if chunk.get("usage"):
+                    yield _openai_completion("", chunk)
+
+    def _body(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str],
+        stream: bool = False,
+    ) -> bytes:
+        """Encoded request body."""
+        body: Dict[str, Any] = {
+            "model": model or self.model,
+            "messages": self._system_first(messages),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        body.update(self._cache_options(messages).get("extra_body", {}))
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return dumps(body).encode("utf-8")
+
+
+def _openai_completion(text: str, data: Dict[str, Any]) -> Completion:
+    """``text`` with the usage of an OpenAI response or final stream chunk."""
+    usage = data.get("usage") or {}
+    return Completion(text, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+
+def _anthropic_prompt_tokens(usage: Dict[str, Any]) -> int:
+    """Input tokens of an Anthropic usage block, including cache reads and writes."""
+    return sum(
+        usage.get(name) or 0
+        for name in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    )
+
+
+class AnthropicHTTPProvider(AnthropicProvider):
+    """
+    Anthropic Messages API over a shared httpx client.
+
+    Requests are shaped like AnthropicProvider's (cacheable system prompt) but
+    responses are decoded as plain JSON, reading only the text blocks.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        prompt_caching: bool = True,
+    ):
+        """
+        Initialize the provider.
+
+        Args:
+            api_key: API key (defaults to ANTHROPIC_API_KEY)
+            base_url: API endpoint override (defaults to the Anthropic API)
+            http: Shared HTTP client (defaults to a new one from build_client)
+            prompt_caching: Mark the system prompt cacheable
+        """
+        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        if not self.api_key:
+            raise ValueError("Anthropic API key not found")
+        self.base_url = base_url
+        self.prompt_caching = prompt_caching
+        self.http = http or build_client()
+        self.url = (base_url or "https://api.anthropic.com").rstrip("/") + "/v1/messages"
+        self.headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "Content-Type": "application/json",
+        }
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> str:
+        """Generate a response with one Messages API request."""
+        body = self._body(messages, temperature, max_tokens, model)
+        response = await self.http.post(self.url, content=body, headers=self.headers)
+        await _raise_for_status(response)
+        data = loads(response.content)
+        text = "".join(
+            block.get("text", "") for block in data["content"] if block["type"] == "text"
+        )
+        usage = data.get("usage")
+        if not usage:
+            return Completion(text)
+        return Completion(text, _anthropic_prompt_tokens(usage), usage.get("output_tokens"))
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a response from the Messages API event stream."""
+        body = self._body(messages, temperature, max_tokens, model, stream=True)
+        async with self.http.stream(
+            "POST", self.url, content=body, headers=self.headers
+        ) as response:
+            await _raise_for_status(response)
+            prompt_tokens = completion_tokens = None
+            async for data in _sse_data(response):
+                event = loads(data)
+                kind = event.get("type")
+                if kind == "content_block_delta":
+                    text = event["delta"].get("text")
+                    if text:
+                        yield text
+                elif kind == "message_start" and "usage" in event.get("message", {}):
+                    usage = event["message"]["usage"]
+                    prompt_tokens = _anthropic_prompt_tokens(usage)
+                    completion_tokens = usage.get("output_tokens")
+                elif kind == "message_delta" and "usage" in event:
+                    completion_tokens = event["usage"].get("output_tokens", completion_tokens)
+                elif kind == "message_stop":
+                    if prompt_tokens is not None:
+                        yield Completion("", prompt_tokens, completion_tokens)
+                    break
+                elif kind == "error":
+                    error = event.get("error", {})
+                    status = _STREAM_ERROR_STATUS.get(error.get("type"), 500)
+                    raise ProviderHTTPError(status, error.get("message", "stream error"))
+
+    def _body(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str],
+        stream: bool = False,
+    ) -> bytes:
+        """Encoded request body."""
+        system, chat = self._split_system(messages, self.prompt_caching)
+        body: Dict[str, Any] = {
+            "model": model or self.model,
+            "messages": chat,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if system:
+            body["system"] = system
+        if stream:
+            body["stream"] = True
+        return dumps(body).encode("utf-8")
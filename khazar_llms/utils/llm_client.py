@@ -1,192 +1,841 @@
 """LLM client for communicating with various providers."""
 
+import asyncio
+import functools
+import hashlib
 import os
-from typing import Optional, List, Dict, Any
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Set, Tuple, AsyncIterator, Callable
 from abc import ABC, abstractmethod
 
+from .cache import ResponseCache, cache_key
+from .cascade import CascadePolicy
+from .metrics import CallMetrics, Tracer, default_tracer
+from .rate_limit import ProviderScheduler
+from .retry import (
+    HedgePolicy,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_retries,
+    is_retryable,
+    retry_after,
+)
+from .tokens import estimate_message_tokens, estimate_tokens
+
+
+@dataclass
+class ConnectionPoolConfig:
+    """HTTP connection pool settings shared by every provider client."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+
+    def build_http_client(self, client_class, **options: Any):
+        """Build an async HTTP client of the given (httpx-compatible) class."""
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return client_class(limits=limits, **options)
+
+
+class Completion(str):
+    """
+    Response text carrying the token usage the provider reported for it.
+
+    Providers return a Completion from ``generate`` and may end a stream with
+    an empty one, so LLMClient records billed token counts instead of
+    estimates. Plain strings are accepted wherever a Completion is.
+    """
+
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    def __new__(
+        cls,
+        text: str,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+    ):
+        completion = super().__new__(cls, text)
+        completion.prompt_tokens = prompt_tokens
+        completion.completion_tokens = completion_tokens
+        return completion
+
 
 class BaseLLMProvider(ABC):
     """Base class for LLM providers."""
 
+    # Model used when a call doesn't name one; part of the response cache key
+    model: Optional[str] = None
+    # Retry policy for clients that don't bring their own (None: RetryPolicy())
+    retry_policy: Optional[RetryPolicy] = None
+
     @abstractmethod
     async def generate(
         self,
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
+        model: Optional[str] = None,
     ) -> str:
-        """Generate a response from the LLM."""
+        """Generate a response from the LLM with ``model`` (default: the provider's model)."""
         pass
 
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response as text chunks.
+
+        Providers without native streaming yield the full response as one chunk.
+        """
+        yield await self.generate(messages, temperature, max_tokens, model)
+
+
+# Canned mock responses by the role keyword found in the system prompt, checked in order
+_MOCK_RESPONSES = [
+    (
+        "dreamer",
+        "I envision a world where ideas flow like rivers of light, "
+        "where creativity manifests as living architecture, and where "
+        "every thought births new possibilities. Imagine spaces that shift "
+        "and transform based on the dreams they contain, where visitors "
+        "walk through cascading memories and forgotten aspirations...",
+    ),
+    (
+        "critic",
+        "While this idea has merit, we must examine its foundations. "
+        "Are we considering the practical implications? What assumptions "
+        "are we making that might not hold? I see potential issues with "
+        "accessibility, sustainability, and the very nature of how we "
+        "preserve ephemeral experiences. Let's dig deeper.",
+    ),
+    (
+        "synthesizer",
+        "Drawing together these diverse perspectives, I see a unified vision: "
+        "we can combine the imaginative elements with structured implementation, "
+        "creating something both beautiful and functional. The dreamer's vision "
+        "of flowing spaces meets the critic's need for practicality in a design "
+        "that honors both creativity and constraint.",
+    ),
+    (
+        "philosopher",
+        "What does it mean to preserve that which is forgotten? The paradox "
+        "of remembering the forgotten touches on fundamental questions about "
+        "memory, identity, and the nature of loss. This museum would be a "
+        "meditation on impermanence and the stories we choose to keep alive.",
+    ),
+    (
+        "rebel",
+        "Why should forgotten dreams be preserved at all? Perhaps they should "
+        "remain forgotten! What if instead we created a museum that actively "
+        "destroys memories, that celebrates forgetting as liberation? Let's "
+        "challenge the entire premise of preservation and archival.",
+    ),
+    (
+        "architect",
+        "Let me outline a concrete structure: Entry through a twilight portal, "
+        "three main wings representing childhood, adult, and collective dreams, "
+        "interconnected by spiral pathways. Each exhibit uses immersive "
+        "technology while maintaining intimate, contemplative spaces. "
+        "The building itself should reflect dream logic in its geometry.",
+    ),
+    (
+        "poet",
+        "This museum is itself a dream unfolding in stone and light. "
+        "Each gallery a whispered memory, each corridor a breath between "
+        "sleeping and waking. Visitors become characters in a story they've "
+        "forgotten they knew, walking through chambers where the impossible "
+        "becomes, for a moment, achingly real.",
+    ),
+]
+
+_MOCK_DEFAULT_RESPONSE = (
+    "This is a fascinating perspective that deserves deeper consideration. "
+    "Let me reflect on how it connects to our broader goals and the "
+    "creative challenge we're exploring together..."
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _mock_chunks(system_prompt: str, words: Optional[int]) -> Tuple[str, ...]:
+    """Word chunks of the canned response for a system prompt (looked up once per prompt)."""
+    lowered = system_prompt.lower()
+    text = next(
+        (response for keyword, response in _MOCK_RESPONSES if keyword in lowered),
+        _MOCK_DEFAULT_RESPONSE,
+    )
+    chunks = re.findall(r"\S+\s*", text)
+    if words is not None:
+        # Repeat or cut the response to the requested length
+        chunks = [chunks[i % len(chunks)] for i in range(words)]
+        chunks = [chunk if chunk[-1].isspace() else chunk + " " for chunk in chunks]
+        if chunks:
+            chunks[-1] = chunks[-1].rstrip()
+    return tuple(chunks)
+
+
+class MockProviderError(Exception):
+    """Simulated provider failure raised by MockLLMProvider."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Simulated mock provider error (status {status_code})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 class MockLLMProvider(BaseLLMProvider):
-    """Mock LLM provider for testing without API calls."""
+    """
+    Mock LLM provider for testing without API calls.
+
+    By default it answers instantly with a canned response for the agent
+    role named in the system prompt. For load tests it can simulate latency,
+    streaming speed, failures, rate limiting and response length. Every
+    random draw comes from a generator seeded with ``seed``, the prompt and
+    how often that prompt has been sent, so a run is reproducible whatever
+    order concurrent calls happen to be made in.
+    """
+
+    model = "mock"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_sigma: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        response_words: Optional[int] = None,
+        seed: int = 0,
+        max_prompts: int = 10000,
+    ):
+        """
+        Initialize the mock provider.
+
+        Args:
+            latency: Median seconds before the first token
+            latency_sigma: Spread of the lognormal latency distribution (0 is fixed)
+            tokens_per_second: Generation speed after the first token (None is instant)
+            error_rate: Fraction of calls failing with a 500 error
+            rate_limit_rate: Fraction of calls failing with a 429 error
+            retry_after: Retry-After seconds sent with simulated 429s
+            response_words: Repeat or cut responses to this many words
+            seed: Seed for every simulated random draw
+            max_prompts: Prompts whose send count is remembered; the least
+                recently sent are forgotten (and count from zero again) beyond it
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.response_words = response_words
+        self.seed = seed
+        self.max_prompts = max_prompts
+        self._sent: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def simulated(self) -> bool:
+        """Whether any latency or failure is simulated."""
+        return bool(
+            self.latency or self.tokens_per_second or self.error_rate or self.rate_limit_rate
+        )
 
     async def generate(
         self,
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
+        model: Optional[str] = None,
     ) -> str:
         """Generate a mock response."""
-        system_prompt = ""
-        user_content = ""
-        
-        for msg in messages:
-            if msg.get("role") == "system":
-                system_prompt = msg.get("content", "").lower()
-            elif msg.get("role") == "user":
-                user_content = msg.get("content", "").lower()
-        
-        # Generate contextual mock response based on agent role
-        if "dreamer" in system_prompt:
-            return (
-                "I envision a world where ideas flow like rivers of light, "
-                "where creativity manifests as living architecture, and where "
-                "every thought births new possibilities. Imagine spaces that shift "
-                "and transform based on the dreams they contain, where visitors "
-                "walk through cascading memories and forgotten aspirations..."
-            )
-        elif "critic" in system_prompt:
-            return (
-                "While this idea has merit, we must examine its foundations. "
-                "Are we considering the practical implications? What assumptions "
-                "are we making that might not hold? I see potential issues with "
-                "accessibility, sustainability, and the very nature of how we "
-                "preserve ephemeral experiences. Let's dig deeper."
-            )
-        elif "synthesizer" in system_prompt:
-            return (
-                "Drawing together these diverse perspectives, I see a unified vision: "
-                "we can combine the imaginative elements with structured implementation, "
-                "creating something both beautiful and functional. The dreamer's vision "
-                "of flowing spaces meets the critic's need for practicality in a design "
-                "that honors both creativity and constraint."
-            )
-        elif "philosopher" in system_prompt:
-            return (
-                "What does it mean to preserve that which is forgotten? The paradox "
-                "of remembering the forgotten touches on fundamental questions about "
-                "memory, identity, and the nature of loss. This museum would be a "
-                "meditation on impermanence and the stories we choose to keep alive."
-            )
-        elif "rebel" in system_prompt:
-            return (
-                "Why should forgotten dreams be preserved at all? Perhaps they should "
-                "remain forgotten! What if instead we created a museum that actively "
-                "destroys memories, that celebrates forgetting as liberation? Let's "
-                "challenge the entire premise of preservation and archival."
-            )
-        elif "architect" in system_prompt:
-            return (
-                "Let me outline a concrete structure: Entry through a twilight portal, "
-                "three main wings representing childhood, adult, and collective dreams, "
-                "interconnected by spiral pathways. Each exhibit uses immersive "
-                "technology while maintaining intimate, contemplative spaces. "
-                "The building itself should reflect dream logic in its geometry."
-            )
-        elif "poet" in system_prompt:
-            return (
-                "This museum is itself a dream unfolding in stone and light. "
-                "Each gallery a whispered memory, each corridor a breath between "
-                "sleeping and waking. Visitors become characters in a story they've "
-                "forgotten they knew, walking through chambers where the impossible "
-                "becomes, for a moment, achingly real."
-            )
-        else:
-            return (
-                "This is a fascinating perspective that deserves deeper consideration. "
-                "Let me reflect on how it connects to our broader goals and the "
-                "creative challenge we're exploring together..."
-            )
+        chunks = self._chunks(messages)
+        if self.simulated:
+            await self._simulate_request(messages)
+            if self.tokens_per_second:
+                await asyncio.sleep(len(chunks) / self.tokens_per_second)
+        return "".join(chunks)
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the mock response word by word."""
+        chunks = self._chunks(messages)
+        if self.simulated:
+            await self._simulate_request(messages)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(delay)
+
+    def _chunks(self, messages: List[Dict[str, str]]) -> Tuple[str, ...]:
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        return _mock_chunks(system_prompt, self.response_words)
+
+    async def _simulate_request(self, messages: List[Dict[str, str]]):
+        """Wait out the simulated latency, then fail if this call draws an error."""
+        rng = self._rng(messages)
+        if self.latency:
+            latency = self.latency
+            if self.latency_sigma:
+                latency *= rng.lognormvariate(0.0, self.latency_sigma)
+            await asyncio.sleep(latency)
+        draw = rng.random()
+        if draw < self.rate_limit_rate:
+            raise MockProviderError(429, retry_after=self.retry_after)
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise MockProviderError(500)
+
+    def _rng(self, messages: List[Dict[str, str]]) -> random.Random:
+        """Random generator for this call, independent of the order of other calls."""
+        digest = hashlib.sha256(
+            "\0".join(m.get("content", "") for m in messages).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            sent = self._sent.get(digest, 0)
+            self._sent[digest] = sent + 1
+            self._sent.move_to_end(digest)
+            while len(self._sent) > self.max_prompts:
+                self._sent.popitem(last=False)
+        return random.Random(f"{self.seed}:{digest}:{sent}")
 
 
 class OpenAIProvider(BaseLLMProvider):
-    """OpenAI API provider."""
+    """
+    OpenAI API provider.
+
+    OpenAI caches prompt prefixes automatically. Requests put the system
+    message first and, on the OpenAI API itself, carry a ``prompt_cache_key``
+    derived from it, so calls sharing a persona's system prompt are routed to
+    the same cache.
+    """
 
-    def __init__(self, api_key: Optional[str] = None):
+    model = "gpt-4"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        pool: Optional[ConnectionPoolConfig] = None,
+        prompt_cache_key: bool = True,
+    ):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not found")
-        
+        self.base_url = base_url
+        self.prompt_cache_key = prompt_cache_key
+
         try:
             import openai
-            self.client = openai.AsyncOpenAI(api_key=self.api_key)
         except ImportError:
             raise ImportError("openai package not installed. Install with: pip install openai")
 
+        pool = pool or ConnectionPoolConfig()
+        # Retries are handled by LLMClient's RetryPolicy
+        self.client = openai.AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=pool.build_http_client(openai.DefaultAsyncHttpxClient),
+        )
+
     async def generate(
         self,
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
+        model: Optional[str] = None,
     ) -> str:
         """Generate a response using OpenAI API."""
         response = await self.client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
+            model=model or self.model,
+            messages=self._system_first(messages),
             temperature=temperature,
             max_tokens=max_tokens,
+            **self._cache_options(messages),
+        )
+        usage = getattr(response, "usage", None)
+        return Completion(
+            response.choices[0].message.content or "",
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
         )
-        return response.choices[0].message.content
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a response using the OpenAI API."""
+        stream = await self.client.chat.completions.create(
+            model=model or self.model,
+            messages=self._system_first(messages),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._cache_options(messages),
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                yield Completion("", usage.prompt_tokens, usage.completion_tokens)
+
+    @staticmethod
+    def _system_first(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Move system messages to the front so the cacheable prefix is stable."""
+        return sorted(messages, key=lambda m: m["role"] != "system")
+
+    def _cache_options(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Extra request fields keying the prompt cache on the system prompt."""
+        # OpenAI-compatible servers behind a base_url may reject unknown fields
+        if not self.prompt_cache_key or self.base_url is not None:
+            return {}
+        system = "".join(m["content"] for m in messages if m["role"] == "system")
+        if not system:
+            return {}
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+        return {"extra_body": {"prompt_cache_key": f"khazar-{key}"}}
 
 
 class AnthropicProvider(BaseLLMProvider):
-    """Anthropic Claude API provider."""
+    """
+    Anthropic Claude API provider.
+
+    System prompts are sent with a ``cache_control`` breakpoint so repeated
+    calls with the same persona read the prefix from Anthropic's prompt cache.
+    Prompts shorter than the model's minimum cacheable length are simply not
+    cached.
+    """
 
-    def __init__(self, api_key: Optional[str] = None):
+    model = "claude-3-opus-20240229"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        pool: Optional[ConnectionPoolConfig] = None,
+        prompt_caching: bool = True,
+    ):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("Anthropic API key not found")
-        
+        self.base_url = base_url
+        self.prompt_caching = prompt_caching
+
         try:
             import anthropic
-            self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
         except ImportError:
             raise ImportError("anthropic package not installed. Install with: pip install anthropic")
 
+        pool = pool or ConnectionPoolConfig()
+        # Retries are handled by LLMClient's RetryPolicy
+        self.client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=pool.build_http_client(anthropic.DefaultAsyncHttpxClient),
+        )
+
     async def generate(
         self,
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
+        model: Optional[str] = None,
     ) -> str:
         """Generate a response using Anthropic API."""
-        # Convert OpenAI-style messages to Anthropic format
-        system_message = next((m["content"] for m in messages if m["role"] == "system"), None)
-        user_messages = [m for m in messages if m["role"] != "system"]
-        
+        system_message, user_messages = self._split_system(messages, self.prompt_caching)
+
         response = await self.client.messages.create(
-            model="claude-3-opus-20240229",
+            model=model or self.model,
+            system=system_message,
+            messages=user_messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return Completion(response.content[0].text, *self._usage(response))
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a response using Anthropic API."""
+        system_message, user_messages = self._split_system(messages, self.prompt_caching)
+
+        async with self.client.messages.stream(
+            model=model or self.model,
             system=system_message,
             messages=user_messages,
             temperature=temperature,
             max_tokens=max_tokens,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            yield Completion("", *self._usage(await stream.get_final_message()))
+
+    @staticmethod
+    def _usage(message: Any) -> Tuple[Optional[int], Optional[int]]:
+        """Prompt and completion tokens of a message; prompt includes cache reads and writes."""
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return None, None
+        prompt = sum(
+            getattr(usage, name, None) or 0
+            for name in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
         )
-        return response.content[0].text
+        return prompt, usage.output_tokens
+
+    @staticmethod
+    def _split_system(messages: List[Dict[str, str]], cache: bool = False):
+        """
+        Convert OpenAI-style messages to Anthropic's system + messages format.
+
+        Args:
+            messages: OpenAI-style messages
+            cache: Send the system prompt as a text block marked cacheable
+        """
+        system_message = next((m["content"] for m in messages if m["role"] == "system"), None)
+        user_messages = [m for m in messages if m["role"] != "system"]
+        if cache and system_message:
+            system_message = [
+                {"type": "text", "text": system_message, "cache_control": {"type": "ephemeral"}}
+            ]
+        return system_message, user_messages
+
+
+class ProviderRegistry:
+    """
+    Process-wide cache of provider instances.
+
+    Providers are keyed by (provider, api_key, base_url), so every agent and
+    ensemble talking to the same endpoint shares one SDK client and therefore
+    one HTTP connection pool.
+
+    With the ``http`` transport, OpenAI and Anthropic providers skip the
+    vendor SDKs and all share one lean httpx client (HTTP/2 when ``h2`` is
+    installed) instead; see ``khazar_llms.utils.http_transport``.
+
+    Pooled clients belong to the event loop they are used on. When the
+    registry is used from a new loop (e.g. successive ``asyncio.run`` calls),
+    the providers it created are replaced by fresh ones; the old pools are
+    abandoned rather than closed, as their loop is gone. Call ``aclose`` at
+    the end of a loop to close them cleanly.
+    """
+
+    TRANSPORTS = ("sdk", "http")
+
+    _ENV_KEYS = {
+        "openai": "OPENAI_API_KEY",
+        "anthropic": "ANTHROPIC_API_KEY",
+        "openai-batch": "OPENAI_API_KEY",
+        "anthropic-batch": "ANTHROPIC_API_KEY",
+    }
+
+    def __init__(self, pool: Optional[ConnectionPoolConfig] = None, transport: str = "sdk"):
+        self.pool = pool or ConnectionPoolConfig()
+        self.configure_transport(transport)
+        self._http = None  # shared client of the http transport, created on first use
+        self._providers: Dict[Tuple[str, Optional[str], Optional[str]], BaseLLMProvider] = {}
+        # Keys of the providers created here (not registered), and the loop they belong to
+        self._created: Set[Tuple[str, Optional[str], Optional[str]]] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._schedulers: Dict[str, ProviderScheduler] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        # Response cache used by clients that don't bring their own
+        self.cache: Optional[ResponseCache] = None
+
+    def configure_pool(self, **settings: Any):
+        """
+        Update connection pool settings for providers created afterwards.
+
+        Args:
+            **settings: Any ConnectionPoolConfig field (max_connections,
+                max_keepalive_connections, keepalive_expiry)
+        """
+        for name, value in settings.items():
+            if not hasattr(self.pool, name):
+                raise ValueError(f"Unknown connection pool setting: {name}")
+            setattr(self.pool, name, value)
+
+    def configure_transport(self, transport: str):
+        """
+        Choose how providers created afterwards talk to OpenAI and Anthropic.
+
+        Args:
+            transport: 'sdk' (the vendor SDK clients) or 'http' (the lean
+                shared httpx transport)
+        """
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        self.transport = transport
+
+    def configure_rate_limits(
+        self,
+        provider: str,
+        max_in_flight: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        """
+        Limit the calls made to a provider by every client in the process.
+
+        Args:
+            provider: Provider name ('openai', 'anthropic', or 'mock')
+            max_in_flight: Maximum concurrent requests
+            requests_per_minute: Request rate limit
+            tokens_per_minute: Token rate limit
+        """
+        scheduler = ProviderScheduler(max_in_flight, requests_per_minute, tokens_per_minute)
+        with self._lock:
+            self._schedulers[provider.lower()] = scheduler
+
+    def scheduler(self, provider: str) -> ProviderScheduler:
+        """Return the shared scheduler that paces calls to a provider."""
+        name = provider.lower()
+        scheduler = self._schedulers.get(name)
+        if scheduler is None:
+            with self._lock:
+                scheduler = self._schedulers.setdefault(name, ProviderScheduler())
+        return scheduler
+
+    def latency(self, provider: str) -> LatencyTracker:
+        """Return the shared tracker of recent call latencies for a provider."""
+        name = provider.lower()
+        tracker = self._latencies.get(name)
+        if tracker is None:
+            with self._lock:
+                tracker = self._latencies.setdefault(name, LatencyTracker())
+        return tracker
+
+    def get(
+        self,
+        provider: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ) -> BaseLLMProvider:
+        """Return the shared provider instance, creating it on first use."""
+        key = self._key(provider, api_key, base_url)
+        with self._lock:
+            self._bind_loop()
+            instance = self._providers.get(key)
+            if instance is None:
+                instance = self._create(*key)
+                self._providers[key] = instance
+                self._created.add(key)
+        return instance
+
+    def _bind_loop(self):
+        # Providers created for an earlier event loop hold connection pools
+        # bound to it; forget them so they are recreated for the running loop
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if loop is not self._loop:
+            if self._loop is not None:
+                for key in self._created:
+                    del self._providers[key]
+                self._created.clear()
+                self._http = None
+            self._loop = loop
+
+    def register(
+        self,
+        provider: str,
+        instance: BaseLLMProvider,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
+        """Use ``instance`` for clients of this provider (e.g. a configured mock)."""
+        key = self._key(provider, api_key, base_url)
+        with self._lock:
+            self._providers[key] = instance
+            self._created.discard(key)
+
+    def _key(
+        self, provider: str, api_key: Optional[str], base_url: Optional[str]
+    ) -> Tuple[str, Optional[str], Optional[str]]:
+        name = provider.lower()
+        env_key = self._ENV_KEYS.get(name)
+        if env_key:
+            api_key = api_key or os.getenv(env_key)
+        return (name, api_key, base_url)
+
+    def _create(
+        self, name: str, api_key: Optional[str], base_url: Optional[str]
+    ) -> BaseLLMProvider:
+        pool = ConnectionPoolConfig(**vars(self.pool))
+        if name == "mock":
+            return MockLLMProvider()
+        elif name in ("openai", "anthropic") and self.transport == "http":
+            from . import http_transport
+
+            if self._http is None:
+                self._http = http_transport.build_client(pool)
+            if name == "openai":
+                return http_transport.OpenAIHTTPProvider(api_key, base_url, http=self._http)
+            return http_transport.AnthropicHTTPProvider(api_key, base_url, http=self._http)
+        elif name == "openai":
+            return OpenAIProvider(api_key, base_url=base_url, pool=pool)
+        elif name == "anthropic":
+            return AnthropicProvider(api_key, base_url=base_url, pool=pool)
+        elif name.endswith("-batch"):
+            from . import batch_api
+
+            if name == "mock-batch":
+                backend = batch_api.FileBatchBackend(
+                    batch_api.default_batch_directory(), responder=MockLLMProvider()
+                )
+                return batch_api.BatchLLMProvider(backend, poll_interval=0.05)
+            if name == "openai-batch":
+                provider = OpenAIProvider(api_key, base_url=base_url, pool=pool)
+                return batch_api.BatchLLMProvider(batch_api.OpenAIBatchBackend(provider))
+            if name == "anthropic-batch":
+                provider = AnthropicProvider(api_key, base_url=base_url, pool=pool)
+                return batch_api.BatchLLMProvider(batch_api.AnthropicBatchBackend(provider))
+        raise ValueError(f"Unknown provider: {name}")
+
+    async def aclose(self):
+        """Close every pooled client and forget the cached providers."""
+        with self._lock:
+            providers = list(self._providers.values())
+            self._providers.clear()
+            self._created.clear()
+        for instance in providers:
+            client = getattr(instance, "client", None)
+            if client is not None and hasattr(client, "close"):
+                await client.close()
+        http, self._http = self._http, None
+        if http is not None:
+            await http.aclose()
+
+
+# Registry shared by every LLMClient unless one is passed explicitly
+default_registry = ProviderRegistry()
+
+
+def configure_connection_pool(**settings: Any):
+    """Configure the connection pool used by the default provider registry."""
+    default_registry.configure_pool(**settings)
+
+
+def configure_transport(transport: str):
+    """Set the default registry's transport ('sdk' or 'http') for providers created later."""
+    default_registry.configure_transport(transport)
+
+
+def configure_rate_limits(provider: str, **limits: Any):
+    """Configure process-wide rate limits for a provider in the default registry."""
+    default_registry.configure_rate_limits(provider, **limits)
+
+
+def configure_response_cache(cache: Optional[ResponseCache]):
+    """Set the response cache shared by clients of the default registry (None disables)."""
+    default_registry.cache = cache
+
+
+def configure_mock_provider(**settings: Any) -> MockLLMProvider:
+    """
+    Replace the default registry's mock provider with one simulating load.
+
+    Args:
+        **settings: Any MockLLMProvider argument (latency, latency_sigma,
+            tokens_per_second, error_rate, rate_limit_rate, retry_after,
+            response_words, seed)
+    """
+    provider = MockLLMProvider(**settings)
+    default_registry.register("mock", provider)
+    return provider
 
 
 class LLMClient:
     """Client for interacting with various LLM providers."""
 
-    def __init__(self, provider: str = "mock", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str = "mock",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        registry: Optional[ProviderRegistry] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        model: Optional[str] = None,
+        tracer: Optional[Tracer] = None,
+        cascade: Optional[CascadePolicy] = None,
+    ):
         """
         Initialize the LLM client.
-        
+
         Args:
-            provider: The LLM provider to use ('openai', 'anthropic', or 'mock')
+            provider: The LLM provider to use ('openai', 'anthropic', or 'mock'),
+                or its batch API variant ('openai-batch', ...)
             api_key: Optional API key (will use environment variable if not provided)
+            base_url: Optional API endpoint override (e.g. an OpenAI-compatible server)
+            registry: Provider registry to draw shared providers from
+                (defaults to the process-wide registry)
+            retry_policy: Retry, backoff and deadline settings for each call
+                (defaults to the provider's)
+            hedge: Optional policy for hedging slow non-streaming calls
+            cache: Response cache (defaults to the registry's shared cache, if any)
+            model: Model for calls that don't name one (defaults to the provider's)
+            tracer: Receives the metrics of every call (defaults to the
+                process-wide tracer)
+            cascade: Default draft/refine cascade for chat calls (none: one
+                call to one model)
         """
         self.provider_name = provider.lower()
-        
-        if self.provider_name == "mock":
-            self.provider = MockLLMProvider()
-        elif self.provider_name == "openai":
-            self.provider = OpenAIProvider(api_key)
-        elif self.provider_name == "anthropic":
-            self.provider = AnthropicProvider(api_key)
-        else:
-            raise ValueError(f"Unknown provider: {provider}")
+        self.registry = registry or default_registry
+        self._api_key = api_key
+        self._base_url = base_url
+        self._provider: Optional[BaseLLMProvider] = None
+        self.retry_policy = retry_policy or self.provider.retry_policy or RetryPolicy()
+        self.hedge = hedge
+        self._cache = cache
+        self.model = model or self.provider.model
+        self.tracer = tracer or default_tracer
+        self.cascade = cascade
+
+    @property
+    def provider(self) -> BaseLLMProvider:
+        """The provider calls go to (the registry's current one unless set explicitly)."""
+        if self._provider is not None:
+            return self._provider
+        return self.registry.get(self.provider_name, self._api_key, self._base_url)
+
+    @provider.setter
+    def provider(self, instance: BaseLLMProvider):
+        self._provider = instance
 
     async def generate_response(
         self,
@@ -194,6 +843,7 @@ class LLMClient:
         user_message: str,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        model: Optional[str] = None,
     ) -> str:
         """
         Generate a response from the LLM.
@@ -203,6 +853,7 @@ class LLMClient:
             user_message: The user's message or task
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
+            model: Model to use for this call (defaults to the client's model)
             
         Returns:
             The generated response text
@@ -211,5 +862,315 @@ class LLMClient:
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message},
         ]
-        
-        return await self.provider.generate(messages, temperature, max_tokens)
+        return await self.generate_chat(messages, temperature, max_tokens, model)
+
+    def stream_response(
+        self,
+        system_prompt: str,
+        user_message: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM as it is generated.
+
+        Args:
+            system_prompt: The system prompt defining agent behavior
+            user_message: The user's message or task
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            model: Model to use for this call (defaults to the client's model)
+
+        Returns:
+            An async iterator of text chunks (see ``stream_chat``)
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ]
+        return self.stream_chat(messages, temperature, max_tokens, model)
+
+    async def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        model: Optional[str] = None,
+        cascade: Optional[CascadePolicy] = None,
+    ) -> str:
+        """
+        Generate the next assistant message of a multi-turn conversation.
+
+        Args:
+            messages: Chat messages, oldest first: an optional system message,
+                then alternating user and assistant turns ending with a user turn
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            model: Model to use for this call (defaults to the client's model)
+            cascade: Draft/refine cascade for this call (defaults to the
+                client's); its models take the place of ``model``
+
+        Returns:
+            The generated response text
+        """
+        cascade = cascade or self.cascade
+        if cascade is None:
+            metrics = CallMetrics(self.provider_name, model or self.model)
+            return await self._complete(messages, temperature, max_tokens, metrics)
+
+        draft, escalate = await self._draft(messages, temperature, max_tokens, cascade)
+        if not escalate:
+            return draft
+        metrics = CallMetrics(
+            self.provider_name, cascade.refine_model or self.model, cascade_stage="refine"
+        )
+        refine_messages = cascade.refine_messages(messages, draft)
+        return await self._complete(refine_messages, temperature, max_tokens, metrics)
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        model: Optional[str] = None,
+        cascade: Optional[CascadePolicy] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the next assistant message of a multi-turn conversation.
+
+        Args:
+            messages: Chat messages, as for ``generate_chat``
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            model: Model to use for this call (defaults to the client's model)
+            cascade: Draft/refine cascade for this call (defaults to the client's)
+
+        Returns:
+            An async iterator of text chunks in the order the provider
+            produces them
+
+        The retry policy's ``timeout`` bounds the wait for each chunk, and a
+        failed stream is only retried if nothing has been yielded yet. Under
+        a cascade the draft is generated whole, since it may be discarded: an
+        accepted draft arrives as a single chunk, while an escalated turn
+        streams the refine model's reply.
+        """
+        cascade = cascade or self.cascade
+        if cascade is None:
+            metrics = CallMetrics(self.provider_name, model or self.model, streamed=True)
+            return self._stream(messages, temperature, max_tokens, metrics)
+        return self._stream_cascade(messages, temperature, max_tokens, cascade)
+
+    async def _draft(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cascade: CascadePolicy,
+    ) -> Tuple[str, bool]:
+        """Run the draft stage of a cascade; return the draft and whether to escalate."""
+        metrics = CallMetrics(
+            self.provider_name, cascade.draft_model or self.model, cascade_stage="draft"
+        )
+
+        def review(draft: str):
+            metrics.cascade_score = cascade.score(messages, draft)
+            metrics.escalated = metrics.cascade_score < cascade.threshold
+
+        try:
+            draft = await self._complete(messages, temperature, max_tokens, metrics, review)
+        except Exception:
+            return "", True  # the refine model gets a chance when the draft fails
+        return draft, metrics.escalated
+
+    async def _stream_cascade(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cascade: CascadePolicy,
+    ) -> AsyncIterator[str]:
+        draft, escalate = await self._draft(messages, temperature, max_tokens, cascade)
+        if not escalate:
+            yield draft
+            return
+        metrics = CallMetrics(
+            self.provider_name,
+            cascade.refine_model or self.model,
+            streamed=True,
+            cascade_stage="refine",
+        )
+        stream = self._stream(
+            cascade.refine_messages(messages, draft), temperature, max_tokens, metrics
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        metrics: CallMetrics,
+        review: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Make one non-streaming call to ``metrics.model`` and record its metrics.
+
+        ``review`` sees the response before the metrics are recorded, so it
+        can annotate them.
+        """
+        model = metrics.model
+        metrics.prompt_tokens = estimate_message_tokens(messages)
+        started = time.perf_counter()
+        try:
+            key = self._cache_key(messages, temperature, max_tokens, model)
+            response = self.cache.get(key) if key is not None else None
+            if response is not None:
+                metrics.cache_hit = True
+            else:
+
+                async def attempt():
+                    metrics.attempts += 1
+                    async with self._slot(metrics.prompt_tokens, max_tokens):
+                        return await self.provider.generate(
+                            messages, temperature, max_tokens, model
+                        )
+
+                response = await call_with_retries(
+                    attempt,
+                    self.retry_policy,
+                    hedge=self.hedge,
+                    latency=self.registry.latency(self.provider_name),
+                )
+                if key is not None:
+                    self.cache.set(key, str(response))
+            if not _record_usage(metrics, response):
+                metrics.completion_tokens = estimate_tokens(response)
+            if review is not None:
+                review(response)
+            return str(response)
+        except BaseException as exc:
+            metrics.error = type(exc).__name__
+            raise
+        finally:
+            metrics.latency = time.perf_counter() - started
+            self.tracer.record_call(metrics)
+
+    async def _stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        metrics: CallMetrics,
+    ) -> AsyncIterator[str]:
+        """Make one streaming call to ``metrics.model`` and record its metrics."""
+        model = metrics.model
+        metrics.prompt_tokens = estimate_message_tokens(messages)
+        started = time.perf_counter()
+        chunks: List[str] = []
+        try:
+            key = self._cache_key(messages, temperature, max_tokens, model)
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                metrics.cache_hit = True
+                metrics.time_to_first_token = time.perf_counter() - started
+                chunks.append(cached)
+                yield cached
+                return
+
+            # Failures are retried only until the first chunk has been yielded;
+            # the policy's deadline bounds the whole stream, retries included
+            policy = self.retry_policy
+            deadline = None if policy.deadline is None else time.monotonic() + policy.deadline
+            while True:
+                metrics.attempts += 1
+                try:
+                    async with self._slot(metrics.prompt_tokens, max_tokens):
+                        stream = self.provider.generate_stream(
+                            messages, temperature, max_tokens, model
+                        )
+                        try:
+                            while True:
+                                timeout = _chunk_timeout(policy.timeout, deadline)
+                                try:
+                                    chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                                except StopAsyncIteration:
+                                    break
+                                if _record_usage(metrics, chunk) or not chunk:
+                                    continue
+                                if not chunks:
+                                    metrics.time_to_first_token = time.perf_counter() - started
+                                chunks.append(chunk)
+                                yield chunk
+                        finally:
+                            aclose = getattr(stream, "aclose", None)
+                            if aclose is not None:
+                                await aclose()
+                    break
+                except Exception as exc:
+                    if chunks or metrics.attempts >= policy.max_attempts or not is_retryable(exc):
+                        raise
+                    delay = policy.backoff(metrics.attempts - 1, retry_after(exc))
+                    if deadline is not None and delay >= deadline - time.monotonic():
+                        raise
+                    await asyncio.sleep(delay)
+
+            if key is not None:
+                self.cache.set(key, "".join(chunks))
+        except BaseException as exc:
+            if not isinstance(exc, GeneratorExit):  # not when the consumer stops early
+                metrics.error = type(exc).__name__
+            raise
+        finally:
+            metrics.latency = time.perf_counter() - started
+            if not metrics.usage_reported:
+                metrics.completion_tokens = estimate_tokens("".join(chunks)) if chunks else 0
+            self.tracer.record_call(metrics)
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """The response cache in effect for this client."""
+        return self._cache if self._cache is not None else self.registry.cache
+
+    def _cache_key(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str],
+    ) -> Optional[str]:
+        """Cache key for a call, or None when the call should not be cached."""
+        cache = self.cache
+        if cache is None or not cache.accepts(temperature):
+            return None
+        return cache_key(self.provider_name, model, messages, temperature, max_tokens)
+
+    def _slot(self, prompt_tokens: int, max_tokens: int):
+        """Reserve capacity with the provider's shared scheduler."""
+        scheduler = self.registry.scheduler(self.provider_name)
+        return scheduler.slot(prompt_tokens + max_tokens)
+
+
+def _chunk_timeout(timeout: Optional[float], deadline: Optional[float]) -> Optional[float]:
+    """Seconds to wait for the next stream chunk, raising once the deadline has passed."""
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise asyncio.TimeoutError("Provider call deadline exceeded")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _record_usage(metrics: CallMetrics, response: str) -> bool:
+    """Copy provider-reported token counts into ``metrics``; return whether there were any."""
+    if not isinstance(response, Completion) or response.prompt_tokens is None:
+        return False
+    metrics.prompt_tokens = response.prompt_tokens
+    metrics.completion_tokens = response.completion_tokens or 0
+    metrics.usage_reported = True
+    return True
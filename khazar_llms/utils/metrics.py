@@ -0,0 +1,413 @@
+"""Metrics and tracing for LLM calls and ensemble turns."""
+
+import itertools
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+_span_ids = itertools.count(1)
+
+# Innermost open span of the running task; asyncio tasks inherit it from their creator
+_current_span: ContextVar[Optional["Span"]] = ContextVar("khazar_current_span", default=None)
+
+# Lists collecting the calls made inside (possibly nested) collect_calls() blocks
+_collectors: ContextVar[Tuple[List["CallMetrics"], ...]] = ContextVar(
+    "khazar_call_collectors", default=()
+)
+
+
+@dataclass
+class Span:
+    """A timed unit of work, such as an ensemble iteration or an agent's turn."""
+
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    span_id: int = field(default_factory=lambda: next(_span_ids))
+    parent_id: Optional[int] = None
+    start: float = field(default_factory=time.time)  # Unix time
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class CallMetrics:
+    """Measurements of one LLMClient call, including any retries."""
+
+    provider: str
+    model: Optional[str]
+    streamed: bool = False
+    start: float = field(default_factory=time.time)  # Unix time
+    latency: float = 0.0
+    time_to_first_token: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    usage_reported: bool = False  # token counts came from the provider, not estimates
+    attempts: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+    parent_id: Optional[int] = None  # span the call was made in
+    cascade_stage: Optional[str] = None  # "draft" or "refine" inside a cascade
+    cascade_score: Optional[float] = None  # draft score given by the cascade's scorer
+    escalated: Optional[bool] = None  # whether the draft was escalated
+
+    @property
+    def retries(self) -> int:
+        """Attempts beyond the first (hedged duplicates included)."""
+        return max(0, self.attempts - 1)
+
+
+def call_metadata(calls: List[CallMetrics]) -> Dict[str, Any]:
+    """Summarize the calls behind one message for ``Message.metadata``."""
+    if not calls:
+        return {}
+    first_token = next(
+        (call.time_to_first_token for call in calls if call.time_to_first_token is not None), None
+    )
+    metadata = {
+        "latency": round(sum(call.latency for call in calls), 6),
+        "time_to_first_token": None if first_token is None else round(first_token, 6),
+        "prompt_tokens": sum(call.prompt_tokens for call in calls),
+        "completion_tokens": sum(call.completion_tokens for call in calls),
+        "retries": sum(call.retries for call in calls),
+        "cache_hit": all(call.cache_hit for call in calls),
+    }
+    stages = {call.cascade_stage: call for call in calls if call.cascade_stage}
+    if "draft" in stages:
+        draft, refine = stages["draft"], stages.get("refine")
+        metadata.update(
+            {
+                "model": (refine or draft).model,
+                "cascade_escalated": refine is not None,
+                "cascade_score": draft.cascade_score,
+                "draft_model": draft.model,
+                "draft_latency": round(draft.latency, 6),
+                "refine_model": refine.model if refine else None,
+                "refine_latency": round(refine.latency, 6) if refine else None,
+            }
+        )
+    return metadata
+
+
+@contextmanager
+def collect_calls() -> Iterator[List[CallMetrics]]:
+    """
+    Collect the metrics of every call recorded inside the block.
+
+    Tasks started inside the block report to it too, and blocks nest: a call
+    is collected by every enclosing block (e.g. an agent's turn and the
+    session metering it).
+    """
+    calls: List[CallMetrics] = []
+    token = _collectors.set(_collectors.get() + (calls,))
+    try:
+        yield calls
+    finally:
+        _collectors.reset(token)
+
+
+class MetricsSink(ABC):
+    """Base class for destinations of spans and call metrics."""
+
+    def span_started(self, span: Span):
+        """Called when a span opens (its duration is not yet known)."""
+
+    @abstractmethod
+    def span_finished(self, span: Span):
+        """Called when a span closes."""
+        pass
+
+    @abstractmethod
+    def record_call(self, call: CallMetrics):
+        """Called when an LLM call completes or fails."""
+        pass
+
+    def flush(self):
+        """Write out anything buffered."""
+
+
+class Tracer:
+    """Opens spans and forwards them, with call metrics, to the configured sinks."""
+
+    def __init__(self, sinks: Optional[List[MetricsSink]] = None):
+        self.sinks: List[MetricsSink] = list(sinks or [])
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time the enclosed block as a span nested in the current one.
+
+        Attributes may be added to the yielded span before the block ends.
+        """
+        parent = _current_span.get()
+        span = Span(name, attributes, parent_id=parent.span_id if parent else None)
+        for sink in self.sinks:
+            sink.span_started(span)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = type(exc).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            for sink in self.sinks:
+                sink.span_finished(span)
+
+    def record_call(self, call: CallMetrics):
+        """Attach a finished call to the current span and hand it to the sinks."""
+        span = _current_span.get()
+        call.parent_id = span.span_id if span else None
+        for collector in _collectors.get():
+            collector.append(call)
+        for sink in self.sinks:
+            sink.record_call(call)
+
+    def flush(self):
+        """Flush every sink."""
+        for sink in self.sinks:
+            sink.flush()
+
+
+class InMemorySink(MetricsSink):
+    """Keeps every span and call in lists, e.g. for tests or post-run analysis."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.calls: List[CallMetrics] = []
+        self._lock = threading.Lock()
+
+    def span_finished(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def record_call(self, call: CallMetrics):
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self, by: str = "agent") -> Dict[Tuple[str, Any], Dict[str, float]]:
+        """
+        Aggregate span durations by span name and an attribute.
+
+        Args:
+            by: Span attribute to group on (e.g. 'agent', 'role', 'iteration')
+
+        Returns:
+            ``{(span name, attribute value): {"count", "total", "mean", "max"}}``
+        """
+        groups: Dict[Tuple[str, Any], List[float]] = defaultdict(list)
+        for span in self.spans:
+            groups[(span.name, span.attributes.get(by))].append(span.duration or 0.0)
+        return {
+            key: {
+                "count": len(durations),
+                "total": sum(durations),
+                "mean": sum(durations) / len(durations),
+                "max": max(durations),
+            }
+            for key, durations in groups.items()
+        }
+
+
+class PrometheusTextSink(MetricsSink):
+    """
+    Aggregates metrics and writes them in the Prometheus text exposition format.
+
+    The file is meant for node_exporter's textfile collector. It is rewritten
+    atomically at most every ``interval`` seconds and on ``flush()``.
+    """
+
+    def __init__(self, path: Union[str, Path], interval: float = 10.0):
+        """
+        Initialize the sink.
+
+        Args:
+            path: File the metrics are written to (should end in ``.prom``)
+            interval: Minimum seconds between automatic rewrites
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def span_finished(self, span: Span):
+        labels = {"span": span.name}
+        for name in ("agent", "role", "mode"):
+            if name in span.attributes:
+                labels[name] = span.attributes[name]
+        self._observe("khazar_span_duration_seconds", span.duration or 0.0, labels)
+        if span.error:
+            self._add("khazar_span_errors_total", 1, labels)
+        self._maybe_write()
+
+    def record_call(self, call: CallMetrics):
+        labels = {"provider": call.provider, "model": call.model or ""}
+        self._add("khazar_llm_calls_total", 1, {**labels, "cache_hit": str(call.cache_hit).lower()})
+        self._observe("khazar_llm_call_latency_seconds", call.latency, labels)
+        if call.time_to_first_token is not None:
+            self._observe(
+                "khazar_llm_time_to_first_token_seconds", call.time_to_first_token, labels
+            )
+        self._add("khazar_llm_prompt_tokens_total", call.prompt_tokens, labels)
+        self._add("khazar_llm_completion_tokens_total", call.completion_tokens, labels)
+        self._add("khazar_llm_retries_total", call.retries, labels)
+        if call.cascade_stage == "draft":
+            self._add(
+                "khazar_llm_cascade_drafts_total",
+                1,
+                {**labels, "escalated": str(bool(call.escalated)).lower()},
+            )
+        if call.error:
+            self._add("khazar_llm_call_errors_total", 1, {**labels, "error": call.error})
+        self._maybe_write()
+
+    def flush(self):
+        self.write()
+
+    def render(self) -> str:
+        """Return the current metrics in the text exposition format."""
+        with self._lock:
+            items = sorted(self._counters.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in items:
+            family = name[: -len("_sum")] if name.endswith("_sum") else name
+            family = family[: -len("_count")] if family.endswith("_count") else family
+            if family not in typed:
+                typed.add(family)
+                kind = "counter" if family.endswith("_total") else "summary"
+                lines.append(f"# TYPE {family} {kind}")
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Atomically rewrite the metrics file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(self.render())
+        os.replace(tmp, self.path)
+        self._last_write = time.monotonic()
+
+    def _add(self, name: str, value: float, labels: Dict[str, Any]):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def _observe(self, name: str, value: float, labels: Dict[str, Any]):
+        self._add(f"{name}_sum", value, labels)
+        self._add(f"{name}_count", 1, labels)
+
+    def _maybe_write(self):
+        if time.monotonic() - self._last_write >= self.interval:
+            self.write()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class OpenTelemetrySink(MetricsSink):
+    """
+    Exports spans and calls through the OpenTelemetry tracing API.
+
+    Every span becomes an OpenTelemetry span with the same parent, and every
+    LLM call a child ``llm.call`` span carrying ``gen_ai.*`` attributes.
+    Requires the ``opentelemetry-api`` package and an SDK configured by the
+    application.
+    """
+
+    def __init__(self, tracer: Any = None):
+        """
+        Initialize the sink.
+
+        Args:
+            tracer: An OpenTelemetry tracer (defaults to the global tracer provider's)
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                "opentelemetry-api package not installed. "
+                "Install with: pip install opentelemetry-api"
+            )
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("khazar_llms")
+        self._open: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def span_started(self, span: Span):
+        otel_span = self.tracer.start_span(
+            span.name,
+            context=self._parent_context(span.parent_id),
+            attributes=_otel_attributes(span.attributes),
+            start_time=int(span.start * 1e9),
+        )
+        with self._lock:
+            self._open[span.span_id] = otel_span
+
+    def span_finished(self, span: Span):
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(_otel_attributes(span.attributes))
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start + (span.duration or 0.0)) * 1e9))
+
+    def record_call(self, call: CallMetrics):
+        attributes = {
+            "gen_ai.system": call.provider,
+            "gen_ai.request.model": call.model,
+            "gen_ai.usage.input_tokens": call.prompt_tokens,
+            "gen_ai.usage.output_tokens": call.completion_tokens,
+            "llm.streamed": call.streamed,
+            "llm.time_to_first_token": call.time_to_first_token,
+            "llm.retries": call.retries,
+            "llm.cache_hit": call.cache_hit,
+            "llm.cascade_stage": call.cascade_stage,
+            "llm.cascade_score": call.cascade_score,
+        }
+        otel_span = self.tracer.start_span(
+            "llm.call",
+            context=self._parent_context(call.parent_id),
+            attributes=_otel_attributes(attributes),
+            start_time=int(call.start * 1e9),
+        )
+        if call.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, call.error))
+        otel_span.end(end_time=int((call.start + call.latency) * 1e9))
+
+    def _parent_context(self, parent_id: Optional[int]):
+        with self._lock:
+            parent = self._open.get(parent_id) if parent_id is not None else None
+        return self._trace.set_span_in_context(parent) if parent is not None else None
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None values and stringify anything OpenTelemetry can't store."""
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+# Tracer used by clients and ensembles unless one is passed explicitly
+default_tracer = Tracer()
+
+
+def configure_metrics(*sinks: MetricsSink):
+    """Send metrics from the default tracer to the given sinks (none disables them)."""
+    default_tracer.sinks = list(sinks)
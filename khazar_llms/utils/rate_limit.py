@@ -0,0 +1,137 @@
+"""Concurrency and rate limiting for provider calls."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+
+class TokenBucket:
+    """A bucket that refills continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a token bucket.
+
+        Args:
+            per_minute: Refill rate in units per minute
+            capacity: Maximum burst size (defaults to one minute's worth)
+        """
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float):
+        """Take ``amount`` units; the balance may go negative for oversized requests."""
+        self._refill()
+        self.available -= amount
+
+
+class ProviderScheduler:
+    """
+    Admission control for calls to one provider.
+
+    Bounds the number of in-flight requests and paces requests and tokens
+    per minute. Callers queue in FIFO order and wait for capacity rather
+    than failing, so bursts from parallel ensembles are smoothed out instead
+    of turning into 429 errors and retry storms.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        """
+        Initialize the scheduler. Any limit left as None is not enforced.
+
+        Args:
+            max_in_flight: Maximum concurrent requests
+            requests_per_minute: Request rate limit
+            tokens_per_minute: Token rate limit (prompt plus max completion tokens)
+        """
+        self.max_in_flight = max_in_flight
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def unlimited(self) -> bool:
+        """True when no limit is configured."""
+        return self.max_in_flight is None and self.requests is None and self.tokens is None
+
+    def _bind_loop(self):
+        # asyncio primitives belong to one event loop; recreate them when the
+        # scheduler is used from a new loop (e.g. successive asyncio.run calls)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_in_flight) if self.max_in_flight else None
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until a request of ``tokens`` estimated tokens may be sent."""
+        self._bind_loop()
+        # The lock queues callers in FIFO order; only the head of the queue
+        # waits for a free slot and for rate capacity
+        async with self._queue:
+            if self._slots is not None:
+                await self._slots.acquire()
+            try:
+                await self._wait_for_rate(tokens)
+            except BaseException:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+        self.in_flight += 1
+
+    async def _wait_for_rate(self, tokens: int):
+        while True:
+            delay = 0.0
+            if self.requests is not None:
+                delay = max(delay, self.requests.wait_time(1))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.wait_time(tokens))
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+
+    def release(self):
+        """Mark a request acquired with ``acquire`` as finished."""
+        self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a request slot for the duration of the ``async with`` block."""
+        if self.unlimited:
+            yield
+            return
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
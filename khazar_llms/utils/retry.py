@@ -0,0 +1,204 @@
+"""Retry, deadline and request-hedging policies for provider calls."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    # httpx errors raised by the lean HTTP transport
+    "NetworkError",
+    "TimeoutException",
+    "RemoteProtocolError",
+}
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently to retry a failed provider call."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5  # seconds; doubles on every attempt
+    max_delay: float = 30.0
+    timeout: Optional[float] = 60.0  # deadline for a single attempt
+    deadline: Optional[float] = None  # deadline for the call including retries
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before the next attempt.
+
+        Uses "full jitter" exponential backoff so that concurrent callers that
+        failed together do not retry together. A server-provided Retry-After
+        takes precedence.
+        """
+        if retry_after is not None:
+            return max(0.0, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Send a duplicate request when the first one is slower than usual.
+
+    Once ``min_samples`` latencies have been observed, a call still running
+    after the ``quantile`` latency gets a hedged twin; whichever finishes
+    first wins and the other is cancelled.
+    """
+
+    quantile: float = 0.95
+    min_samples: int = 20
+    min_delay: float = 0.0
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def record(self, seconds: float):
+        """Record the latency of a successful call."""
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the q-quantile of recorded latencies, or None without data."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """Extract an HTTP status code from a provider exception, if any."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed call may succeed if tried again."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Read the server's Retry-After hint (seconds or HTTP date) from an exception."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers is not None:
+            value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    """
+    Run ``call``, starting a duplicate if it has not finished after ``delay``.
+
+    Returns the first successful result; raises only if both attempts fail.
+    Attempts still running when this returns, fails or is cancelled (e.g. by
+    a timeout around it) are cancelled.
+    """
+    first = asyncio.ensure_future(call())
+    pending = {first}
+    error: Optional[BaseException] = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            pending = set()
+            return first.result()
+
+        pending.add(asyncio.ensure_future(call()))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    hedge: Optional[HedgePolicy] = None,
+    latency: Optional[LatencyTracker] = None,
+) -> Any:
+    """
+    Call ``call`` under a retry policy, optionally hedging slow attempts.
+
+    Args:
+        call: Zero-argument coroutine function making one attempt
+        policy: Retry and deadline settings
+        hedge: Optional hedging policy (requires ``latency``)
+        latency: Tracker fed with successful call latencies
+
+    Returns:
+        The result of the first successful attempt
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        timeout = policy.timeout
+        if policy.deadline is not None:
+            remaining = policy.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise asyncio.TimeoutError("Provider call deadline exceeded")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        attempt_started = time.monotonic()
+        try:
+            if (
+                hedge is not None
+                and latency is not None
+                and len(latency) >= max(1, hedge.min_samples)
+            ):
+                threshold = max(latency.quantile(hedge.quantile), hedge.min_delay)
+                operation = hedged(call, threshold)
+            else:
+                operation = call()
+            result = await asyncio.wait_for(operation, timeout)
+        except Exception as exc:
+            attempt += 1
+            if attempt >= policy.max_attempts or not is_retryable(exc):
+                raise
+            delay = policy.backoff(attempt - 1, retry_after(exc))
+            if policy.deadline is not None:
+                remaining = policy.deadline - (time.monotonic() - started)
+                if delay >= remaining:
+                    raise
+            await asyncio.sleep(delay)
+            continue
+
+        if latency is not None:
+            latency.record(time.monotonic() - attempt_started)
+        return result
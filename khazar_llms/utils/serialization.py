@@ -0,0 +1,41 @@
+"""Fast JSON encoding, using orjson when it is installed."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode objects that provide ``to_dict()`` (such as Message)."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Encode a value as JSON text.
+
+    Messages and other dataclasses are written directly by orjson; without
+    orjson they are converted with their ``to_dict()`` method.
+
+    Args:
+        obj: The value to encode
+        indent: Pretty-print with two-space indentation
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+    return json.dumps(obj, default=_default, indent=2 if indent else None, ensure_ascii=False)
+
+
+def loads(text: str) -> Any:
+    """Decode JSON text."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
@@ -0,0 +1,62 @@
+"""Token count estimation helpers."""
+
+from typing import Dict, List
+
+# English prose averages about four characters per token
+_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Return tiktoken's cl100k_base encoding if tiktoken is installed, else None."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Counts exactly with tiktoken when it is installed and falls back to a
+    characters-per-token approximation otherwise.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a chat message list."""
+    # Each message carries a few tokens of role/formatting overhead
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, ellipsis: str = "...") -> str:
+    """Cut text down to about ``max_tokens`` tokens, appending an ellipsis if cut."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]) + ellipsis
+
+    limit = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # Prefer ending on a word boundary when there is one reasonably close
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + ellipsis
@@ -1,7 +1,9 @@
 """Tests for agent functionality."""
 
 import pytest
-from khazar_llms.agents.base import AgentRole, Message
+from khazar_llms.agents.base import Agent, AgentRole, Message
+from khazar_llms.agents.context import SUMMARY_HEADING, ContextWindow, ConversationHistory
+from khazar_llms.utils.tokens import estimate_tokens
 from khazar_llms.agents.personas import (
     DreamerAgent,
     CriticAgent,
@@ -87,3 +89,212 @@ def test_context_summary():
     assert "Agent2" in summary
     # Content should be truncated
     assert len(summary) < len(messages[0].content) + len(messages[1].content)
+
+
+class BareAgent(Agent):
+    def get_system_prompt(self) -> str:
+        return "System"
+
+
+@pytest.mark.asyncio
+async def test_default_respond_uses_class_instruction():
+    """Test that the default respond() takes a turn with INSTRUCTION and TURN_HEADING."""
+    agent = BareAgent(name="Bare", role=AgentRole.POET, provider="mock")
+    with pytest.raises(NotImplementedError):
+        await agent.respond("Test task", [], iteration=0)
+
+    agent.INSTRUCTION = "Iteration: {iteration}\n\nWrite."
+    agent.TURN_HEADING = "Heard so far:"
+    peer = Message(sender="Peer", role=AgentRole.DREAMER, content="An idea.", iteration=0)
+    message = await agent.respond("Test task", [peer], iteration=2)
+
+    request = agent.history.messages[1]["content"]
+    assert "Heard so far:\nPeer (dreamer): An idea." in request
+    assert request.endswith("Iteration: 2\n\nWrite.")
+    assert agent.history.messages[2]["content"] == message.content
+
+
+@pytest.mark.asyncio
+async def test_agent_streaming_response():
+    """Test that streaming emits token events and a final done event."""
+    agent = CriticAgent(provider="mock")
+    events = []
+
+    message = await agent.respond(
+        task="Test task", context=[], iteration=1, on_token=events.append
+    )
+
+    assert len(events) > 2
+    assert all(event.sender == "Critic" and event.iteration == 1 for event in events)
+    assert events[-1].done and events[-1].text == ""
+    assert "".join(event.text for event in events) == message.content
+
+
+def _messages(count):
+    return [
+        Message(
+            sender=f"Agent{i}",
+            role=AgentRole.DREAMER,
+            content=f"Idea number {i}. " + "More detail follows. " * 20,
+            iteration=0,
+        )
+        for i in range(count)
+    ]
+
+
+def test_context_window_folds_older_messages():
+    """Test that messages beyond the recent window are summarized in one line each."""
+    window = ContextWindow(recent_messages=2)
+    rendered = window.render(_messages(4))
+
+    assert "Earlier in the conversation:" in rendered
+    assert "- Agent0: Idea number 0." in rendered
+    assert "- Agent1: Idea number 1." in rendered
+    assert "Agent3 (dreamer): Idea number 3." in rendered
+    assert "More detail" not in rendered.split("\n\n")[0]
+
+
+def test_context_window_summary_is_bounded():
+    """Test that the rolling summary stays within its token budget as context grows."""
+    window = ContextWindow(recent_messages=2, summary_tokens=40)
+    messages = _messages(50)
+
+    short = window.render(messages[:10])
+    long = window.render(messages)
+
+    assert "earlier messages omitted" in long
+    assert "Agent47" in long and "Agent0:" not in long
+    assert len(long) < 2 * len(short)
+
+
+def test_context_window_incremental_and_cached():
+    """Test that growing the context matches a fresh render and repeats are cached."""
+    messages = _messages(12)
+    window = ContextWindow(recent_messages=3)
+    for end in range(1, len(messages) + 1):
+        window.render(messages[:end])
+
+    assert window.render(messages) == ContextWindow(recent_messages=3).render(messages)
+    assert window.render(messages) is window.render(messages)
+    # A different conversation is rendered from scratch
+    assert "Agent11" not in window.render(messages[5:7])
+
+
+def test_agent_memory_is_bounded():
+    """Test that agent memory keeps only the latest max_memory messages."""
+    agent = DreamerAgent(provider="mock", max_memory=3)
+    messages = _messages(5)
+    for message in messages:
+        agent.add_to_memory(message)
+
+    assert agent.memory == messages[2:]
+
+
+def test_message_coerces_role_and_round_trips():
+    """Test that messages accept role strings and survive to_dict/from_dict."""
+    message = Message(sender="Critic", role="critic", content="Hmm.", iteration=2)
+
+    assert message.role is AgentRole.CRITIC
+    assert message.metadata == {}
+    assert Message.from_dict(message.to_dict()) == message
+    assert message.model_dump()["role"] is AgentRole.CRITIC
+
+
+def test_message_json_encoding_matches_without_orjson(monkeypatch):
+    """Test that bulk encoding gives the same JSON with and without orjson."""
+    import json
+    from khazar_llms.utils import serialization
+
+    messages = _messages(3)
+    encoded = serialization.dumps({"conversation": messages})
+    monkeypatch.setattr(serialization, "orjson", None)
+    fallback = serialization.dumps({"conversation": messages})
+
+    assert json.loads(encoded) == json.loads(fallback)
+    assert json.loads(encoded)["conversation"][0] == messages[0].to_dict()
+
+
+@pytest.mark.asyncio
+async def test_agent_history_is_append_only():
+    """Test that each request extends the previous one and quotes only new peer messages."""
+    agent = DreamerAgent(provider="mock")
+    peers = _messages(3)
+
+    first = await agent.respond("Test task", peers[:2], iteration=0)
+    before = list(agent.history.messages)
+    second = await agent.respond("Test task", peers + [first], iteration=1)
+
+    history = agent.history.messages
+    assert history[: len(before)] == before
+    assert [m["role"] for m in history] == ["system", "user", "assistant", "user", "assistant"]
+    assert "Task: Test task" in history[1]["content"]
+    assert "Agent0" in history[1]["content"] and "Agent2" not in history[1]["content"]
+    assert "Agent2" in history[3]["content"] and "Agent0" not in history[3]["content"]
+    assert history[4]["content"] == second.content
+
+
+def test_conversation_history_trims_old_turns():
+    """Test that the transcript stays within budget and keeps the task turn."""
+    history = ConversationHistory(max_tokens=200)
+    messages = _messages(30)
+    for index, message in enumerate(messages):
+        history.prepare("System", "Task", messages[: index + 1], "Me", f"Turn {index}")
+        history.record("Reply " * 20)
+
+    assert history.messages[0]["content"] == "System"
+    assert "Task: Task" in history.messages[1]["content"]
+    assert "Turn 29" in history.messages[-2]["content"]
+    assert "Turn 5" not in "".join(m["content"] for m in history.messages)
+
+
+def test_conversation_history_forgets_earlier_iterations():
+    """Test that only the newest iterations' messages are tracked, without re-quoting."""
+    history = ConversationHistory()
+    conversation = []
+    for iteration in range(20):
+        for message in _messages(3):
+            message.iteration = iteration
+            conversation.append(message)
+        request = history.prepare("System", "Task", conversation, "Me", "Go")
+        history.record("Reply")
+        assert request[-1]["content"].count("Idea number") == 3
+
+    assert len(history._shown) == 3
+
+
+def test_conversation_history_summarizes_dropped_turns():
+    """Test that dropped turns are folded once into a bounded summary turn after the task."""
+    history = ConversationHistory(max_tokens=2000, summary_tokens=120)
+    messages = _messages(40)
+    summaries = []
+    for index in range(40):
+        history.prepare("System", "Task", messages[: index + 1], "Me", f"Turn {index}")
+        history.record(f"Reply number {index}. " + "More of my reply. " * 20)
+        if len(history.messages) > 3 and history.messages[3]["content"].startswith(
+            SUMMARY_HEADING
+        ):
+            summaries.append(history.messages[3])
+
+    assert "Task: Task" in history.messages[1]["content"]
+    first, last = summaries[0], summaries[-1]
+    assert "- Agent1: Idea number 1." in first["content"]
+    assert "- Me: Reply number 1." in first["content"]
+    # The summary turn is only rebuilt when more turns are dropped
+    rebuilt = [s for prev, s in zip(summaries, summaries[1:]) if s is not prev]
+    assert 0 < len(rebuilt) < len(summaries) - 1
+    # It stays within its budget, and the newest dropped turn is in it
+    assert "earlier messages omitted" in last["content"]
+    assert estimate_tokens(last["content"]) < 200
+    dropped = int(history.messages[4]["content"].split("Turn ")[-1]) - 1
+    assert f"- Me: Reply number {dropped}." in last["content"]
+
+
+def test_conversation_history_unrecorded_turn_is_dropped():
+    """Test that a prepared turn is only kept once its reply is recorded."""
+    history = ConversationHistory()
+    messages = _messages(2)
+    history.prepare("System", "Task", messages, "Me", "Go")
+    retried = history.prepare("System", "Task", messages, "Me", "Go")
+
+    assert len(history.messages) == 1
+    assert "Agent1" in retried[-1]["content"]
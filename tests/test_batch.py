@@ -0,0 +1,213 @@
+"""Tests for the batch task runner."""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import pytest
+from khazar_llms.cli import configure_shared_state
+from khazar_llms.agents.personas import CriticAgent, DreamerAgent
+from khazar_llms.orchestration.batch import BatchRunner, load_tasks
+from khazar_llms.orchestration.ensemble import ConversationMode, Ensemble
+from khazar_llms.utils.batch_api import (
+    BatchLLMProvider,
+    BatchRequestError,
+    FileBatchBackend,
+    configure_batch_provider,
+)
+from khazar_llms.utils.llm_client import MockLLMProvider
+from khazar_llms.utils.retry import RetryPolicy
+
+
+def write_tasks(path, tasks):
+    path.write_text("\n".join(json.dumps(task) for task in tasks) + "\n")
+
+
+def test_load_tasks_applies_defaults(tmp_path):
+    """Test parsing task lines and filling in defaults."""
+    path = tmp_path / "tasks.jsonl"
+    write_tasks(path, [{"task": "A"}, {"id": "b", "task": "B", "mode": "parallel"}])
+
+    tasks = load_tasks(path, defaults={"iterations": 1})
+
+    assert [t.task_id for t in tasks] == ["1", "b"]
+    assert tasks[1].mode == "parallel"
+    assert all(t.iterations == 1 for t in tasks)
+
+
+def test_load_tasks_rejects_unknown_agents(tmp_path):
+    """Test validation of agent names."""
+    path = tmp_path / "tasks.jsonl"
+    write_tasks(path, [{"task": "A", "agents": ["oracle"]}])
+
+    with pytest.raises(ValueError):
+        load_tasks(path)
+
+
+def test_load_tasks_reports_invalid_lines(tmp_path):
+    """Test that a line that isn't a JSON object is reported with its line number."""
+    path = tmp_path / "tasks.jsonl"
+    path.write_text('{"task": "A"}\n\n{"task": "B"\n')
+
+    with pytest.raises(ValueError, match="Line 3"):
+        load_tasks(path)
+
+
+def test_batch_run_and_resume(tmp_path):
+    """Test that results are written per task and finished tasks are skipped."""
+    tasks_path = tmp_path / "tasks.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_tasks(
+        tasks_path, [{"id": f"t{i}", "task": f"Task {i}", "iterations": 1} for i in range(5)]
+    )
+
+    runner = BatchRunner(output_path=output, max_concurrency=3)
+    first = runner.run(tasks_path, defaults={"agents": ["dreamer", "critic"]})
+    second = runner.run(tasks_path)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert first == {"completed": 5, "failed": 0, "skipped": 0}
+    assert second == {"completed": 0, "failed": 0, "skipped": 5}
+    assert sorted(r["task_id"] for r in records) == [f"t{i}" for i in range(5)]
+    assert all(len(r["conversation"]) == 2 for r in records)
+
+
+def test_batch_records_failures(tmp_path):
+    """Test that a failing session is recorded and retried on resume."""
+    tasks_path = tmp_path / "tasks.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_tasks(tasks_path, [{"id": "bad", "task": "Task", "iterations": 1}])
+
+    counts = BatchRunner(output_path=output, provider="nonexistent").run(tasks_path)
+    record = json.loads(output.read_text())
+
+    assert counts["failed"] == 1
+    assert record["status"] == "error"
+    assert BatchRunner(output_path=output).completed_ids() == set()
+
+
+@pytest.mark.asyncio
+async def test_batch_api_collects_turns_across_sessions(tmp_path):
+    """Test that concurrent sessions share one batch per iteration and resume with results."""
+    backend = FileBatchBackend(tmp_path, responder=MockLLMProvider())
+    provider = BatchLLMProvider(backend, collect_window=0.05, poll_interval=0.01)
+    sizes = []
+    submit = backend.submit
+
+    async def record_submit(requests):
+        sizes.append(len(requests))
+        return await submit(requests)
+
+    backend.submit = record_submit
+    ensembles = []
+    for _ in range(3):
+        agents = [DreamerAgent(provider="mock"), CriticAgent(provider="mock")]
+        for agent in agents:
+            agent.llm_client.provider = provider
+        ensembles.append(Ensemble(agents, mode=ConversationMode.PARALLEL, max_iterations=2))
+
+    results = await asyncio.gather(*(e.collaborate("Design a museum") for e in ensembles))
+
+    assert provider.batches_submitted == 2
+    assert sizes == [6, 6]
+    # Batch files are deleted once their results are collected
+    assert list(tmp_path.iterdir()) == []
+    assert all(len(r["conversation"]) == 4 for r in results)
+    assert "envision" in results[0]["conversation"][0].content
+
+
+@pytest.mark.asyncio
+async def test_batch_api_waits_for_external_worker(tmp_path):
+    """Test that callers wait until the batch output appears and failures raise."""
+    backend = FileBatchBackend(tmp_path)
+    provider = BatchLLMProvider(backend, collect_window=0.01, poll_interval=0.01)
+    messages = [{"role": "system", "content": "critic"}, {"role": "user", "content": "Hi"}]
+    call = asyncio.ensure_future(provider.generate(messages, 0.5, 100))
+
+    while not backend.pending():
+        await asyncio.sleep(0.01)
+    assert not call.done()
+    await backend.process(backend.pending()[0], MockLLMProvider(error_rate=1.0))
+
+    with pytest.raises(BatchRequestError) as info:
+        await call
+    assert info.value.status_code == 500
+
+
+class FlakyPollBackend(FileBatchBackend):
+    """File backend whose first polls fail with a connection error."""
+
+    def __init__(self, directory, failures):
+        super().__init__(directory, responder=MockLLMProvider())
+        self.failures = failures
+
+    async def poll(self, batch_id):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        return await super().poll(batch_id)
+
+
+@pytest.mark.asyncio
+async def test_batch_api_retries_transient_poll_errors(tmp_path):
+    """Test that a transient poll failure is retried instead of failing the batch."""
+    provider = BatchLLMProvider(
+        FlakyPollBackend(tmp_path, failures=2), collect_window=0.01, poll_interval=0.01
+    )
+    provider.poll_retry_policy = RetryPolicy(base_delay=0.001, timeout=None)
+    messages = [{"role": "system", "content": "critic"}, {"role": "user", "content": "Hi"}]
+
+    text = await provider.generate(messages, 0.5, 100)
+
+    assert text and provider.batches_submitted == 1
+    assert provider.backend.failures == 0
+
+    provider.backend.failures = 5
+    with pytest.raises(ConnectionError):
+        await provider.generate(messages, 0.5, 100)
+    assert provider.batches_submitted == 2
+
+
+def test_batch_runner_uses_batch_api(tmp_path):
+    """Test the batch runner end to end through the mock batch provider."""
+    tasks_path = tmp_path / "tasks.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_tasks(
+        tasks_path, [{"id": f"t{i}", "task": f"Task {i}", "iterations": 1} for i in range(3)]
+    )
+    provider = configure_batch_provider(
+        FileBatchBackend(tmp_path / "batches", responder=MockLLMProvider()),
+        collect_window=0.05,
+        poll_interval=0.01,
+    )
+
+    runner = BatchRunner(output_path=output, batch_api=True)
+    counts = runner.run(tasks_path, defaults={"agents": ["dreamer", "critic"], "mode": "parallel"})
+
+    assert counts == {"completed": 3, "failed": 0, "skipped": 0}
+    assert provider.batches_submitted == 1
+
+
+def test_batch_workers_apply_shared_state(tmp_path):
+    """Test that spawned worker processes set up the cache through the initializer."""
+    tasks_path = tmp_path / "tasks.jsonl"
+    output = tmp_path / "results.jsonl"
+    tasks = [{"id": f"t{i}", "task": f"Task {i}", "iterations": 1} for i in range(4)]
+    write_tasks(tasks_path, tasks)
+    cache = tmp_path / "cache.db"
+    args = argparse.Namespace(
+        transport="sdk", base_url=None, provider="mock", cache=cache, metrics=None
+    )
+
+    runner = BatchRunner(
+        output_path=output, workers=2, initializer=configure_shared_state, initargs=(args,)
+    )
+    counts = runner.run(tasks_path, defaults={"agents": ["dreamer", "critic"]})
+
+    assert counts == {"completed": 4, "failed": 0, "skipped": 0}
+    # The workers' shard files are merged into the output
+    assert runner.output_files() == [output]
+    assert sorted(json.loads(line)["task_id"] for line in output.open()) == ["t0", "t1", "t2", "t3"]
+    with sqlite3.connect(str(cache)) as conn:
+        (cached,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+    assert cached == 8
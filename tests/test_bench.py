@@ -0,0 +1,36 @@
+"""Tests for the benchmark harness."""
+
+import json
+from khazar_llms.bench import compare, run_benchmarks
+from khazar_llms.orchestration.ensemble import ConversationMode
+
+
+def test_benchmark_sweep_reports_metrics():
+    """Test that a small sweep produces one JSON-serializable record per configuration."""
+    report = run_benchmarks(
+        [ConversationMode.SEQUENTIAL, ConversationMode.DEBATE],
+        agent_counts=[2, 9],
+        iteration_counts=[2],
+        latencies=[0.0],
+    )
+
+    assert len(report["results"]) == 4
+    json.dumps(report)
+    record = report["results"][-1]
+    assert record["mode"] == "debate" and record["agents"] == 9
+    assert record["messages"] == 18
+    assert record["turns_per_second"] > 0
+    assert record["turn_p50"] <= record["turn_p95"] <= record["turn_p99"]
+    assert record["alloc_peak_bytes_per_message"] > 0
+
+
+def test_compare_flags_regressions():
+    """Test that compare reports metrics that got worse beyond the threshold."""
+    config = {"mode": "parallel", "agents": 4, "iterations": 1, "latency": 0.0}
+    baseline = {"results": [{**config, "turns_per_second": 100.0, "turn_p95": 0.010}]}
+    current = {"results": [{**config, "turns_per_second": 95.0, "turn_p95": 0.020}]}
+
+    regressions = compare(baseline, current, threshold=0.1)
+
+    assert len(regressions) == 1
+    assert "turn_p95" in regressions[0]
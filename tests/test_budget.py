@@ -0,0 +1,123 @@
+"""Tests for token/cost budgets and pre-flight estimates."""
+
+import json
+import pytest
+from khazar_llms.agents.personas import CriticAgent, DreamerAgent, SynthesizerAgent
+from khazar_llms.orchestration.batch import BatchRunner
+from khazar_llms.orchestration.budget import (
+    Budget,
+    BudgetExceeded,
+    ModelPrice,
+    Usage,
+    estimate_session,
+    price_for,
+)
+from khazar_llms.orchestration.ensemble import ConversationMode, Ensemble
+
+
+def make_agents(model=None):
+    return [
+        DreamerAgent(provider="mock", model=model),
+        CriticAgent(provider="mock", model=model),
+        SynthesizerAgent(provider="mock", model=model),
+    ]
+
+
+def test_usage_prices_models_by_prefix():
+    """Test price lookup for dated model names and cost accounting."""
+    assert price_for("gpt-4o-mini-2024-07-18") == price_for("gpt-4o-mini")
+    assert price_for("gpt-4o-2024-08-06") == ModelPrice(2.5, 10.0)
+
+    usage = Usage()
+    usage.add("gpt-4o", 1_000_000, 100_000)
+    usage.add("local-llama", 500, 500)
+
+    assert usage.total_tokens == 1_101_000
+    assert usage.cost == pytest.approx(3.5)
+    assert usage.unpriced == {"local-llama"}
+
+
+@pytest.mark.asyncio
+async def test_preflight_rejects_over_budget_session():
+    """Test that a task estimated over budget is rejected before any call."""
+    sequential = Ensemble(agents=make_agents("gpt-4o"), max_iterations=3)
+    parallel = Ensemble(
+        agents=make_agents("gpt-4o"), mode=ConversationMode.PARALLEL, max_iterations=3
+    )
+    estimate = sequential.estimate("Design a museum")
+
+    assert estimate.calls == 9
+    assert estimate.completion_tokens == 9 * 800
+    # Parallel turns cannot see each other, so their prompts are smaller
+    assert estimate_session(parallel, "Design a museum").prompt_tokens < estimate.prompt_tokens
+    assert estimate.cost > 0
+
+    sequential.budget = Budget(max_cost=estimate.cost / 2)
+    with pytest.raises(BudgetExceeded) as excinfo:
+        await sequential.collaborate("Design a museum")
+
+    assert excinfo.value.estimate.cost == pytest.approx(estimate.cost)
+    assert sequential.conversation_history == []
+    assert all(agent.memory == [] for agent in sequential.agents)
+
+
+@pytest.mark.asyncio
+async def test_budget_stops_starting_turns():
+    """Test that no new turn starts once the budget is spent."""
+    ensemble = Ensemble(
+        agents=make_agents(), max_iterations=3, budget=Budget(max_tokens=1, preflight=False)
+    )
+
+    results = await ensemble.collaborate("Design a museum")
+
+    assert len(results["conversation"]) == 1
+    assert results["iterations"] == 1
+    assert results["stop_reason"].startswith("token budget exhausted")
+    assert results["usage"]["calls"] == 1
+    assert results["usage"]["total_tokens"] > 1
+
+
+@pytest.mark.asyncio
+async def test_budget_degrades_agents():
+    """Test that agents get shorter replies and a cheaper model past the threshold."""
+    budget = Budget(
+        max_tokens=1_000_000, degrade_at=0.0001, degraded_model="gpt-4o-mini", preflight=False
+    )
+    ensemble = Ensemble(agents=make_agents("gpt-4o"), max_iterations=2, budget=budget)
+
+    limits = []
+    results = await ensemble.collaborate(
+        "Design a museum",
+        on_message=lambda message: limits.append([a.max_tokens for a in ensemble.agents]),
+    )
+
+    models = [message.metadata["model"] for message in results["conversation"]]
+    assert models == ["gpt-4o"] + ["gpt-4o-mini"] * 5
+    assert limits[-1] == [budget.degraded_max_tokens] * 3
+    # The agents are only degraded for that collaboration
+    assert all(agent.model == "gpt-4o" and agent.max_tokens == 800 for agent in ensemble.agents)
+    assert results["stop_reason"] is None
+    assert results["usage"]["cost"] > 0
+
+
+def test_batch_budget(tmp_path):
+    """Test batch pre-flight and that tasks stop starting once the batch budget is spent."""
+    tasks_path = tmp_path / "tasks.jsonl"
+    output = tmp_path / "results.jsonl"
+    tasks = [{"id": f"t{i}", "task": f"Task {i}", "iterations": 1} for i in range(4)]
+    tasks_path.write_text("\n".join(json.dumps(task) for task in tasks) + "\n")
+
+    runner = BatchRunner(output_path=output, batch_budget=Budget(max_tokens=1000))
+    with pytest.raises(BudgetExceeded):
+        runner.run(tasks_path)
+    assert not output.exists()
+
+    runner = BatchRunner(
+        output_path=output,
+        max_concurrency=1,
+        batch_budget=Budget(max_tokens=1, preflight=False),
+    )
+    counts = runner.run(tasks_path)
+
+    assert counts == {"completed": 1, "failed": 0, "skipped": 0, "over_budget": 3}
+    assert runner.usage.calls == 4  # the four default agents' turns of the one task
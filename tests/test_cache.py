@@ -0,0 +1,73 @@
+"""Tests for LLM response caching."""
+
+import pytest
+from khazar_llms.utils.cache import MemoryCache, SQLiteCache, cache_key
+from khazar_llms.utils.llm_client import LLMClient, ProviderRegistry
+
+
+def test_cache_key_depends_on_params():
+    """Test that every sampling parameter is part of the key."""
+    messages = [{"role": "user", "content": "Hi"}]
+    key = cache_key("openai", "gpt-4", messages, 0.0, 100)
+
+    assert key == cache_key("openai", "gpt-4", messages, 0.0, 100)
+    assert key != cache_key("openai", "gpt-4", messages, 0.5, 100)
+    assert key != cache_key("openai", "gpt-4", messages, 0.0, 200)
+    assert key != cache_key("openai", "gpt-4o", messages, 0.0, 100)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    """Test the LRU size bound."""
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_memory_cache_ttl():
+    """Test that expired entries are not returned."""
+    cache = MemoryCache(ttl=-1)
+    cache.set("a", "1")
+
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_persists(tmp_path):
+    """Test that the on-disk cache survives reopening."""
+    path = tmp_path / "cache.db"
+    cache = SQLiteCache(path)
+    cache.set("a", "1")
+    cache.close()
+
+    assert SQLiteCache(path).get("a") == "1"
+
+
+@pytest.mark.asyncio
+async def test_client_serves_repeat_calls_from_cache():
+    """Test that an identical call is answered from the cache."""
+    cache = MemoryCache()
+    client = LLMClient(provider="mock", registry=ProviderRegistry(), cache=cache)
+
+    first = await client.generate_response("You are the Poet", "Sing", temperature=0.0)
+    streamed = [c async for c in client.stream_response("You are the Poet", "Sing", 0.0)]
+
+    assert len(cache) == 1
+    assert streamed == [first]
+
+
+@pytest.mark.asyncio
+async def test_deterministic_only_cache():
+    """Test the opt-in that caches only temperature 0 calls."""
+    cache = MemoryCache(deterministic_only=True)
+    client = LLMClient(provider="mock", registry=ProviderRegistry(), cache=cache)
+
+    await client.generate_response("You are the Poet", "Sing", temperature=0.7)
+    assert len(cache) == 0
+
+    await client.generate_response("You are the Poet", "Sing", temperature=0.0)
+    assert len(cache) == 1
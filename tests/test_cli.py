@@ -0,0 +1,84 @@
+"""Tests for the command-line interface."""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Extra wall-clock time list-agents may take over a bare interpreter start
+STARTUP_BUDGET_SECONDS = 0.12
+
+
+def _python(*args: str) -> float:
+    """Run the interpreter and return the best of five wall-clock times."""
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_list_agents_imports_no_client_or_orchestration():
+    """Test that quick commands load neither asyncio, the LLM client nor provider SDKs."""
+    script = (
+        "import sys, runpy\n"
+        "sys.argv = ['khazar', 'list-agents']\n"
+        "runpy.run_module('khazar_llms.cli', run_name='__main__')\n"
+        "heavy = ['asyncio', 'openai', 'anthropic', 'httpx',\n"
+        "         'khazar_llms.utils.llm_client', 'khazar_llms.orchestration.ensemble']\n"
+        "print('LOADED', [name for name in heavy if name in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True, text=True
+    )
+
+    assert "DREAMER" in result.stdout
+    assert "LOADED []" in result.stdout
+
+
+def test_package_exports_load_lazily():
+    """Test that package attributes resolve on first access."""
+    import khazar_llms
+
+    assert khazar_llms.Ensemble.__name__ == "Ensemble"
+    assert "CreativeSession" in dir(khazar_llms)
+
+
+def test_list_agents_startup_budget():
+    """Test that list-agents starts within a fixed budget over a bare interpreter."""
+    baseline = _python("-c", "pass")
+    elapsed = _python("-m", "khazar_llms.cli", "list-agents")
+
+    assert elapsed - baseline < STARTUP_BUDGET_SECONDS
+
+
+def test_resume_finished_session_reports_error(tmp_path):
+    """Test that resuming a finished session prints an error instead of a traceback."""
+    script = (
+        "import asyncio\n"
+        "from pathlib import Path\n"
+        "from khazar_llms.agents.personas import DreamerAgent\n"
+        "from khazar_llms.orchestration.ensemble import Ensemble\n"
+        "from khazar_llms.orchestration.session import CreativeSession\n"
+        "ensemble = Ensemble(agents=[DreamerAgent(provider='mock')], max_iterations=1)\n"
+        f"session = CreativeSession(ensemble, output_dir=Path({str(tmp_path)!r}), event_log=True)\n"
+        "asyncio.run(session.run('Test task'))\n"
+        "print(session.log_path)\n"
+    )
+    log_path = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout.split()[-1]
+
+    result = subprocess.run(
+        [sys.executable, "-m", "khazar_llms.cli", "resume", log_path],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "Error: Session" in result.stdout and "already finished" in result.stdout
+    assert "Traceback" not in result.stderr
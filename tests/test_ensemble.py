@@ -1,8 +1,11 @@
 """Tests for ensemble orchestration."""
 
+import asyncio
 import pytest
+from khazar_llms.agents.base import Agent, AgentRole, Message
 from khazar_llms.agents.personas import DreamerAgent, CriticAgent, SynthesizerAgent
 from khazar_llms.orchestration.ensemble import Ensemble, ConversationMode
+from khazar_llms.orchestration.graph import TurnGraph
 
 
 def test_ensemble_creation():
@@ -114,3 +117,86 @@ def test_ensemble_summary():
     assert summary["max_iterations"] == 5
     assert len(summary["agents"]) == 2
     assert summary["conversation_length"] == 0
+
+
+@pytest.mark.asyncio
+async def test_streaming_collaboration():
+    """Test that token events reach an async callback for every agent."""
+    agents = [
+        DreamerAgent(provider="mock"),
+        CriticAgent(provider="mock"),
+    ]
+    ensemble = Ensemble(agents=agents, mode=ConversationMode.PARALLEL, max_iterations=1)
+    finished = []
+
+    async def on_token(event):
+        if event.done:
+            finished.append(event.sender)
+
+    results = await ensemble.collaborate("Test task", on_token=on_token)
+
+    assert sorted(finished) == ["Critic", "Dreamer"]
+    assert len(results["conversation"]) == 2
+
+
+class RecordingAgent(Agent):
+    """Agent that records the context it was given."""
+
+    def __init__(self, name):
+        super().__init__(name=name, role=AgentRole.CRITIC, provider="mock")
+        self.seen = []
+
+    def get_system_prompt(self):
+        return ""
+
+    async def respond(self, task, context, iteration, on_token=None):
+        self.seen.append([msg.sender for msg in context])
+        await asyncio.sleep(0)
+        return Message(sender=self.name, role=self.role, content=self.name, iteration=iteration)
+
+
+def test_debate_graph_waves():
+    """Test that a 7-agent debate runs in two waves."""
+    agents = [RecordingAgent(f"A{i}") for i in range(7)]
+
+    assert TurnGraph.debate(agents).waves() == [[0, 1], [2, 3, 4, 5, 6]]
+    assert len(TurnGraph.sequential(agents).waves()) == 7
+    assert TurnGraph.parallel(agents).waves() == [list(range(7))]
+
+
+def test_turn_graph_rejects_forward_dependencies():
+    """Test that turns can only depend on earlier turns."""
+    graph = TurnGraph()
+    graph.add_turn(RecordingAgent("A"))
+
+    with pytest.raises(ValueError):
+        graph.add_turn(RecordingAgent("B"), depends_on=[1])
+
+
+@pytest.mark.asyncio
+async def test_custom_graph_context():
+    """Test that each turn sees exactly the turns it depends on."""
+    a, b, c = RecordingAgent("A"), RecordingAgent("B"), RecordingAgent("C")
+    graph = TurnGraph()
+    first = graph.add_turn(a)
+    second = graph.add_turn(b)
+    graph.add_turn(c, depends_on=[first])
+
+    ensemble = Ensemble(agents=[a, b, c], graph=graph, max_iterations=2)
+    results = await ensemble.collaborate("Test task")
+
+    assert b.seen[0] == []
+    assert c.seen[0] == ["A"]
+    assert c.seen[1] == ["A", "B", "C", "A"]
+    assert [msg.sender for msg in results["conversation"]] == ["A", "B", "C"] * 2
+
+
+@pytest.mark.asyncio
+async def test_sequential_turns_see_earlier_turns():
+    """Test that sequential mode keeps its chain semantics."""
+    agents = [RecordingAgent("A"), RecordingAgent("B"), RecordingAgent("C")]
+    ensemble = Ensemble(agents=agents, mode=ConversationMode.SEQUENTIAL, max_iterations=1)
+
+    await ensemble.collaborate("Test task")
+
+    assert agents[2].seen[0] == ["A", "B"]
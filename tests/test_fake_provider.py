@@ -0,0 +1,84 @@
+"""Tests for the loopback fake provider server."""
+
+import asyncio
+import pytest
+from khazar_llms.fake_provider import FakeProviderServer
+from khazar_llms.utils.http_transport import AnthropicHTTPProvider, ProviderHTTPError
+from khazar_llms.utils.llm_client import LLMClient, MockLLMProvider, ProviderRegistry
+from khazar_llms.utils.retry import RetryPolicy
+
+MESSAGES = [
+    {"role": "system", "content": "You are the Critic"},
+    {"role": "user", "content": "Review the museum"},
+]
+
+
+async def canned_reply():
+    return await MockLLMProvider().generate(MESSAGES, 0.5, 100)
+
+
+@pytest.mark.asyncio
+async def test_openai_sdk_over_loopback():
+    """Test the OpenAI provider against the fake, streamed and not, on one pooled connection."""
+    registry = ProviderRegistry()
+    async with FakeProviderServer() as server:
+        client = LLMClient("openai", api_key="fake", base_url=f"{server.url}/v1", registry=registry)
+
+        text = await client.generate_chat(MESSAGES, max_tokens=100)
+        chunks = [chunk async for chunk in client.stream_chat(MESSAGES, max_tokens=100)]
+        await registry.aclose()
+
+        assert text == "".join(chunks) == await canned_reply()
+        assert len(chunks) > 1
+        assert server.requests == 2
+        assert server.connections == 1  # kept alive between calls
+
+
+@pytest.mark.asyncio
+async def test_anthropic_wire_format_over_loopback():
+    """Test the Messages API format, streamed and not."""
+    async with FakeProviderServer() as server:
+        provider = AnthropicHTTPProvider("fake", server.url)
+
+        text = await provider.generate(MESSAGES, 0.5, 100)
+        chunks = [chunk async for chunk in provider.generate_stream(MESSAGES, 0.5, 100)]
+        await provider.http.aclose()
+
+    assert text == "".join(chunks) == await canned_reply()
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_reach_the_retry_policy():
+    """Test that simulated 429s arrive as HTTP errors the client retries."""
+    mock = MockLLMProvider(rate_limit_rate=1.0, retry_after=0)
+    registry = ProviderRegistry(transport="http")
+    async with FakeProviderServer(mock=mock) as server:
+        client = LLMClient(
+            "openai",
+            api_key="fake",
+            base_url=f"{server.url}/v1",
+            registry=registry,
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        )
+        with pytest.raises(ProviderHTTPError) as info:
+            await client.generate_chat(MESSAGES)
+        await registry.aclose()
+
+    assert info.value.status_code == 429
+    assert server.errors == {429: 3}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    """Test that requests over max_in_flight are rejected with 429."""
+    async with FakeProviderServer(mock=MockLLMProvider(latency=0.05), max_in_flight=2) as server:
+        provider = AnthropicHTTPProvider("fake", server.url)
+        results = await asyncio.gather(
+            *(provider.generate(MESSAGES, 0.5, 100) for _ in range(3)), return_exceptions=True
+        )
+        await provider.http.aclose()
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert len(errors) == 1 and isinstance(errors[0], ProviderHTTPError)
+    assert errors[0].status_code == 429
+    assert server.peak_in_flight == 2
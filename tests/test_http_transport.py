@@ -0,0 +1,154 @@
+"""Tests for the lean HTTP transport."""
+
+import json
+import httpx
+import pytest
+from khazar_llms.utils.http_transport import (
+    AnthropicHTTPProvider,
+    OpenAIHTTPProvider,
+    ProviderHTTPError,
+)
+from khazar_llms.utils.llm_client import LLMClient, ProviderRegistry
+from khazar_llms.utils.metrics import collect_calls
+from khazar_llms.utils.retry import is_retryable, retry_after
+
+MESSAGES = [
+    {"role": "user", "content": "Hi"},
+    {"role": "system", "content": "You are the Critic"},
+]
+
+
+def mock_client(handler):
+    """An httpx client answering every request with ``handler``, recording requests."""
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(record)), requests
+
+
+def sse(*events):
+    return "".join(f"data: {event}\n\n" for event in events).encode()
+
+
+@pytest.mark.asyncio
+async def test_openai_http_generate_and_stream():
+    """Test chat completions requests and responses, streamed and not."""
+
+    def handler(request):
+        body = json.loads(request.content)
+        if body.get("stream"):
+            chunks = [json.dumps({"choices": [{"delta": {"content": t}}]}) for t in ["Hel", "lo"]]
+            return httpx.Response(200, content=sse(*chunks, "[DONE]"))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Hello"}}]})
+
+    http, requests = mock_client(handler)
+    provider = OpenAIHTTPProvider("test-key", "http://localhost:8000/v1/", http=http)
+
+    assert await provider.generate(MESSAGES, 0.5, 100, model="local") == "Hello"
+    assert [c async for c in provider.generate_stream(MESSAGES, 0.5, 100)] == ["Hel", "lo"]
+
+    request = requests[0]
+    body = json.loads(request.content)
+    assert str(request.url) == "http://localhost:8000/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer test-key"
+    assert body["model"] == "local"
+    assert body["messages"][0]["role"] == "system"
+    assert "prompt_cache_key" not in body  # not sent to OpenAI-compatible servers
+
+
+@pytest.mark.asyncio
+async def test_anthropic_http_generate_and_stream():
+    """Test Messages API requests and responses, streamed and not."""
+
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            events = [
+                {"type": "message_start", "message": {}},
+                {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}},
+                {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "lo"}},
+                {"type": "message_stop"},
+            ]
+            return httpx.Response(200, content=sse(*map(json.dumps, events)))
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "Hello"}]})
+
+    http, requests = mock_client(handler)
+    provider = AnthropicHTTPProvider("test-key", http=http)
+
+    assert await provider.generate(MESSAGES, 0.5, 100) == "Hello"
+    assert [c async for c in provider.generate_stream(MESSAGES, 0.5, 100)] == ["Hel", "lo"]
+
+    request = requests[0]
+    body = json.loads(request.content)
+    assert str(request.url) == "https://api.anthropic.com/v1/messages"
+    assert request.headers["x-api-key"] == "test-key"
+    assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert body["messages"] == [{"role": "user", "content": "Hi"}]
+
+
+@pytest.mark.asyncio
+async def test_reported_usage_replaces_estimates():
+    """Test that token counts from the API reach the call metrics, streamed and not."""
+    usage = {"prompt_tokens": 1234, "completion_tokens": 56}
+
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            chunks = [
+                json.dumps({"choices": [{"delta": {"content": "Hello"}}]}),
+                json.dumps({"choices": [], "usage": usage}),
+            ]
+            return httpx.Response(200, content=sse(*chunks, "[DONE]"))
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": "Hello"}}], "usage": usage}
+        )
+
+    http, requests = mock_client(handler)
+    registry = ProviderRegistry()
+    registry.register("openai", OpenAIHTTPProvider("test-key", http=http))
+    client = LLMClient(provider="openai", registry=registry)
+
+    with collect_calls() as calls:
+        assert await client.generate_chat(MESSAGES, max_tokens=100) == "Hello"
+        assert [c async for c in client.stream_chat(MESSAGES, max_tokens=100)] == ["Hello"]
+
+    assert json.loads(requests[1].content)["stream_options"] == {"include_usage": True}
+    for call in calls:
+        assert call.usage_reported
+        assert (call.prompt_tokens, call.completion_tokens) == (1234, 56)
+
+
+@pytest.mark.asyncio
+async def test_http_errors_are_retryable():
+    """Test that error responses keep their status and Retry-After for the retry policy."""
+    error = {"error": {"message": "Slow down"}}
+    http, _ = mock_client(
+        lambda request: httpx.Response(429, json=error, headers={"retry-after": "2"})
+    )
+    provider = OpenAIHTTPProvider("test-key", http=http)
+
+    with pytest.raises(ProviderHTTPError, match="Slow down") as info:
+        await provider.generate(MESSAGES, 0.5, 100)
+
+    assert is_retryable(info.value)
+    assert retry_after(info.value) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_registry_http_transport_shares_one_client():
+    """Test that the http transport gives every provider the same lean client."""
+    registry = ProviderRegistry(transport="http")
+
+    openai = registry.get("openai", api_key="test-key")
+    local = registry.get("openai", api_key="test-key", base_url="http://localhost:8000/v1")
+    anthropic = registry.get("anthropic", api_key="test-key")
+
+    assert isinstance(openai, OpenAIHTTPProvider)
+    assert isinstance(anthropic, AnthropicHTTPProvider)
+    assert openai.http is local.http is anthropic.http
+    await registry.aclose()
+    assert openai.http.is_closed
+
+    with pytest.raises(ValueError):
+        registry.configure_transport("grpc")
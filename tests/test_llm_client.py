@@ -1,7 +1,14 @@
 """Tests for LLM client functionality."""
 
+import asyncio
 import pytest
-from khazar_llms.utils.llm_client import LLMClient, MockLLMProvider
+from khazar_llms.utils.llm_client import (
+    LLMClient,
+    MockLLMProvider,
+    MockProviderError,
+    ProviderRegistry,
+)
+from khazar_llms.utils.retry import RetryPolicy
 
 
 @pytest.mark.asyncio
@@ -58,3 +65,206 @@ async def test_mock_responses_vary_by_context():
     
     # Responses should be different based on context
     assert dreamer_response != critic_response
+
+
+def test_clients_share_provider():
+    """Test that clients for the same endpoint share one provider instance."""
+    first = LLMClient(provider="mock")
+    second = LLMClient(provider="mock")
+
+    assert first.provider is second.provider
+
+
+def test_registry_keys_on_base_url():
+    """Test that distinct endpoints get distinct pooled providers."""
+    registry = ProviderRegistry()
+
+    default = registry.get("openai", api_key="test-key")
+    again = registry.get("openai", api_key="test-key")
+    local = registry.get("openai", api_key="test-key", base_url="http://localhost:8000/v1")
+
+    assert default is again
+    assert default is not local
+
+
+def test_registry_rebinds_providers_to_new_event_loop():
+    """Test that pooled providers are recreated for each asyncio.run call."""
+    registry = ProviderRegistry()
+    mock = MockLLMProvider()
+    registry.register("mock", mock)
+    client = LLMClient(provider="openai", api_key="test-key", registry=registry)
+
+    async def providers():
+        return client.provider, registry.get("openai", api_key="test-key"), registry.get("mock")
+
+    first, shared, first_mock = asyncio.run(providers())
+    second, _, second_mock = asyncio.run(providers())
+
+    assert first is shared
+    assert first is not second
+    assert first_mock is second_mock is mock
+
+
+def test_registry_pool_settings():
+    """Test configuring the connection pool."""
+    registry = ProviderRegistry()
+    registry.configure_pool(max_connections=8, keepalive_expiry=5.0)
+
+    assert registry.pool.max_connections == 8
+    assert registry.pool.keepalive_expiry == 5.0
+
+    with pytest.raises(ValueError):
+        registry.configure_pool(pool_size=8)
+
+
+@pytest.mark.asyncio
+async def test_stream_response_matches_generate():
+    """Test that streamed chunks join up to the full response."""
+    client = LLMClient(provider="mock")
+
+    full = await client.generate_response(
+        system_prompt="You are the Critic",
+        user_message="Be critical",
+    )
+    chunks = [
+        chunk
+        async for chunk in client.stream_response(
+            system_prompt="You are the Critic",
+            user_message="Be critical",
+        )
+    ]
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == full
+
+
+def _messages(role="Critic"):
+    return [
+        {"role": "system", "content": f"You are the {role}"},
+        {"role": "user", "content": "Tell me about dreams"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_is_deterministic():
+    """Test that simulated latency and failures repeat exactly for the same seed."""
+
+    async def outcomes(seed):
+        provider = MockLLMProvider(latency=0.001, latency_sigma=0.5, error_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                await provider.generate(_messages(), temperature=0.7, max_tokens=100)
+                results.append("ok")
+            except MockProviderError as exc:
+                results.append(exc.status_code)
+        return results
+
+    first = await outcomes(seed=1)
+    assert first == await outcomes(seed=1)
+    assert first != await outcomes(seed=2)
+    assert "ok" in first and 500 in first
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_forgets_least_recently_sent_prompts():
+    """Test that the per-prompt send counts stay within max_prompts."""
+    provider = MockLLMProvider(error_rate=0.5, max_prompts=3)
+    for role in ["A", "B", "C", "A", "D"]:
+        try:
+            await provider.generate(_messages(role), temperature=0.7, max_tokens=100)
+        except MockProviderError:
+            pass
+    assert len(provider._sent) == 3
+    # "B" was the least recently sent prompt
+    assert sorted(provider._sent.values()) == [1, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_response_length_and_rate_limits():
+    """Test simulated response length and 429s that the client retries."""
+    provider = MockLLMProvider(response_words=7)
+    response = await provider.generate(_messages("Poet"), temperature=0.7, max_tokens=100)
+    assert len(response.split()) == 7
+
+    limited = MockLLMProvider(rate_limit_rate=1.0, retry_after=0.5)
+    with pytest.raises(MockProviderError) as info:
+        await limited.generate(_messages(), temperature=0.7, max_tokens=100)
+    assert info.value.status_code == 429 and info.value.retry_after == 0.5
+
+    registry = ProviderRegistry()
+    registry.register("mock", MockLLMProvider(rate_limit_rate=0.5, retry_after=0, seed=3))
+    client = LLMClient(
+        provider="mock", registry=registry, retry_policy=RetryPolicy(max_attempts=10)
+    )
+    for _ in range(5):
+        assert await client.generate_response(system_prompt="You are the Critic", user_message="Hi")
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_streaming_speed():
+    """Test that streaming is paced by tokens_per_second."""
+    provider = MockLLMProvider(tokens_per_second=1000, response_words=20)
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    chunks = [
+        chunk
+        async for chunk in provider.generate_stream(_messages(), temperature=0.7, max_tokens=100)
+    ]
+    assert len(chunks) == 20
+    assert loop.time() - started >= 0.015
+
+
+class _RecordingCompletions:
+    """Stands in for an SDK resource, recording request arguments."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return self.response
+
+
+@pytest.mark.asyncio
+async def test_anthropic_marks_system_prompt_cacheable():
+    """Test that the Anthropic system prompt carries a cache breakpoint."""
+    from types import SimpleNamespace
+
+    registry = ProviderRegistry()
+    provider = registry.get("anthropic", api_key="test-key")
+    recorder = _RecordingCompletions(SimpleNamespace(content=[SimpleNamespace(text="ok")]))
+    provider.client = SimpleNamespace(messages=recorder)
+
+    assert await provider.generate(_messages(), temperature=0.7, max_tokens=100) == "ok"
+    (request,) = recorder.requests
+    assert request["system"] == [
+        {"type": "text", "text": "You are the Critic", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert all(message["role"] != "system" for message in request["messages"])
+
+
+@pytest.mark.asyncio
+async def test_openai_keys_prompt_cache_on_system_prompt():
+    """Test that OpenAI requests lead with the system prompt and share a cache key."""
+    from types import SimpleNamespace
+
+    registry = ProviderRegistry()
+    provider = registry.get("openai", api_key="test-key")
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+    recorder = _RecordingCompletions(response)
+    provider.client = SimpleNamespace(chat=SimpleNamespace(completions=recorder))
+
+    system = {"role": "system", "content": "You are the Critic"}
+    await provider.generate([{"role": "user", "content": "A"}, system], 0.7, 100)
+    await provider.generate([system, {"role": "user", "content": "B"}], 0.7, 100)
+
+    first, second = recorder.requests
+    assert first["messages"][0] == system
+    assert first["extra_body"]["prompt_cache_key"] == second["extra_body"]["prompt_cache_key"]
+
+    local = registry.get("openai", api_key="test-key", base_url="http://localhost:8000/v1")
+    local.client = provider.client
+    await local.generate([system], 0.7, 100)
+    assert "extra_body" not in recorder.requests[-1]
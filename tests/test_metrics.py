@@ -0,0 +1,88 @@
+"""Tests for call metrics, spans and metrics sinks."""
+
+import pytest
+from khazar_llms.agents.personas import CriticAgent, DreamerAgent, SynthesizerAgent
+from khazar_llms.orchestration.ensemble import ConversationMode, Ensemble
+from khazar_llms.utils.llm_client import LLMClient, ProviderRegistry
+from khazar_llms.utils.metrics import InMemorySink, PrometheusTextSink, Tracer, collect_calls
+
+
+@pytest.mark.asyncio
+async def test_client_records_call_metrics():
+    """Test that every call reports latency, tokens, attempts and cache hits."""
+    sink = InMemorySink()
+    client = LLMClient(provider="mock", registry=ProviderRegistry(), tracer=Tracer([sink]))
+
+    await client.generate_response(system_prompt="You are the Critic", user_message="Hi")
+    chunks = [
+        chunk
+        async for chunk in client.stream_response(
+            system_prompt="You are the Critic", user_message="Hi"
+        )
+    ]
+
+    blocking, streamed = sink.calls
+    assert blocking.provider == "mock" and blocking.model == "mock"
+    assert blocking.attempts == 1 and blocking.retries == 0
+    assert blocking.prompt_tokens > 0 and blocking.completion_tokens > 0
+    assert blocking.time_to_first_token is None and not blocking.cache_hit
+    assert streamed.streamed and len(chunks) > 1
+    assert 0 <= streamed.time_to_first_token <= streamed.latency
+
+
+@pytest.mark.asyncio
+async def test_ensemble_spans_nest_calls():
+    """Test that iterations, turns and calls form a tree and reach message metadata."""
+    sink = InMemorySink()
+    tracer = Tracer([sink])
+    agents = [DreamerAgent(provider="mock"), CriticAgent(provider="mock")]
+    for agent in agents:
+        agent.llm_client.tracer = tracer
+    ensemble = Ensemble(agents, mode=ConversationMode.PARALLEL, max_iterations=2, tracer=tracer)
+
+    results = await ensemble.collaborate("Test task")
+
+    iterations = [span for span in sink.spans if span.name == "iteration"]
+    turns = [span for span in sink.spans if span.name == "turn"]
+    assert len(iterations) == 2 and len(turns) == 4
+    iteration_ids = {span.span_id for span in iterations}
+    assert all(turn.parent_id in iteration_ids for turn in turns)
+    assert {call.parent_id for call in sink.calls} == {turn.span_id for turn in turns}
+    assert sink.summary()[("turn", "Dreamer")]["count"] == 2
+
+    metadata = results["conversation"][0].metadata
+    assert metadata["model"] == "mock"
+    assert metadata["prompt_tokens"] > 0 and metadata["retries"] == 0
+    assert "latency" in metadata
+
+
+@pytest.mark.asyncio
+async def test_collect_calls_nests():
+    """Test that a call is collected by every enclosing collect_calls block."""
+    client = LLMClient(provider="mock", registry=ProviderRegistry())
+
+    with collect_calls() as outer:
+        await client.generate_response(system_prompt="You are the Critic", user_message="Hi")
+        with collect_calls() as inner:
+            await client.generate_response(system_prompt="You are the Poet", user_message="Hi")
+
+    assert len(outer) == 2
+    assert inner == outer[1:]
+
+
+@pytest.mark.asyncio
+async def test_prometheus_text_sink(tmp_path):
+    """Test that the Prometheus sink writes aggregated counters and summaries."""
+    path = tmp_path / "khazar.prom"
+    tracer = Tracer([PrometheusTextSink(path)])
+    agent = SynthesizerAgent(provider="mock")
+    agent.llm_client.tracer = tracer
+
+    with tracer.span("turn", agent=agent.name):
+        await agent.respond(task="Test", context=[], iteration=0)
+    tracer.flush()
+
+    text = path.read_text()
+    assert "# TYPE khazar_llm_calls_total counter" in text
+    assert 'khazar_llm_calls_total{cache_hit="false",model="mock",provider="mock"} 1' in text
+    assert 'khazar_span_duration_seconds_count{agent="Synthesizer",span="turn"} 1' in text
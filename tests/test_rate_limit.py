@@ -0,0 +1,62 @@
+"""Tests for provider call scheduling and rate limiting."""
+
+import asyncio
+import pytest
+from khazar_llms.utils.llm_client import LLMClient, ProviderRegistry
+from khazar_llms.utils.rate_limit import ProviderScheduler, TokenBucket
+
+
+def test_token_bucket_wait_time():
+    """Test that an empty bucket reports how long to wait for capacity."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(1) == 0
+
+    bucket.consume(60)
+    assert 0.9 < bucket.wait_time(1) <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_bounds_in_flight():
+    """Test that no more than max_in_flight requests run at once."""
+    scheduler = ProviderScheduler(max_in_flight=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with scheduler.slot():
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_callers_in_order():
+    """Test that waiting callers are admitted first come, first served."""
+    scheduler = ProviderScheduler(max_in_flight=1)
+    order = []
+
+    async def call(i):
+        async with scheduler.slot():
+            order.append(i)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(call(i) for i in range(5)))
+
+    assert order == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_client_calls_go_through_scheduler():
+    """Test that LLMClient calls are admitted by the registry's scheduler."""
+    registry = ProviderRegistry()
+    registry.configure_rate_limits("mock", max_in_flight=1, requests_per_minute=600)
+    client = LLMClient(provider="mock", registry=registry)
+
+    await client.generate_response(system_prompt="You are the Dreamer", user_message="Hi")
+
+    bucket = registry.scheduler("mock").requests
+    assert bucket.available < bucket.capacity
@@ -0,0 +1,181 @@
+"""Tests for retry, deadline and hedging policies."""
+
+import asyncio
+import pytest
+from khazar_llms.utils.llm_client import BaseLLMProvider, LLMClient, ProviderRegistry
+from khazar_llms.utils.retry import (
+    HedgePolicy,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_retries,
+    hedged,
+    is_retryable,
+    retry_after,
+)
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FlakyProvider(BaseLLMProvider):
+    """Fails a fixed number of times before answering."""
+
+    def __init__(self, failures, status_code=429):
+        self.failures = failures
+        self.status_code = status_code
+        self.calls = 0
+
+    async def generate(self, messages, temperature, max_tokens, model=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ProviderError(self.status_code, retry_after=0)
+        return "recovered"
+
+
+def test_retryable_errors():
+    """Test classification of retryable failures."""
+    assert is_retryable(ProviderError(429))
+    assert is_retryable(ProviderError(503))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ProviderError(400))
+    assert not is_retryable(ValueError("bad request"))
+    assert retry_after(ProviderError(429, retry_after="2")) == 2.0
+
+
+def test_backoff_is_jittered_and_capped():
+    """Test that backoff stays within the exponential envelope."""
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+
+    assert all(0 <= policy.backoff(0) <= 1.0 for _ in range(20))
+    assert all(0 <= policy.backoff(5) <= 4.0 for _ in range(20))
+    assert policy.backoff(5, retry_after=7.0) == 7.0
+
+
+@pytest.mark.asyncio
+async def test_client_retries_rate_limits():
+    """Test that the client retries 429s and returns the eventual answer."""
+    client = LLMClient(provider="mock", registry=ProviderRegistry())
+    client.provider = FlakyProvider(failures=2)
+
+    response = await client.generate_response(system_prompt="", user_message="Hi")
+
+    assert response == "recovered"
+    assert client.provider.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_client_gives_up_on_client_errors():
+    """Test that non-retryable errors are raised immediately."""
+    client = LLMClient(provider="mock", registry=ProviderRegistry())
+    client.provider = FlakyProvider(failures=1, status_code=400)
+
+    with pytest.raises(ProviderError):
+        await client.generate_response(system_prompt="", user_message="Hi")
+    assert client.provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_attempt_timeout():
+    """Test that a hanging attempt is cut off by the per-attempt deadline."""
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await call_with_retries(hang, RetryPolicy(max_attempts=2, base_delay=0, timeout=0.01))
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cuts_tail_latency():
+    """Test that a slow call is hedged after the observed p95 latency."""
+    latency = LatencyTracker()
+    for _ in range(20):
+        latency.record(0.01)
+    delays = [1.0, 0.0]
+
+    async def call():
+        await asyncio.sleep(delays.pop(0))
+        return "fast"
+
+    started = asyncio.get_running_loop().time()
+    result = await call_with_retries(
+        call, RetryPolicy(), hedge=HedgePolicy(min_samples=20), latency=latency
+    )
+
+    assert result == "fast"
+    assert asyncio.get_running_loop().time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_cancelled_before_hedge_delay():
+    """Test that cancelling during the hedge delay also cancels the running attempt."""
+    started, finished = [], []
+
+    async def call():
+        started.append(True)
+        await asyncio.sleep(0.2)
+        finished.append(True)
+        return "late"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(hedged(call, delay=1.0), timeout=0.02)
+    await asyncio.sleep(0.3)
+
+    assert started == [True]
+    assert finished == []
+
+
+class StallingStreamProvider(BaseLLMProvider):
+    """Streams a chunk only on the last attempt; earlier attempts stall until cancelled."""
+
+    def __init__(self, stalls):
+        self.stalls = stalls
+        self.calls = 0
+        self.closed = 0
+
+    async def generate(self, messages, temperature, max_tokens, model=None):
+        raise NotImplementedError
+
+    async def generate_stream(self, messages, temperature, max_tokens, model=None):
+        self.calls += 1
+        try:
+            if self.calls <= self.stalls:
+                await asyncio.sleep(10)
+            yield "done"
+        finally:
+            self.closed += 1
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_close_failed_streams_and_honour_deadline():
+    """Test that stalled stream attempts are closed and retried within the call deadline."""
+    registry = ProviderRegistry()
+    provider = StallingStreamProvider(stalls=1)
+    registry.register("stalling", provider)
+    client = LLMClient(
+        provider="stalling",
+        registry=registry,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0, timeout=0.05),
+    )
+
+    chunks = [chunk async for chunk in client.stream_chat([{"role": "user", "content": "Hi"}])]
+    assert chunks == ["done"]
+    assert provider.calls == 2 and provider.closed == 2
+
+    provider = StallingStreamProvider(stalls=5)
+    registry.register("stalling", provider)
+    client = LLMClient(
+        provider="stalling",
+        registry=registry,
+        retry_policy=RetryPolicy(max_attempts=5, base_delay=0, timeout=None, deadline=0.1),
+    )
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(asyncio.TimeoutError):
+        async for _ in client.stream_chat([{"role": "user", "content": "Hi"}]):
+            pass
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert provider.closed == provider.calls
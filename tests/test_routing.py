@@ -0,0 +1,162 @@
+"""Tests for per-agent model selection and routing."""
+
+import pytest
+from khazar_llms.agents.base import AgentRole
+from khazar_llms.agents.personas import CriticAgent, DreamerAgent, SynthesizerAgent
+from khazar_llms.agents.routing import CASCADE_ROLE_TIERS, LARGE_MODELS, SMALL_MODELS, ModelRouter
+from khazar_llms.orchestration.ensemble import Ensemble
+from khazar_llms.utils.cascade import CascadePolicy, heuristic_score
+from khazar_llms.utils.llm_client import BaseLLMProvider
+
+
+class RecordingProvider(BaseLLMProvider):
+    """Records the model each call was made with."""
+
+    model = "default-model"
+
+    def __init__(self):
+        self.models = []
+
+    async def generate(self, messages, temperature, max_tokens, model=None):
+        self.models.append(model or self.model)
+        return "ok"
+
+
+def test_router_sends_synthesizer_to_large_model():
+    """Test the default tiers: small models for most roles, large for the Synthesizer."""
+    router = ModelRouter()
+
+    assert router.model_for(AgentRole.CRITIC, "openai") == SMALL_MODELS["openai"]
+    assert router.model_for("synthesizer", "anthropic") == LARGE_MODELS["anthropic"]
+    assert router.model_for(AgentRole.CRITIC, "mock") is None
+
+
+def test_router_custom_tiers():
+    """Test routing with custom role tiers and models."""
+    router = ModelRouter(
+        role_tiers={"critic": "fast"},
+        tiers={"fast": {"openai": "tiny-model"}},
+    )
+
+    assert router.model_for(AgentRole.CRITIC, "OpenAI") == "tiny-model"
+    assert router.model_for(AgentRole.SYNTHESIZER, "openai") is None
+
+
+def test_router_routes_batch_providers():
+    """Test that batch API variants are routed like the provider they run on."""
+    router = ModelRouter()
+    critic = CriticAgent(provider="openai-batch")
+    Ensemble(agents=[critic], router=router)
+
+    assert critic.model == SMALL_MODELS["openai"]
+    assert router.model_for("synthesizer", "anthropic-batch") == LARGE_MODELS["anthropic"]
+    cascade = ModelRouter(role_tiers=CASCADE_ROLE_TIERS).cascade_for("critic", "openai-batch")
+    assert cascade.draft_model == SMALL_MODELS["openai"]
+    assert cascade.refine_model == LARGE_MODELS["openai"]
+
+
+def test_ensemble_assigns_routed_models():
+    """Test that the ensemble routes agents without an explicit model."""
+    critic = CriticAgent(provider="mock")
+    synthesizer = SynthesizerAgent(provider="mock")
+    dreamer = DreamerAgent(provider="mock", model="pinned-model")
+    router = ModelRouter(tiers={"small": {"mock": "mock-small"}, "large": {"mock": "mock-large"}})
+
+    Ensemble(agents=[critic, synthesizer, dreamer], router=router)
+
+    assert critic.model == "mock-small"
+    assert synthesizer.model == "mock-large"
+    assert dreamer.model == "pinned-model"
+
+
+@pytest.mark.asyncio
+async def test_agent_model_reaches_provider():
+    """Test that an agent's model is sent to the provider and recorded on its message."""
+    agent = CriticAgent(provider="mock", model="small-model")
+    provider = RecordingProvider()
+    agent.llm_client.provider = provider
+
+    message = await agent.respond(task="Test", context=[], iteration=0)
+    assert provider.models == ["small-model"]
+    assert message.metadata["model"] == "small-model"
+
+    agent.model = None
+    agent.llm_client.model = provider.model
+    await agent.respond(task="Test", context=[], iteration=1)
+    assert provider.models[-1] == "default-model"
+
+
+GOOD_REPLY = (
+    "A museum of forgotten dreams would hold each dream in a glass room where visitors "
+    "walk through its colors, sounds and half-remembered faces, guided by the people "
+    "who once dreamed them and who now return to tell the story of what they lost."
+)
+
+
+class TieredProvider(RecordingProvider):
+    """Gives a weak reply from the small model and a good one from the large model."""
+
+    async def generate(self, messages, temperature, max_tokens, model=None):
+        self.models.append(model)
+        return "Not sure" if model == "small" else GOOD_REPLY
+
+    async def generate_stream(self, messages, temperature, max_tokens, model=None):
+        yield await self.generate(messages, temperature, max_tokens, model)
+
+
+def test_heuristic_score():
+    """Test that weak drafts score below good ones."""
+    assert heuristic_score([], GOOD_REPLY) == 1.0
+    assert heuristic_score([], "") == 0.0
+    assert heuristic_score([], "I'm not sure what you mean.") < 0.5
+    assert heuristic_score([], GOOD_REPLY[:150]) < 1.0  # cut off mid-sentence
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_cascade_escalates_weak_drafts(stream):
+    """Test that a weak draft is refined by the large model and the decision is recorded."""
+    agent = CriticAgent(provider="mock", cascade=CascadePolicy("small", "large"))
+    provider = TieredProvider()
+    agent.llm_client.provider = provider
+
+    on_token = (lambda event: None) if stream else None
+    message = await agent.respond(task="Test", context=[], iteration=0, on_token=on_token)
+
+    assert provider.models == ["small", "large"]
+    assert message.content == GOOD_REPLY
+    assert message.metadata["model"] == "large"
+    assert message.metadata["cascade_escalated"] is True
+    assert message.metadata["cascade_score"] < 0.5
+    assert message.metadata["draft_latency"] >= 0
+    assert message.metadata["refine_latency"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_cascade_keeps_good_drafts():
+    """Test that a good draft is used without calling the large model."""
+    agent = CriticAgent(provider="mock", cascade=CascadePolicy("large", "larger"))
+    provider = TieredProvider()
+    agent.llm_client.provider = provider
+
+    message = await agent.respond(task="Test", context=[], iteration=0)
+
+    assert provider.models == ["large"]
+    assert message.metadata["cascade_escalated"] is False
+    assert message.metadata["refine_latency"] is None
+
+
+def test_router_assigns_cascades():
+    """Test that cascade-tier roles get a small-to-large cascade instead of a model."""
+    router = ModelRouter(
+        role_tiers=CASCADE_ROLE_TIERS,
+        tiers={"small": {"mock": "mock-small"}, "large": {"mock": "mock-large"}},
+    )
+    critic = CriticAgent(provider="mock")
+    synthesizer = SynthesizerAgent(provider="mock")
+
+    router.assign([critic, synthesizer])
+
+    assert critic.model is None
+    assert (critic.cascade.draft_model, critic.cascade.refine_model) == ("mock-small", "mock-large")
+    assert synthesizer.cascade is None and synthesizer.model == "mock-large"
@@ -0,0 +1,168 @@
+"""Tests for the HTTP/WebSocket session service."""
+
+import asyncio
+import base64
+import json
+import os
+import struct
+
+import pytest
+from khazar_llms.server import EnsembleServer
+from khazar_llms.utils.llm_client import MockLLMProvider, ProviderRegistry
+
+
+async def _start(**settings) -> EnsembleServer:
+    registry = ProviderRegistry()
+    registry.register("mock", MockLLMProvider(latency=settings.pop("latency", 0.0)))
+    server = EnsembleServer(port=0, registry=registry, **settings)
+    await server.start()
+    return server
+
+
+async def _request(server, method, path, body=None):
+    """Send one request and return (status line, headers text, body bytes)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status, _, headers = head.decode().partition("\r\n")
+    return status, headers, payload
+
+
+def _dechunk(payload: bytes) -> bytes:
+    body = b""
+    while True:
+        size, _, rest = payload.partition(b"\r\n")
+        length = int(size, 16)
+        if length == 0:
+            return body
+        body += rest[:length]
+        payload = rest[length + 2 :]
+
+
+@pytest.mark.asyncio
+async def test_post_session_streams_events():
+    """Test that a session's messages are streamed back as NDJSON events."""
+    server = await _start()
+    try:
+        status, headers, payload = await _request(
+            server,
+            "POST",
+            "/sessions",
+            {"task": "A museum of dreams", "agents": ["dreamer", "critic"], "iterations": 2},
+        )
+    finally:
+        await server.close()
+
+    assert status.startswith("HTTP/1.1 200")
+    events = [json.loads(line) for line in _dechunk(payload).splitlines()]
+    assert events[0]["event"] == "accepted"
+    assert [e["sender"] for e in events if e["event"] == "message"] == ["Dreamer", "Critic"] * 2
+    assert events[-1]["event"] == "session_end" and events[-1]["iterations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_and_unknown_requests():
+    """Test that bad requests are rejected without running a session."""
+    server = await _start()
+    try:
+        missing_task, _, _ = await _request(server, "POST", "/sessions", {"agents": ["poet"]})
+        unknown, _, _ = await _request(server, "GET", "/nowhere")
+        status, _, body = await _request(server, "GET", "/health")
+    finally:
+        await server.close()
+
+    assert missing_task.startswith("HTTP/1.1 400")
+    assert unknown.startswith("HTTP/1.1 404")
+    assert json.loads(body)["active_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_overload_is_rejected_with_retry_after():
+    """Test admission control: requests beyond running and queued capacity get 503."""
+    server = await _start(latency=0.2, max_sessions=1, max_queued=0)
+    request = {"task": "Slow task", "agents": ["poet"], "iterations": 1}
+    try:
+        running = asyncio.ensure_future(_request(server, "POST", "/sessions", request))
+        await asyncio.sleep(0.05)
+        status, headers, _ = await _request(server, "POST", "/sessions", request)
+        first, _, _ = await running
+    finally:
+        await server.close()
+
+    assert first.startswith("HTTP/1.1 200")
+    assert status.startswith("HTTP/1.1 503")
+    assert "Retry-After: 1" in headers
+
+
+async def _websocket_session(server, request: bytes):
+    """Open a WebSocket, send one text frame and return (events, close code)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        (
+            "GET /sessions HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode()
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 101")
+
+    mask = os.urandom(4)
+    masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(request))
+    writer.write(struct.pack("!BB", 0x81, 0x80 | len(request)) + mask + masked)
+
+    events = []
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        payload = await reader.readexactly(length)
+        if first & 0x0F == 0x8:
+            break
+        events.append(json.loads(payload))
+    writer.close()
+    return events, struct.unpack("!H", payload)[0]
+
+
+@pytest.mark.asyncio
+async def test_websocket_session_streams_tokens_and_messages():
+    """Test running a session over a WebSocket."""
+    server = await _start()
+    try:
+        request = json.dumps(
+            {"task": "Poems", "agents": ["poet"], "iterations": 1, "stream_tokens": True}
+        ).encode()
+        events, close_code = await _websocket_session(server, request)
+    finally:
+        await server.close()
+
+    assert close_code == 1000
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "accepted" and kinds[-1] == "session_end"
+    assert "token" in kinds
+    assert kinds.count("message") == 1
+
+
+@pytest.mark.asyncio
+async def test_websocket_invalid_utf8_is_rejected():
+    """Test that a text frame that is not UTF-8 gets an error, not a dropped connection."""
+    server = await _start()
+    try:
+        events, close_code = await _websocket_session(server, b'{"task": "\xff"}')
+        status, _, _ = await _request(server, "GET", "/health")
+    finally:
+        await server.close()
+
+    assert [(event["event"], event["status"]) for event in events] == [("error", 400)]
+    assert close_code == 1008
+    assert status.startswith("HTTP/1.1 200")
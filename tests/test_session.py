@@ -0,0 +1,151 @@
+"""Tests for creative sessions and their event logs."""
+
+import json
+import pytest
+from khazar_llms.agents.personas import DreamerAgent, CriticAgent
+from khazar_llms.orchestration.ensemble import Ensemble
+from khazar_llms.orchestration.event_log import SessionEventLog
+from khazar_llms.orchestration.session import (
+    CreativeSession,
+    SessionArchive,
+    SessionArchiveWriter,
+    archive_sessions,
+)
+
+
+def make_ensemble(iterations=2):
+    agents = [DreamerAgent(provider="mock"), CriticAgent(provider="mock")]
+    return Ensemble(agents=agents, max_iterations=iterations)
+
+
+@pytest.mark.asyncio
+async def test_event_log_records_every_message(tmp_path):
+    """Test that the log holds the whole session and rebuilds its data."""
+    session = CreativeSession(make_ensemble(), output_dir=tmp_path, event_log=True)
+    results = await session.run("Test task")
+
+    events = [e["event"] for e in SessionEventLog.read_events(session.log_path)]
+    data = session.load_log()
+
+    assert events[0] == "session_start" and events[-1] == "session_end"
+    assert events.count("message") == 4 and events.count("iteration_end") == 2
+    assert data["complete"]
+    assert [m["content"] for m in data["conversation"]] == [
+        m.content for m in results["conversation"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_views_derived_from_log(tmp_path):
+    """Test that JSON and text views can be written from the log."""
+    session = CreativeSession(make_ensemble(1), output_dir=tmp_path, event_log=True)
+    await session.run("Test task")
+
+    json_path = session.save_session(session.load_log(), format="json")
+    txt_path = session.save_session(session.load_log(), format="txt")
+
+    assert len(json.loads(json_path.read_text())["conversation"]) == 2
+    assert "Dreamer (dreamer)" in txt_path.read_text()
+
+
+@pytest.mark.asyncio
+async def test_resume_interrupted_session(tmp_path):
+    """Test resuming after a crash in the middle of the second iteration."""
+    original = make_ensemble()
+    session = CreativeSession(original, output_dir=tmp_path, event_log=True)
+    await session.run("Test task")
+
+    # Keep the first iteration and one message of the second, cut mid-line
+    lines = session.log_path.read_text().splitlines(keepends=True)
+    crashed = tmp_path / "crashed.jsonl"
+    crashed.write_text("".join(lines[:5]) + lines[5][:30])
+
+    ensemble = make_ensemble()
+    resumed = CreativeSession.resume(crashed, ensemble)
+    assert resumed.task == "Test task"
+    assert len(ensemble.conversation_history) == 2
+    assert len(ensemble.agents[0].memory) == 1
+
+    results = await resumed.run(resumed.task)
+    data = SessionEventLog.load(crashed)
+
+    assert results["iterations"] == 2
+    assert [m.iteration for m in results["conversation"]] == [0, 0, 1, 1]
+    assert data["complete"]
+    assert [m["iteration"] for m in data["conversation"]] == [0, 0, 1, 1]
+    # The restored turns are in the agents' transcripts, so their prompts match
+    for agent, uninterrupted in zip(ensemble.agents, original.agents):
+        assert agent.history.messages == uninterrupted.history.messages
+
+    with pytest.raises(ValueError):
+        CreativeSession.resume(crashed, make_ensemble())
+
+
+@pytest.mark.asyncio
+async def test_archive_random_access(tmp_path):
+    """Test packing sessions into an archive and reading single sessions and messages."""
+    archive = tmp_path / "sessions.ksa"
+    runs = {}
+    with SessionArchiveWriter(archive) as writer:
+        for index in range(3):
+            session = CreativeSession(make_ensemble(), session_id=f"s{index}")
+            runs[session.session_id] = await session.run(f"Task {index}")
+            writer.add(runs[session.session_id])
+
+    with SessionArchive(archive) as reader:
+        assert reader.session_ids() == ["s0", "s1", "s2"]
+        assert reader.index[1]["task"] == "Task 1" and reader.index[1]["messages"] == 4
+        assert reader.message("s2", -1) == runs["s2"]["conversation"][-1].to_dict()
+        loaded = reader.load("s1")
+        assert loaded["mode"] == "sequential"
+        assert [m["content"] for m in loaded["conversation"]] == [
+            m.content for m in runs["s1"]["conversation"]
+        ]
+        hits = list(reader.search(contains="MERIT", role="critic"))
+        assert [(session_id, index) for session_id, index, _ in hits] == [
+            (f"s{i}", k) for i in range(3) for k in (1, 3)
+        ]
+        with pytest.raises(KeyError):
+            reader.metadata("missing")
+
+
+@pytest.mark.asyncio
+async def test_unclosed_archive_writer_keeps_old_sessions(tmp_path):
+    """Test that an append interrupted before close() leaves the archive readable."""
+    archive = tmp_path / "sessions.ksa"
+    with SessionArchiveWriter(archive) as writer:
+        writer.add(await CreativeSession(make_ensemble(1), session_id="s0").run("Task 0"))
+
+    writer = SessionArchiveWriter(archive)
+    writer.add(await CreativeSession(make_ensemble(1), session_id="s1").run("Task 1"))
+    # No close(), as after a crash
+
+    with SessionArchive(archive) as reader:
+        assert reader.session_ids() == ["s0"]
+        assert len(list(reader.messages("s0"))) == 2
+
+    writer.close()
+    with SessionArchive(archive) as reader:
+        assert reader.session_ids() == ["s0", "s1"]
+
+
+@pytest.mark.asyncio
+async def test_archive_sessions_appends_new_files(tmp_path):
+    """Test that archiving a directory twice only adds sessions not yet archived."""
+    for index in range(2):
+        session = CreativeSession(
+            make_ensemble(1), output_dir=tmp_path, session_id=f"s{index}", event_log=True
+        )
+        await session.run("Test task")
+    archive = tmp_path / "sessions.ksa"
+
+    assert len(archive_sessions(tmp_path, archive)) == 2
+    session = CreativeSession(
+        make_ensemble(1), output_dir=tmp_path, session_id="s2", event_log=True
+    )
+    await session.run("Test task")
+    assert [path.name for path in archive_sessions(tmp_path, archive)] == ["session_s2.jsonl"]
+
+    with SessionArchive(archive) as reader:
+        assert len(reader) == 3
+        assert len(list(reader.messages("s2"))) == 2
@@ -0,0 +1,78 @@
+"""Tests for early-stopping criteria."""
+
+import pytest
+from khazar_llms.agents.base import AgentRole, Message
+from khazar_llms.agents.personas import DreamerAgent, CriticAgent
+from khazar_llms.orchestration.ensemble import Ensemble
+from khazar_llms.orchestration.stopping import (
+    ConsensusMarkerStop,
+    SimilarityStop,
+    TokenBudgetStop,
+    similarity,
+)
+
+
+def test_similarity():
+    """Test text similarity bounds."""
+    text = "the museum of forgotten dreams opens at dusk"
+
+    assert similarity(text, text) == 1.0
+    assert similarity(text, "an entirely different sentence about nothing at all") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_similarity_stop_ends_repetitive_session():
+    """Test that repeating agents stop the session after the second iteration."""
+    agents = [DreamerAgent(provider="mock"), CriticAgent(provider="mock")]
+    ensemble = Ensemble(agents=agents, max_iterations=5, stop_criteria=[SimilarityStop(0.9)])
+
+    results = await ensemble.collaborate("Test task")
+
+    assert results["iterations"] == 2
+    assert results["max_iterations"] == 5
+    assert results["stop_reason"].startswith("converged")
+    assert len(results["conversation"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_session_without_criteria_runs_all_iterations():
+    """Test that sessions run to max_iterations by default."""
+    ensemble = Ensemble(agents=[DreamerAgent(provider="mock")], max_iterations=3)
+
+    results = await ensemble.collaborate("Test task")
+
+    assert results["iterations"] == 3
+    assert results["stop_reason"] is None
+
+
+def test_consensus_marker_stop():
+    """Test that only the configured roles can declare consensus."""
+    criterion = ConsensusMarkerStop()
+    ensemble = Ensemble(agents=[])
+    critic = Message(
+        sender="Critic", role=AgentRole.CRITIC, content="Consensus reached", iteration=0
+    )
+    synth = Message(
+        sender="Synthesizer",
+        role=AgentRole.SYNTHESIZER,
+        content="A shared vision.\nCONSENSUS REACHED",
+        iteration=0,
+    )
+
+    assert criterion.check(ensemble, 0, [critic]) is None
+    assert criterion.check(ensemble, 0, [synth]) == "consensus declared by Synthesizer"
+
+
+@pytest.mark.asyncio
+async def test_token_budget_stop():
+    """Test stopping once the generated text exceeds a token budget."""
+    ensemble = Ensemble(
+        agents=[DreamerAgent(provider="mock")],
+        max_iterations=10,
+        stop_criteria=[TokenBudgetStop(max_tokens=150)],
+    )
+
+    results = await ensemble.collaborate("Test task")
+
+    assert results["iterations"] < 10
+    assert "token budget" in results["stop_reason"]